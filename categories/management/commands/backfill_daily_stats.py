@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from quiz.models import QuizAttempt, UserDailyStats
+from quiz.user_stats import daily_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute UserDailyStats from completed attempts, a chunk of users "
+        "at a time (for history from before the rollup existed, or to repair drift)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users-per-chunk", type=int, default=200)
+
+    def handle(self, *args, **options):
+        chunk = options["users_per_chunk"]
+        user_ids = list(
+            QuizAttempt.objects
+            .filter(completed=True)
+            .order_by("user_id")
+            .values_list("user_id", flat=True)
+            .distinct()
+        )
+        days = 0
+
+        for start in range(0, len(user_ids), chunk):
+            ids = user_ids[start:start + chunk]
+            # one read of the chunk's attempts, rows replaced in one transaction
+            rows = daily_rows(QuizAttempt.objects.filter(user_id__in=ids))
+            with transaction.atomic():
+                UserDailyStats.objects.filter(user_id__in=ids).delete()
+                UserDailyStats.objects.bulk_create(rows, batch_size=1000)
+            days += len(rows)
+            self.stdout.write(f"{min(start + chunk, len(user_ids))}/{len(user_ids)} users")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfilled {days} daily rows for {len(user_ids)} users."
+        ))
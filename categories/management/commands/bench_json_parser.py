@@ -0,0 +1,139 @@
+import json
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from quiz.llm_json import salvage_questions
+
+
+# ============================================================
+# BASELINE (the parsers this command was written to replace)
+# ============================================================
+
+def legacy_extract_json(text):
+    try:
+        start = text.index("{")
+        end = text.rindex("}") + 1
+        return json.loads(text[start:end])
+    except Exception:
+        return None
+
+
+def legacy_clean_json_output(text):
+    text = text.strip()
+    text = text.replace("```json", "").replace("```", "").strip()
+    text = text.replace("\\(", "(").replace("\\)", ")")
+    text = text.replace("\\[", "[").replace("\\]", "]")
+    text = text.replace("\\{", "{").replace("\\}", "}")
+    text = text.replace("\\n", " ")
+    return text
+
+
+def legacy_parse(text):
+    """extract_json, then clean_json_output + regex retry as ai.py used to do."""
+    data = legacy_extract_json(text)
+    if data is None:
+        match = re.search(r"\{.*\}", legacy_clean_json_output(text), re.S)
+        if match:
+            try:
+                data = json.loads(match.group(0))
+            except ValueError:
+                data = None
+    if not isinstance(data, dict):
+        return []
+    questions = data.get("questions")
+    return questions if isinstance(questions, list) else []
+
+
+# ============================================================
+# SYNTHETIC CORPUS
+# ============================================================
+# Hand-built imitations of the failure shapes seen from Groq / OpenAI
+# (fences, prose, truncation, LaTeX escapes, ...), not captured
+# responses: the numbers compare the parsers on these shapes only.
+
+def _question(i, text=None):
+    return {
+        "question": text or f"What does snippet {i} print?",
+        "choices": [f"{i}", f"{i + 1}", "None", "Error"],
+        "correct_choice_index": i % 4,
+        "explanation": f"Snippet {i} prints {i}.",
+        "references": [],
+    }
+
+
+def _body(n):
+    return json.dumps({"questions": [_question(i) for i in range(n)]}, indent=2)
+
+
+def build_corpus():
+    five = _body(5)
+    seven = _body(7)
+    return {
+        "clean": five,
+        "fenced": f"```json\n{five}\n```",
+        "prose wrapped": f"Sure! Here are your questions:\n\n{five}\n\nLet me know if you need more.",
+        "truncated": seven[:int(len(seven) * 0.85)],
+        "truncated fenced": "```json\n" + seven[:len(seven) - 40],
+        "latex escapes": five.replace("What does", "What does \\(x\\)"),
+        "trailing commas": five.replace('"references": []', '"references": [],'),
+        "raw newlines": five.replace("Snippet 2 prints 2.", "Snippet 2\nprints 2."),
+        "bare array": json.dumps([_question(i) for i in range(5)]),
+        "braces in text": json.dumps({"questions": [
+            _question(i, "Which literal builds a dict: {} or {1}?") for i in range(5)
+        ]}),
+        "one bad object": five.replace('"correct_choice_index": 3', '"correct_choice_index": three'),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark the incremental LLM JSON parser against the old "
+        "extract_json / clean_json_output path on a synthetic corpus of "
+        "malformed outputs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=2000,
+                            help="Parses per corpus entry per parser.")
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        corpus = build_corpus()
+
+        self.stdout.write(
+            f"{'case':<18}{'legacy q':>9}{'legacy us':>11}"
+            f"{'new q':>7}{'rej':>5}{'trunc':>7}{'new us':>9}"
+        )
+
+        totals = {"legacy": 0, "new": 0, "legacy_us": 0.0, "new_us": 0.0}
+        for name, text in corpus.items():
+            legacy_count = len(legacy_parse(text))
+            questions, stats = salvage_questions(text)
+
+            legacy_us = self.time_it(legacy_parse, text, iterations)
+            new_us = self.time_it(salvage_questions, text, iterations)
+
+            totals["legacy"] += legacy_count
+            totals["new"] += len(questions)
+            totals["legacy_us"] += legacy_us
+            totals["new_us"] += new_us
+
+            self.stdout.write(
+                f"{name:<18}{legacy_count:>9}{legacy_us:>11.1f}"
+                f"{len(questions):>7}{stats['rejected']:>5}"
+                f"{'yes' if stats['truncated'] else 'no':>7}{new_us:>9.1f}"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Recovered {totals['new']} questions vs {totals['legacy']} with the old path; "
+            f"{totals['new_us']:.0f}us vs {totals['legacy_us']:.0f}us per full corpus pass."
+        ))
+
+    @staticmethod
+    def time_it(fn, text, iterations):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn(text)
+        return (time.perf_counter() - started) / iterations * 1e6
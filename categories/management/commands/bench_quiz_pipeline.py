@@ -0,0 +1,172 @@
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from categories.models import Category
+from quiz.prompt_cache import reset_prompt_cache
+from quiz.providers import reset_providers
+from quiz.throttle import reset_guards
+
+STAGES = ("generate", "start", "details", "answer", "finish")
+
+
+def bench_host():
+    """
+    A host name ALLOWED_HOSTS accepts; the test client's default
+    "testserver" is rejected with 400 outside of the test runner.
+    """
+    for host in settings.ALLOWED_HOSTS:
+        if host and host != "*":
+            return host.lstrip(".")
+    return "localhost"
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test generate -> start -> answer -> finish through the real API "
+        "views. Uses the offline fake LLM provider unless told otherwise."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--count", type=int, default=10,
+                            help="Questions per quiz.")
+        parser.add_argument("--category", default=None,
+                            help="Category slug (defaults to the first category).")
+        parser.add_argument("--provider", default="fake",
+                            help="LLM provider to use for the run (groq/openai/fake).")
+        parser.add_argument("--latency", type=float, default=0.0,
+                            help="Fake provider latency in seconds.")
+        parser.add_argument("--failure-rate", type=float, default=0.0,
+                            help="Fake provider injected failure rate (0-1).")
+        parser.add_argument("--fresh", action="store_true",
+                            help="Bypass the question bank so every quiz hits the provider.")
+        parser.add_argument("--rpm", type=int, default=0,
+                            help="Provider requests/minute limit for the run (0 = unlimited).")
+        parser.add_argument("--tpm", type=int, default=0,
+                            help="Provider tokens/minute limit for the run (0 = unlimited).")
+        parser.add_argument("--prompt-cache", action="store_true",
+                            help="Serve repeated prompts from the completion cache.")
+
+    def handle(self, *args, **options):
+        categories = Category.objects.order_by("id")
+        if options["category"]:
+            categories = categories.filter(slug=options["category"])
+        category = categories.first()
+        if category is None:
+            raise CommandError("No category found. Run seed_categories first.")
+
+        settings.QUIZ_LLM_PROVIDER = options["provider"]
+        settings.QUIZ_FAKE_LLM_LATENCY = options["latency"]
+        settings.QUIZ_FAKE_LLM_FAILURE_RATE = options["failure_rate"]
+        settings.QUIZ_LLM_RPM = options["rpm"]
+        settings.QUIZ_LLM_TPM = options["tpm"]
+        settings.QUIZ_LLM_GUARD_MODE = "process"
+        settings.QUIZ_PROMPT_CACHE = options["prompt_cache"]
+        reset_providers()
+        reset_guards()
+        reset_prompt_cache()
+
+        user, _ = User.objects.get_or_create(
+            username="bench@example.com",
+            defaults={"email": "bench@example.com"},
+        )
+        token, _ = Token.objects.get_or_create(user=user)
+
+        self.stdout.write(
+            f"Running {options['iterations']} pipelines x {options['count']} questions "
+            f"on '{category.name}' with provider={options['provider']}, "
+            f"concurrency={options['concurrency']}."
+        )
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            results = list(pool.map(
+                lambda _: self.run_pipeline(token.key, category, options),
+                range(options["iterations"]),
+            ))
+        elapsed = time.monotonic() - started
+
+        self.report(results, elapsed)
+
+    # -------- ONE PIPELINE --------
+    def run_pipeline(self, token, category, options):
+        client = Client(HTTP_AUTHORIZATION=f"Token {token}", SERVER_NAME=bench_host())
+        timings = {stage: [] for stage in STAGES}
+
+        def call(stage, method, url, data=None):
+            t0 = time.perf_counter()
+            response = getattr(client, method)(url, data, content_type="application/json")
+            timings[stage].append(time.perf_counter() - t0)
+            if not 200 <= response.status_code < 300:
+                raise CommandError(
+                    f"{stage} {url} failed with {response.status_code}: {response.content[:200]!r}"
+                )
+            return response.json()
+
+        try:
+            gen = call("generate", "post", "/api/quiz/generate/", {
+                "category": category.id,
+                "difficulty": "medium",
+                "count": options["count"],
+                "fresh": options["fresh"],
+            })
+            start = call("start", "post", f"/api/quiz/{gen['quiz_id']}/start/")
+            attempt_id = start["attempt"]["id"]
+
+            details = call("details", "get", f"/api/attempt/{attempt_id}/details/")
+            for q in details["questions"]:
+                call("answer", "post", f"/api/attempt/{attempt_id}/answer/", {
+                    "question_id": q["question_id"],
+                    "selected": random.randrange(4),
+                })
+
+            call("finish", "post", f"/api/attempt/{attempt_id}/finish/")
+            return timings, None
+        except Exception as e:
+            return timings, str(e)
+        finally:
+            connection.close()
+
+    # -------- REPORT --------
+    def report(self, results, elapsed):
+        merged = {stage: [] for stage in STAGES}
+        failures = [error for _, error in results if error]
+        for timings, _ in results:
+            for stage in STAGES:
+                merged[stage].extend(timings[stage])
+
+        self.stdout.write(f"{'stage':<10}{'n':>6}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+        for stage in STAGES:
+            samples = sorted(merged[stage])
+            if not samples:
+                continue
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+            self.stdout.write(
+                f"{stage:<10}{len(samples):>6}"
+                f"{statistics.mean(samples) * 1000:>10.1f}"
+                f"{statistics.median(samples) * 1000:>10.1f}"
+                f"{p95 * 1000:>10.1f}"
+                f"{samples[-1] * 1000:>10.1f}"
+            )
+
+        done = len(results) - len(failures)
+        style = self.style.ERROR if failures else self.style.SUCCESS
+        self.stdout.write(style(
+            f"{done} pipelines completed, {len(failures)} failed in {elapsed:.2f}s "
+            f"({done / elapsed if elapsed else 0:.2f} pipelines/s)."
+        ))
+        for error in failures[:5]:
+            self.stdout.write(self.style.ERROR(f"  {error}"))
+        if failures:
+            # timings of failed requests say nothing about the pipeline
+            raise CommandError(f"{len(failures)} of {len(results)} pipelines failed.")
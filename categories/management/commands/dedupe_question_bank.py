@@ -0,0 +1,210 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, When
+
+from quiz.models import (
+    QuestionTemplate,
+    QuizQuestion,
+    QuestionAttempt,
+    QuestionSignature,
+    QuestionSignatureBucket,
+)
+from quiz.dedup import normalize, signature, similarity, bucket_keys, DUPLICATE_THRESHOLD
+from quiz.answer_keys import invalidate_for_templates
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge near-duplicate question templates within each pool (category, "
+        "subcategory, difficulty) in one pass and rebuild the MinHash/LSH "
+        "similarity index. The oldest template is kept; "
+        "quiz questions and answers pointing at a duplicate are moved onto it. "
+        "Copies whose choices or correct answer differ from it are left alone."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threshold", type=float, default=DUPLICATE_THRESHOLD,
+                            help="Estimated Jaccard similarity above which two questions are merged.")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Report duplicates without changing anything.")
+
+    def handle(self, *args, **options):
+        threshold = options["threshold"]
+
+        index = {}        # (pool, bucket key) -> [(template_id, sig, answer)]
+        kept = []         # (template_id, sig, keys) for the rebuilt index
+        duplicates = {}   # duplicate id -> canonical id
+        choice_maps = {}  # duplicate id -> (its choice indexes on the canonical, canonical's correct)
+
+        rows = (
+            QuestionTemplate.objects
+            .order_by("created_at")
+            .values_list(
+                "id", "category_id", "subcategory_id", "difficulty",
+                "question_text", "choices", "correct_choice",
+            )
+        )
+        for template_id, category_id, subcategory_id, difficulty, text, choices, correct in (
+            rows.iterator(chunk_size=2000)
+        ):
+            template_id = str(template_id)
+            sig = signature(text, choices or [])
+            answer = ([normalize(c) for c in choices or []], correct)
+            keys = bucket_keys(sig, category_id)
+            # only merge within a pool, as store_questions does
+            pool = (category_id, subcategory_id, difficulty)
+
+            canonical, best = None, threshold
+            for key in keys:
+                for other_id, other_sig, other_answer in index.get((pool, key), ()):
+                    score = similarity(sig, other_sig)
+                    if score < best:
+                        continue
+                    # merge only if every answer keeps its meaning on the canonical
+                    choice_map = self.choice_map(answer, other_answer)
+                    if choice_map is not None:
+                        canonical, best = other_id, score
+                        choice_maps[template_id] = (choice_map, other_answer[1])
+
+            if canonical:
+                duplicates[template_id] = canonical
+                continue
+
+            kept.append((template_id, sig, keys))
+            for key in keys:
+                index.setdefault((pool, key), []).append((template_id, sig, answer))
+
+        self.stdout.write(
+            f"Scanned {len(kept) + len(duplicates)} templates: "
+            f"{len(duplicates)} near-duplicates, {len(kept)} unique."
+        )
+
+        if options["dry_run"]:
+            return
+
+        with transaction.atomic():
+            # cached answer keys still point at the duplicates being moved
+            invalidate_for_templates(list(duplicates))
+            # a quiz or attempt may hold a duplicate and its canonical (or two
+            # duplicates of it): one row survives, the unique constraints
+            # allow no more. Attempts keep an answered row over an unanswered one.
+            moved_quizzes, _ = self.remap(
+                QuizQuestion.objects, "quiz_id", "template_id", duplicates, "position"
+            )
+            self.translate_answers(choice_maps)
+            _, dropped_answers = self.remap(
+                QuestionAttempt.objects, "quiz_attempt_id", "question_id", duplicates,
+                Case(When(selected_choice=-1, then=1), default=0), "id",
+            )
+
+            dup_ids = list(duplicates)
+            for start in range(0, len(dup_ids), 500):
+                QuestionTemplate.objects.filter(id__in=dup_ids[start:start + 500]).delete()
+
+            QuestionSignatureBucket.objects.all().delete()
+            QuestionSignature.objects.all().delete()
+
+            QuestionSignature.objects.bulk_create(
+                [QuestionSignature(template_id=tid, minhash=sig) for tid, sig, _ in kept],
+                batch_size=1000,
+            )
+            QuestionSignatureBucket.objects.bulk_create(
+                [
+                    QuestionSignatureBucket(signature_id=tid, bucket=key)
+                    for tid, _, keys in kept
+                    for key in keys
+                ],
+                batch_size=5000,
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {len(duplicates)} duplicates, updated {moved_quizzes} quizzes, "
+            f"indexed {len(kept)} templates."
+        ))
+        if dropped_answers:
+            self.stdout.write(self.style.WARNING(
+                f"Dropped {dropped_answers} answers to a second copy of a question; "
+                "run `manage.py rebuild_attempt_counters`."
+            ))
+
+    @staticmethod
+    def choice_map(answer, canonical_answer):
+        """
+        Where each choice of a duplicate sits on the canonical template,
+        or None if the choices don't match by text or the correct answer
+        differs (merging would change past answers or scores).
+        """
+        choices, correct = answer
+        canonical_choices, canonical_correct = canonical_answer
+        if len(set(choices)) != len(choices) or sorted(choices) != sorted(canonical_choices):
+            return None
+        choice_map = [canonical_choices.index(c) for c in choices]
+        if not 0 <= correct < len(choice_map) or choice_map[correct] != canonical_correct:
+            return None
+        return choice_map
+
+    def translate_answers(self, choice_maps):
+        """
+        Rewrite answers to duplicates whose choices are in a different
+        order, so they point at the same choice text once moved onto the
+        canonical, and grade them against the canonical's correct choice.
+        """
+        reordered = {
+            dup_id: mapping for dup_id, mapping in choice_maps.items()
+            if mapping[0] != sorted(mapping[0])
+        }
+        if not reordered:
+            return
+
+        by_answer = {}    # (selected, is_correct) -> [answer pk]
+        for pk, question_id, selected in (
+            QuestionAttempt.objects
+            .filter(question_id__in=list(reordered), selected_choice__gte=0)
+            .values_list("pk", "question_id", "selected_choice")
+            .iterator(chunk_size=2000)
+        ):
+            choice_map, correct = reordered[str(question_id)]
+            if selected < len(choice_map):
+                selected = choice_map[selected]
+                by_answer.setdefault((selected, selected == correct), []).append(pk)
+
+        for (selected, is_correct), pks in by_answer.items():
+            for start in range(0, len(pks), 500):
+                QuestionAttempt.objects.filter(pk__in=pks[start:start + 500]).update(
+                    selected_choice=selected, is_correct=is_correct,
+                )
+
+    def remap(self, rows, owner, field, duplicates, *preference):
+        """
+        Point `field` of `rows` from duplicates to their canonical, keeping
+        the first row per (owner, canonical) in `preference` order and
+        deleting the rest. Returns (owners changed, rows deleted).
+        """
+        if not duplicates:
+            return 0, 0
+
+        involved = list(duplicates) + list(set(duplicates.values()))
+        kept, moved, dropped, owners = set(), {}, [], set()
+        for pk, owner_id, template_id in (
+            rows.filter(**{f"{field}__in": involved})
+            .order_by(owner, *preference)
+            .values_list("pk", owner, field)
+            .iterator(chunk_size=2000)
+        ):
+            template_id = str(template_id)
+            canonical = duplicates.get(template_id, template_id)
+            if (owner_id, canonical) in kept:
+                dropped.append(pk)
+                owners.add(owner_id)
+                continue
+            kept.add((owner_id, canonical))
+            if canonical != template_id:
+                moved.setdefault(canonical, []).append(pk)
+                owners.add(owner_id)
+
+        # deletes first, so no move collides with a row that is going away
+        for start in range(0, len(dropped), 500):
+            rows.filter(pk__in=dropped[start:start + 500]).delete()
+        for canonical, pks in moved.items():
+            rows.filter(pk__in=pks).update(**{field: canonical})
+        return len(owners), len(dropped)
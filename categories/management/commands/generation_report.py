@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+
+from quiz.generate_quiz import MAX_TOKENS, QUESTIONS_PER_CHUNK
+from quiz.telemetry import GROUP_FIELDS, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        "Summarise generation telemetry (latency split, token usage, "
+        "rejection rates and reasons) grouped by model, topic and difficulty."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=7)
+        parser.add_argument("--group-by", default="model,topic,difficulty",
+                            help=f"Comma-separated fields from: {', '.join(GROUP_FIELDS)}.")
+
+    def handle(self, *args, **options):
+        group_by = options["group_by"].split(",")
+        report = summarize(days=options["days"], group_by=group_by)
+        if not report:
+            self.stdout.write(f"No generation metrics in the last {options['days']} days.")
+            return
+
+        group_by = [f for f in group_by if f in GROUP_FIELDS] or ["model"]
+        self.stdout.write(
+            f"{'group':<40}{'calls':>6}{'cache':>6}{'err':>5}{'trunc':>6}"
+            f"{'accept':>8}{'reject':>8}{'tok/q':>7}{'max tok':>8}"
+            f"{'queue':>7}{'net':>7}{'parse':>7}"
+        )
+        for row in report:
+            label = " / ".join(str(row[f]) for f in group_by)[:39]
+            tokens_per_q = row["tokens_per_question"]
+            self.stdout.write(
+                f"{label:<40}{row['calls']:>6}{row['cache_hits']:>6}{row['errors']:>5}"
+                f"{row['truncated_calls']:>6}{row['acceptance_rate']:>8.1%}{row['rejection_rate']:>8.1%}"
+                f"{tokens_per_q if tokens_per_q is not None else '-':>7}"
+                f"{row['max_completion_tokens'] or 0:>8}"
+                f"{row['avg_queue_ms']:>7.0f}{row['avg_network_ms']:>7.0f}{row['avg_parse_ms']:>7.0f}"
+            )
+            if row["rejection_reasons"]:
+                reasons = ", ".join(
+                    f"{reason}={n}" for reason, n in
+                    sorted(row["rejection_reasons"].items(), key=lambda item: -item[1])
+                )
+                self.stdout.write(f"    rejected: {reasons}")
+
+        # sizing hint: what a chunk of QUESTIONS_PER_CHUNK actually needs
+        measured = [r["tokens_per_question"] for r in report if r["tokens_per_question"]]
+        if measured:
+            worst = max(measured)
+            self.stdout.write(
+                f"\nHighest tokens/question: {worst}. A chunk of {QUESTIONS_PER_CHUNK} "
+                f"needs ~{round(worst * QUESTIONS_PER_CHUNK)} completion tokens "
+                f"(MAX_TOKENS is {MAX_TOKENS})."
+            )
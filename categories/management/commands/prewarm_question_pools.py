@@ -0,0 +1,136 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from categories.models import Category
+from quiz.models import QuestionTemplate, Subcategory, DIFFICULTY_CHOICES
+from quiz.generate_quiz import fetch_questions
+from quiz.persistence import store_questions
+from quiz.telemetry import flush as flush_metrics
+
+
+class Command(BaseCommand):
+    help = (
+        "Top up QuestionTemplate pools to a target depth for every "
+        "(category, subcategory, difficulty). Safe to re-run: stock is "
+        "re-counted on start, so an interrupted run resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--depth", type=int, default=30,
+                            help="Target number of questions per topic and difficulty.")
+        parser.add_argument("--workers", type=int, default=4,
+                            help="Maximum concurrent LLM calls.")
+        parser.add_argument("--batch", type=int, default=10,
+                            help="Questions requested per LLM call.")
+        parser.add_argument("--rounds", type=int, default=3,
+                            help="Passes to make when the LLM returns fewer questions than asked.")
+        parser.add_argument("--category", default=None,
+                            help="Only warm this category (slug).")
+
+    # -------- TOPICS --------
+    def topics(self, category_slug):
+        categories = Category.objects.all()
+        if category_slug:
+            categories = categories.filter(slug=category_slug)
+
+        subcategories = {}
+        for sub in Subcategory.objects.filter(category__in=categories).select_related("category"):
+            subcategories.setdefault(sub.category_id, []).append(sub)
+
+        for category in categories:
+            yield category, None
+            for sub in subcategories.get(category.id, []):
+                yield category, sub
+
+    # -------- STOCK --------
+    def current_stock(self):
+        rows = (
+            QuestionTemplate.objects
+            .values("category_id", "subcategory_id", "difficulty")
+            .annotate(n=Count("id"))
+        )
+        return {
+            (r["category_id"], r["subcategory_id"], r["difficulty"]): r["n"]
+            for r in rows
+        }
+
+    def plan(self, topics, depth, batch):
+        stock = self.current_stock()
+        tasks = []
+        for category, sub in topics:
+            for difficulty, _ in DIFFICULTY_CHOICES:
+                key = (category.id, sub.id if sub else None, difficulty)
+                missing = depth - stock.get(key, 0)
+                while missing > 0:
+                    n = min(batch, missing)
+                    tasks.append((category, sub, difficulty, n))
+                    missing -= n
+        return tasks
+
+    # -------- RUN --------
+    def handle(self, *args, **options):
+        topics = list(self.topics(options["category"]))
+        self.stdout.write(f"Warming {len(topics)} topics to depth {options['depth']}.")
+
+        stored = 0
+        seen = set()
+        started = time.monotonic()
+        started_at = timezone.now()
+
+        for round_no in range(1, options["rounds"] + 1):
+            tasks = self.plan(topics, options["depth"], options["batch"])
+            if not tasks:
+                break
+
+            self.stdout.write(f"Round {round_no}: {len(tasks)} generation calls.")
+            round_ids = set()
+
+            executor = ThreadPoolExecutor(max_workers=options["workers"])
+            try:
+                futures = {
+                    executor.submit(
+                        fetch_questions,
+                        sub.name if sub else category.name,
+                        difficulty,
+                        n,
+                        use_cache=False,
+                    ): (category, sub, difficulty)
+                    for category, sub, difficulty, n in tasks
+                }
+
+                # persist on the main thread as each call lands, so an
+                # interrupted run keeps everything finished so far
+                for future in as_completed(futures):
+                    category, sub, difficulty = futures[future]
+                    questions = future.result()
+                    flush_metrics()
+                    if not questions:
+                        continue
+                    round_ids.update(store_questions(questions, category, sub, difficulty))
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+            # near-duplicates resolve to templates that were already in
+            # the bank; only count ids this run created, not other traffic
+            round_ids -= seen
+            seen |= round_ids
+            round_stored = (
+                QuestionTemplate.objects
+                .filter(id__in=round_ids, created_at__gte=started_at)
+                .count()
+            )
+
+            stored += round_stored
+            if not round_stored:
+                self.stdout.write(self.style.WARNING("No questions stored this round; stopping."))
+                break
+
+        elapsed = time.monotonic() - started
+        rate = stored / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {stored} questions in {elapsed:.1f}s ({rate:.2f} questions/s)."
+        ))
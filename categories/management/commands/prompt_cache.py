@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.prompt_cache import get_prompt_cache
+
+
+class Command(BaseCommand):
+    help = "Show stats for the LLM completion cache, or clear it."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clear", action="store_true",
+                            help="Delete every cached completion.")
+
+    def handle(self, *args, **options):
+        cache = get_prompt_cache()
+        if cache is None:
+            raise CommandError("The prompt cache is disabled (QUIZ_PROMPT_CACHE).")
+
+        if options["clear"]:
+            cache.clear()
+            self.stdout.write(self.style.SUCCESS(f"Cleared {cache.path}."))
+            return
+
+        stats = cache.stats()
+        self.stdout.write(f"Cache file: {cache.path}")
+        self.stdout.write(
+            f"{stats['entries']} completions for {stats['keys']} prompts, "
+            f"{stats['bytes_stored'] / 1024:.1f} KiB of {stats['max_bytes'] / 1024:.0f} KiB, "
+            f"{stats['variants']} variant(s) per prompt."
+        )
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+
+from quiz.models import QuizAttempt, QuestionAttempt
+from quiz.persistence import COUNTED_DIFFICULTIES, UNANSWERED
+
+COUNTER_FIELDS = ["question_count", "answered_count", "correct_count"] + [
+    f"{d}_{kind}" for d in COUNTED_DIFFICULTIES for kind in ("count", "correct")
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the running counters on QuizAttempt from QuestionAttempt "
+        "rows (for attempts created before the counters existed, or to repair drift)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        aggregates = {
+            "question_count": Count("id"),
+            "answered_count": Count("id", filter=~Q(selected_choice=UNANSWERED)),
+            "correct_count": Count("id", filter=Q(is_correct=True)),
+        }
+        for d in COUNTED_DIFFICULTIES:
+            aggregates[f"{d}_count"] = Count("id", filter=Q(difficulty=d))
+            aggregates[f"{d}_correct"] = Count("id", filter=Q(difficulty=d, is_correct=True))
+
+        attempt_ids = list(QuizAttempt.objects.order_by("started_at").values_list("id", flat=True))
+        updated = 0
+
+        for start in range(0, len(attempt_ids), batch_size):
+            ids = attempt_ids[start:start + batch_size]
+            # one grouped query per batch; attempts with no rows stay at zero
+            counts = {
+                row.pop("quiz_attempt_id"): row
+                for row in (
+                    QuestionAttempt.objects
+                    .filter(quiz_attempt_id__in=ids)
+                    .values("quiz_attempt_id")
+                    .annotate(**aggregates)
+                    .order_by()
+                )
+            }
+
+            attempts = []
+            for attempt_id in ids:
+                row = counts.get(attempt_id, {})
+                attempt = QuizAttempt(id=attempt_id)
+                for field in COUNTER_FIELDS:
+                    setattr(attempt, field, row.get(field, 0))
+                attempts.append(attempt)
+
+            with transaction.atomic():
+                QuizAttempt.objects.bulk_update(attempts, COUNTER_FIELDS)
+            updated += len(attempts)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt counters for {updated} attempts."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from quiz.leaderboard import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the LeaderboardEntry rollup from completed attempts "
+        "(after upgrading, deleting attempts, or to repair drift)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        entries = rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {entries} leaderboard entries."))
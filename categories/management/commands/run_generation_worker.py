@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from quiz.jobs import claim_next_job, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Process queued quiz generation jobs (run one or more alongside the web workers)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--poll-interval", type=float, default=1.0,
+                            help="Seconds to sleep when the queue is empty.")
+        parser.add_argument("--stale-after", type=int, default=600,
+                            help="Requeue jobs left running for longer than this many seconds.")
+        parser.add_argument("--requeue-interval", type=float, default=60.0,
+                            help="Seconds between checks for stale jobs while polling.")
+        parser.add_argument("--once", action="store_true",
+                            help="Drain the queue and exit instead of polling forever.")
+
+    def requeue(self, stale_after):
+        requeued = requeue_stale_jobs(stale_after)
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Requeued {requeued} stale jobs."))
+
+    def handle(self, *args, **options):
+        self.stdout.write("Generation worker started.")
+
+        processed = 0
+        next_requeue = time.monotonic()
+        while True:
+            close_old_connections()
+            # a worker that dies mid-job leaves it running; any live worker
+            # puts it back, not just the next one to start
+            if time.monotonic() >= next_requeue:
+                self.requeue(options["stale_after"])
+                next_requeue = time.monotonic() + options["requeue_interval"]
+
+            job = claim_next_job()
+
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+                continue
+
+            job = run_job(job)
+            processed += 1
+
+            if job.status == "done":
+                self.stdout.write(f"Job {job.id} done -> quiz {job.quiz_id}")
+            else:
+                self.stdout.write(self.style.ERROR(f"Job {job.id} failed: {job.error}"))
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} jobs."))
@@ -1,6 +1,7 @@
 # core/settings.py
 
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -57,6 +58,8 @@ MIDDLEWARE = [
 ]
 
 CORS_ALLOW_ALL_ORIGINS = True
+# pagination cursors (leaderboard) travel in response headers
+CORS_EXPOSE_HEADERS = ["Link", "X-Next-Cursor"]
 
 ROOT_URLCONF = "core.urls"
 
@@ -117,6 +120,102 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # print("OPENAI_API_KEY:", os.getenv("OPENAI_API_KEY"))
 print("GROQ_API_KEY:", os.getenv("GROQ_API_KEY"))
 
+# -------------------------
+# Quiz generation
+# -------------------------
+# LLM backend: "groq", "openai" or "fake" (deterministic, offline; for
+# load tests and benchmarks). QUIZ_LLM_MODEL overrides the adapter default.
+QUIZ_LLM_PROVIDER = os.getenv("QUIZ_LLM_PROVIDER", "groq")
+QUIZ_LLM_MODEL = os.getenv("QUIZ_LLM_MODEL") or None
+QUIZ_FAKE_LLM_LATENCY = float(os.getenv("QUIZ_FAKE_LLM_LATENCY", "0"))
+QUIZ_FAKE_LLM_FAILURE_RATE = float(os.getenv("QUIZ_FAKE_LLM_FAILURE_RATE", "0"))
+
+# Build quizzes from existing QuestionTemplate rows first and only ask the
+# LLM for the shortfall. Clients can still force fresh questions per request.
+QUIZ_BANK_FIRST = os.getenv("QUIZ_BANK_FIRST", "True").lower() in ("1", "true")
+
+# Identical concurrent generate requests share one LLM call.
+# "process" coalesces threads within a worker; "file" also coalesces
+# across gunicorn workers on the same host via lock files in the dir below.
+QUIZ_SINGLEFLIGHT_MODE = os.getenv("QUIZ_SINGLEFLIGHT_MODE", "process")
+QUIZ_SINGLEFLIGHT_DIR = os.getenv(
+    "QUIZ_SINGLEFLIGHT_DIR",
+    os.path.join(tempfile.gettempdir(), "quizgen-singleflight"),
+)
+
+# Provider guard: token buckets for requests and tokens per minute (0
+# disables a limit; requests wait up to QUIZ_LLM_THROTTLE_WAIT seconds for
+# room) and a circuit breaker that fails fast for QUIZ_LLM_BREAKER_RESET
+# seconds after QUIZ_LLM_BREAKER_THRESHOLD consecutive errors. While it is
+# open quizzes are filled from the question bank. "file" mode shares the
+# budget and breaker between workers on the host; "process" does not.
+QUIZ_LLM_RPM = int(os.getenv("QUIZ_LLM_RPM", "30"))
+QUIZ_LLM_TPM = int(os.getenv("QUIZ_LLM_TPM", "0"))
+QUIZ_LLM_THROTTLE_WAIT = float(os.getenv("QUIZ_LLM_THROTTLE_WAIT", "10"))
+QUIZ_LLM_BREAKER_THRESHOLD = int(os.getenv("QUIZ_LLM_BREAKER_THRESHOLD", "5"))
+QUIZ_LLM_BREAKER_RESET = float(os.getenv("QUIZ_LLM_BREAKER_RESET", "30"))
+QUIZ_LLM_GUARD_MODE = os.getenv("QUIZ_LLM_GUARD_MODE", "file")
+QUIZ_LLM_GUARD_DIR = os.getenv(
+    "QUIZ_LLM_GUARD_DIR",
+    os.path.join(tempfile.gettempdir(), "quizgen-llm-guard"),
+)
+
+# Disk cache of raw completions keyed by provider, model, temperature and
+# the rendered prompt (SQLite, no extra service). On by default in DEBUG so
+# dev and CI replays never reach the provider. With VARIANTS > 1 a prompt is
+# sent to the LLM until that many completions are stored, then one of them
+# is picked at random so repeated quizzes still differ.
+QUIZ_PROMPT_CACHE = os.getenv("QUIZ_PROMPT_CACHE", str(DEBUG)).lower() in ("1", "true")
+QUIZ_PROMPT_CACHE_PATH = os.getenv(
+    "QUIZ_PROMPT_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "quizgen-prompt-cache.sqlite3"),
+)
+QUIZ_PROMPT_CACHE_TTL = int(os.getenv("QUIZ_PROMPT_CACHE_TTL", str(7 * 24 * 3600)))
+QUIZ_PROMPT_CACHE_MAX_BYTES = int(os.getenv("QUIZ_PROMPT_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+QUIZ_PROMPT_CACHE_VARIANTS = int(os.getenv("QUIZ_PROMPT_CACHE_VARIANTS", "1"))
+
+# One GenerationMetric row per provider call: queue/network/parse time,
+# token usage and validation rejects. See `manage.py generation_report`.
+QUIZ_GENERATION_METRICS = os.getenv("QUIZ_GENERATION_METRICS", "True").lower() in ("1", "true")
+
+# Generation diagnostics (provider errors, circuit open, fan-out deadline,
+# salvaged JSON) go to the "quiz" logger on the console.
+QUIZ_LOG_LEVEL = os.getenv("QUIZ_LOG_LEVEL", "INFO")
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {"quiz": {"handlers": ["console"], "level": QUIZ_LOG_LEVEL}},
+}
+
+# Per-attempt answer keys (correct index + difficulty per question) are
+# built at start and kept in the Django cache so grading never reads
+# QuestionTemplate. The default file cache is shared by all workers on the
+# host, so a template edit invalidates the key everywhere; "locmem" is
+# per-process and only safe with a single worker.
+QUIZ_CACHE_BACKEND = os.getenv("QUIZ_CACHE_BACKEND", "file")
+QUIZ_CACHE_DIR = os.getenv(
+    "QUIZ_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "quiz-django-cache"),
+)
+if QUIZ_CACHE_BACKEND == "locmem":
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": QUIZ_CACHE_DIR,
+        }
+    }
+QUIZ_ANSWER_KEY_TTL = int(os.getenv("QUIZ_ANSWER_KEY_TTL", str(3 * 3600)))
+
+# Dashboard, progress, analytics and leaderboard responses are cached in
+# the same cache under version counters that finishing (and, for the
+# dashboard, starting) an attempt bumps; clients get ETags and 304s. The
+# TTL only bounds how long unreachable old versions linger.
+QUIZ_RESPONSE_CACHE = os.getenv("QUIZ_RESPONSE_CACHE", "True").lower() in ("1", "true")
+QUIZ_RESPONSE_CACHE_TTL = int(os.getenv("QUIZ_RESPONSE_CACHE_TTL", "300"))
+
 
 
 # GOOGLE LOGIN KEYS (FOR YOUR CUSTOM AUTH)
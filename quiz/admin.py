@@ -1,9 +1,11 @@
 from django.contrib import admin
-from .models import Subcategory, QuestionTemplate, Quiz, QuizAttempt,QuestionAttempt
+from .models import Subcategory, QuestionTemplate, Quiz, QuizAttempt,QuestionAttempt, GenerationJob, GenerationMetric
 
 # admin.site.register(Category)
 admin.site.register(Subcategory)
 admin.site.register(QuestionTemplate)
 admin.site.register(Quiz)
 admin.site.register(QuizAttempt)
-admin.site.register(QuestionAttempt)
\ No newline at end of file
+admin.site.register(QuestionAttempt)
+admin.site.register(GenerationJob)
+admin.site.register(GenerationMetric)
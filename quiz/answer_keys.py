@@ -0,0 +1,129 @@
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import QuizAttempt, QuestionAttempt
+
+DIFFICULTY_CODES = ("easy", "medium", "hard")
+
+
+# ============================================================
+# ANSWER KEY (ONE PER ATTEMPT)
+# ============================================================
+
+class AnswerKey:
+    """
+    Everything needed to grade an attempt without touching QuestionTemplate:
+    the owner, and for each question its correct index and difficulty.
+
+    Question ids are kept sorted so a lookup is a binary search; the
+    per-question values live in two byte arrays at the same positions,
+    which keeps the pickled record small in the cache.
+    """
+    __slots__ = ("user_id", "ids", "correct", "difficulty")
+
+    def __init__(self, user_id, ids, correct, difficulty):
+        self.user_id = user_id
+        self.ids = ids
+        self.correct = correct
+        self.difficulty = difficulty
+
+    @classmethod
+    def build(cls, user_id, rows):
+        """rows: (question_id, correct_choice, difficulty) tuples."""
+        rows = sorted((str(qid), correct, difficulty) for qid, correct, difficulty in rows)
+        return cls(
+            user_id,
+            tuple(qid for qid, _, _ in rows),
+            array("b", (correct for _, correct, _ in rows)).tobytes(),
+            bytes(
+                DIFFICULTY_CODES.index(d) if d in DIFFICULTY_CODES else 255
+                for _, _, d in rows
+            ),
+        )
+
+    def _position(self, question_id):
+        question_id = str(question_id)
+        i = bisect_left(self.ids, question_id)
+        return i if i < len(self.ids) and self.ids[i] == question_id else None
+
+    def __contains__(self, question_id):
+        return self._position(question_id) is not None
+
+    def correct_choice(self, question_id):
+        """The correct index, or None if the question isn't in this attempt."""
+        i = self._position(question_id)
+        return None if i is None else array("b", self.correct)[i]
+
+    def difficulty_of(self, question_id):
+        i = self._position(question_id)
+        if i is None or self.difficulty[i] >= len(DIFFICULTY_CODES):
+            return None
+        return DIFFICULTY_CODES[self.difficulty[i]]
+
+    def belongs_to(self, user):
+        return self.user_id == user.id
+
+
+# ============================================================
+# CACHE ACCESS
+# ============================================================
+
+def cache_key(attempt_id):
+    return f"quiz:answer-key:{attempt_id}"
+
+
+def store_answer_key(attempt_id, user_id, rows):
+    key = AnswerKey.build(user_id, rows)
+    cache.set(cache_key(attempt_id), key, settings.QUIZ_ANSWER_KEY_TTL)
+    return key
+
+
+def get_answer_key(attempt_id):
+    """
+    The cached key for an attempt, rebuilt from the database on a miss
+    (expired, evicted or invalidated). None if the attempt doesn't exist.
+    """
+    key = cache.get(cache_key(attempt_id))
+    if key is not None:
+        return key
+
+    user_id = (
+        QuizAttempt.objects
+        .filter(id=attempt_id)
+        .values_list("user_id", flat=True)
+        .first()
+    )
+    if user_id is None:
+        return None
+
+    rows = (
+        QuestionAttempt.objects
+        .filter(quiz_attempt_id=attempt_id)
+        .values_list("question_id", "question__correct_choice", "question__difficulty")
+    )
+    return store_answer_key(attempt_id, user_id, rows)
+
+
+def invalidate_for_templates(template_ids):
+    """
+    Drop the cached keys of unfinished attempts that include any of these
+    templates, so an edited answer is picked up on the next grade.
+
+    The attempts are looked up now but the keys are deleted once the
+    surrounding transaction commits; deleting earlier would let a
+    concurrent grade rebuild the key from the old, still committed rows.
+    """
+    attempt_ids = list(
+        QuestionAttempt.objects
+        .filter(question_id__in=template_ids, quiz_attempt__completed=False)
+        .values_list("quiz_attempt_id", flat=True)
+        .distinct()
+    )
+    if attempt_ids:
+        transaction.on_commit(
+            lambda: cache.delete_many([cache_key(a) for a in attempt_ids])
+        )
@@ -0,0 +1,135 @@
+import hashlib
+import random
+import re
+
+from .models import QuestionSignature, QuestionSignatureBucket
+
+
+# ============================================================
+# MINHASH / LSH PARAMETERS
+# ============================================================
+# 32 permutations split into 8 bands of 4 rows: two questions land in a
+# shared bucket with ~50% probability at Jaccard 0.55 and ~98% at 0.8.
+# Candidates are then confirmed against the full signature.
+
+NUM_PERM = 32
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+DUPLICATE_THRESHOLD = 0.75
+
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 63) - 1
+
+_rng = random.Random(2024)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME))
+    for _ in range(NUM_PERM)
+]
+
+
+def _hash64(value):
+    return int.from_bytes(
+        hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big"
+    )
+
+
+def normalize(text):
+    return re.sub(r"[^a-z0-9]+", " ", str(text).lower()).strip()
+
+
+def shingles(question_text, choices):
+    """
+    Character shingles over the normalized question plus its choices.
+    Choices are sorted so a reshuffled answer list still matches.
+    """
+    text = " ".join([normalize(question_text)] + sorted(normalize(c) for c in choices))
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def signature(question_text, choices):
+    hashes = [_hash64(s) for s in shingles(question_text, choices)]
+    return [
+        min((a * h + b) % _PRIME for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def bucket_keys(sig, category_id):
+    """
+    One key per LSH band. The category is folded into the key so a
+    lookup only ever touches candidates from the same category.
+    """
+    keys = []
+    for band in range(BANDS):
+        rows = sig[band * ROWS:(band + 1) * ROWS]
+        raw = f"{category_id}:{band}:" + ",".join(map(str, rows))
+        keys.append(_hash64(raw) & _MASK)
+    return keys
+
+
+# ============================================================
+# INDEX OPERATIONS
+# ============================================================
+
+def _best_match(sig, candidates, threshold):
+    best_id, best_score = None, threshold
+    for template_id, minhash in candidates:
+        score = similarity(sig, minhash)
+        if score >= best_score:
+            best_id, best_score = template_id, score
+    return best_id
+
+
+def find_near_duplicate(sig, category_id, subcategory_id, difficulty, threshold=DUPLICATE_THRESHOLD):
+    """
+    Return the template id of an indexed near-duplicate in the same pool
+    (category, subcategory and difficulty), or None. A single indexed
+    lookup on the bucket table.
+    """
+    return find_near_duplicates([sig], category_id, subcategory_id, difficulty, threshold)[0]
+
+
+def find_near_duplicates(sigs, category_id, subcategory_id, difficulty, threshold=DUPLICATE_THRESHOLD):
+    """
+    Batch form of find_near_duplicate: one query for the whole batch,
+    returning a template id (or None) per signature.
+    """
+    if not sigs:
+        return []
+
+    keys = {key for sig in sigs for key in bucket_keys(sig, category_id)}
+    # buckets span the whole category, so candidates from other pools are
+    # filtered out; one sharing several bands comes back once per band
+    candidates = dict(
+        QuestionSignature.objects
+        .filter(
+            buckets__bucket__in=keys,
+            template__subcategory_id=subcategory_id,
+            template__difficulty=difficulty,
+        )
+        .values_list("template_id", "minhash")
+    ).items()
+    return [_best_match(sig, candidates, threshold) for sig in sigs]
+
+
+def index_questions(templates, sigs):
+    """
+    Add freshly inserted templates to the index with two bulk INSERTs.
+    """
+    QuestionSignature.objects.bulk_create([
+        QuestionSignature(template_id=qt.id, minhash=sig)
+        for qt, sig in zip(templates, sigs)
+    ])
+    QuestionSignatureBucket.objects.bulk_create([
+        QuestionSignatureBucket(signature_id=qt.id, bucket=key)
+        for qt, sig in zip(templates, sigs)
+        for key in bucket_keys(sig, qt.category_id)
+    ])
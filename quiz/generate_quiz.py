@@ -1,31 +1,144 @@
+import logging
 import os
-import json
 import re
-from groq import Groq
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+from .llm_json import QuestionStreamParser, salvage_questions
+from .prompt_cache import get_prompt_cache
+from .telemetry import GenerationTrace, flush as flush_metrics
+from .singleflight import get_flight
+from .providers import get_provider
+from .throttle import CircuitOpen, Throttled, get_guard
 
+logger = logging.getLogger(__name__)
 
-def extract_json(text):
+# Completion budget per call. One question (text, 4 choices, explanation)
+# comes back as roughly 120-150 tokens; the JSON wrapper adds a little.
+MAX_TOKENS = 1200
+TOKENS_PER_QUESTION = 150
+WRAPPER_TOKENS = 60
+QUESTIONS_PER_CHUNK = max(1, (MAX_TOKENS - WRAPPER_TOKENS) // TOKENS_PER_QUESTION)
+
+# Fan-out for larger counts: chunks run concurrently and whatever has
+# finished by the deadline is returned.
+FANOUT_WORKERS = 8
+FANOUT_DEADLINE = 30
+
+# Part of the prompt cache key, so keep it in one place.
+TEMPERATURE = 0.6
+
+
+def split_chunks(count, size=QUESTIONS_PER_CHUNK):
+    """
+    Split `count` into chunk sizes that each fit the token budget,
+    e.g. 20 -> [7, 7, 6].
+    """
+    parts = -(-count // size)
+    base, extra = divmod(count, parts)
+    return [base + 1 if i < extra else base for i in range(parts)]
+
+
+def normalize_question(text):
+    return re.sub(r"[^a-z0-9]+", " ", text.lower()).strip()
+
+
+def generate_questions(topic, difficulty, count, origin_hint="", deadline=FANOUT_DEADLINE,
+                       use_cache=True):
     """
-    Safely extract first valid JSON object from text
+    Generate questions for user-facing requests. Identical concurrent
+    requests (same topic, difficulty, count and hint) share one LLM call.
+    use_cache=False (a client asking for fresh questions) skips the
+    prompt cache, and only shares a call with other fresh requests.
     """
+    provider = get_provider()
+    key = (provider.name, topic, difficulty, count, origin_hint, use_cache)
     try:
-        start = text.index("{")
-        end = text.rindex("}") + 1
-        return json.loads(text[start:end])
-    except Exception:
-        return None
+        return get_flight().do(
+            key, fetch_questions, topic, difficulty, count, origin_hint, deadline, provider,
+            use_cache,
+        )
+    finally:
+        flush_metrics()
 
 
-def generate_questions(topic, difficulty, count, origin_hint=""):
-    if not os.getenv("GROQ_API_KEY"):
-        print("GROQ_API_KEY not set")
+def fetch_questions(topic, difficulty, count, origin_hint="", deadline=FANOUT_DEADLINE,
+                    provider=None, use_cache=True):
+    """
+    Uncoalesced generation; callers that deliberately want several
+    independent batches for the same topic (pool warming) use this,
+    with use_cache=False so each batch is a fresh completion. Telemetry
+    is buffered; callers write it with telemetry.flush().
+    """
+    provider = provider or get_provider()
+    if not provider.available():
+        logger.warning("LLM provider %r is not configured", provider.name)
+        return []
+    if get_guard(provider.name).breaker.is_open():
+        # fail fast; callers fall back to the question bank
+        logger.warning("LLM provider %r circuit is open", provider.name)
         return []
 
+    if count <= QUESTIONS_PER_CHUNK:
+        return generate_chunk(
+            topic, difficulty, count, origin_hint, provider=provider, use_cache=use_cache
+        )
+
+    return generate_fanout(topic, difficulty, count, origin_hint, deadline, provider, use_cache)
+
+
+def generate_fanout(topic, difficulty, count, origin_hint="", deadline=FANOUT_DEADLINE,
+                    provider=None, use_cache=True):
+    """
+    Request `count` questions as parallel chunks and merge them.
+
+    Latency is bounded by the slowest chunk (or `deadline`), not by
+    `count`. Chunks still running at the deadline are abandoned and the
+    questions from finished chunks are returned, de-duplicated by
+    normalized question text.
+    """
+    sizes = split_chunks(count)
+
+    executor = ThreadPoolExecutor(max_workers=min(FANOUT_WORKERS, len(sizes)))
+    try:
+        futures = [
+            executor.submit(
+                generate_chunk, topic, difficulty, n, origin_hint, (part, len(sizes)),
+                provider, use_cache,
+            )
+            for part, n in enumerate(sizes, start=1)
+        ]
+        done, not_done = wait(futures, timeout=deadline)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if not_done:
+        logger.warning("Fan-out deadline hit: %d/%d chunks dropped", len(not_done), len(futures))
+
+    merged = []
+    seen = set()
+    for future in futures:
+        if future not in done or future.exception():
+            continue
+        for q in future.result():
+            key = normalize_question(q["question"])
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(q)
+
+    return merged[:count]
+
+
+def build_prompt(topic, difficulty, count, origin_hint="", part=None):
     context = f"\nIMPORTANT: {origin_hint}\n" if origin_hint else ""
+    if part:
+        context += (
+            f"\nThis is batch {part[0]} of {part[1]}. Cover a different aspect "
+            f"of the topic than the other batches.\n"
+        )
 
-    prompt = f"""
+    return f"""
 Generate {count} multiple-choice questions for "{topic}"
 Difficulty: {difficulty}
 {context}
@@ -50,47 +163,224 @@ FORMAT:
 }}
 """
 
+
+def question_problem(q):
+    """
+    Why a parsed question can't be used, or None if it is fine.
+    The reason strings are what generation telemetry counts.
+    """
+    if not isinstance(q, dict):
+        return "not_an_object"
+    if not q.get("question"):
+        return "missing_question"
+    if not isinstance(q.get("choices"), list):
+        return "choices_not_list"
+    if len(q["choices"]) != 4:
+        return "wrong_choice_count"
     try:
-        response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": "Return ONLY valid JSON"},
-                {"role": "user", "content": prompt},
-            ],
-            max_tokens=1200,
-            temperature=0.6,
-        )
+        index = int(q["correct_choice_index"])
+    except (KeyError, TypeError, ValueError):
+        return "bad_correct_index"
+    if not 0 <= index <= 3:
+        return "correct_index_out_of_range"
+    return None
 
-        raw = response.choices[0].message.content
-        data = extract_json(raw)
 
-        if not data or "questions" not in data:
-            print("Invalid JSON from Groq:", raw)
-            return []
+def clean_question(q, trace=None):
+    """
+    Validate one parsed question and normalise its shape.
+    Returns None when the question should be dropped.
+    """
+    problem = question_problem(q)
+    if problem:
+        if trace:
+            trace.reject(problem)
+        return None
+
+    return {
+        "question": q["question"],
+        "choices": q["choices"],
+        "correct_choice_index": int(q["correct_choice_index"]),
+        "explanation": q.get("explanation", ""),
+        "references": q.get("references", []),
+    }
+
+
+def build_messages(prompt):
+    return [
+        {"role": "system", "content": "Return ONLY valid JSON"},
+        {"role": "user", "content": prompt},
+    ]
 
-        cleaned = []
-
-        for q in data["questions"]:
-            try:
-                if (
-                    not q.get("question")
-                    or not isinstance(q.get("choices"), list)
-                    or len(q["choices"]) != 4
-                ):
-                    continue
-
-                cleaned.append({
-                    "question": q["question"],
-                    "choices": q["choices"],
-                    "correct_choice_index": int(q["correct_choice_index"]),
-                    "explanation": q.get("explanation", ""),
-                    "references": q.get("references", []),
-                })
-            except Exception:
-                continue
+
+def estimate_tokens(messages, max_tokens):
+    """Rough pre-call charge for the token bucket (~4 characters per token)."""
+    return sum(len(m["content"]) for m in messages) // 4 + max_tokens
+
+
+def generate_chunk(topic, difficulty, count, origin_hint="", part=None, provider=None,
+                   use_cache=True):
+    provider = provider or get_provider()
+    prompt = build_prompt(topic, difficulty, count, origin_hint, part)
+
+    messages = build_messages(prompt)
+    guard = get_guard(provider.name)
+    cache = get_prompt_cache() if use_cache else None
+    trace = GenerationTrace(provider, topic, difficulty, count, MAX_TOKENS)
+    usage = {}
+
+    try:
+        key = cache and cache.make_key(provider.name, provider.model, TEMPERATURE, messages)
+        raw = cache.get(key) if cache else None
+        cached = raw is not None
+
+        if not cached:
+            estimated = estimate_tokens(messages, MAX_TOKENS)
+            queued = time.perf_counter()
+            with guard.call(estimated):
+                trace.timings["queue"] += time.perf_counter() - queued
+                with trace.phase("network"):
+                    response = provider.complete(
+                        messages,
+                        max_tokens=MAX_TOKENS,
+                        temperature=TEMPERATURE,
+                    )
+            guard.limiter.settle(
+                estimated, response.prompt_tokens + response.completion_tokens
+            )
+            raw = response.text
+            usage = {
+                "prompt_tokens": response.prompt_tokens,
+                "completion_tokens": response.completion_tokens,
+            }
+
+        with trace.phase("parse"):
+            questions, stats = salvage_questions(raw)
+            for _ in range(stats["rejected"]):
+                trace.reject("malformed_json")
+
+            cleaned = []
+            for q in questions:
+                q = clean_question(q, trace)
+                if q:
+                    cleaned.append(q)
+
+        trace.record(
+            cached=cached, returned=len(questions), accepted=len(cleaned),
+            truncated=stats["truncated"], error="" if questions else "invalid_json",
+            **usage,
+        )
+
+        if not questions:
+            logger.warning("Invalid JSON from %s: %.500s", provider.name, raw)
+            return []
+        if stats["rejected"] or stats["truncated"]:
+            # keep the complete questions instead of regenerating the batch
+            logger.info("Salvaged JSON from %s: %s", provider.name, stats)
+        if cache and not cached:
+            cache.put(key, raw)
 
         return cleaned
 
+    except (CircuitOpen, Throttled) as e:
+        trace.record(error=f"{type(e).__name__}: {e}", **usage)
+        logger.warning("%s call rejected: %s", provider.name, e)
+        return []
+
     except Exception as e:
-        print("GROQ ERROR:", e)
+        trace.record(error=f"{type(e).__name__}: {e}", **usage)
+        logger.exception("%s call failed", provider.name)
         return []
+
+
+def stream_questions(topic, difficulty, count, origin_hint="", provider=None, use_cache=True):
+    """
+    Yield validated questions one at a time while the provider is still
+    streaming the completion, instead of waiting for the full body.
+    """
+    provider = provider or get_provider()
+    if not provider.available():
+        logger.warning("LLM provider %r is not configured", provider.name)
+        return
+
+    prompt = build_prompt(topic, difficulty, count, origin_hint)
+    parser = QuestionStreamParser()
+
+    messages = build_messages(prompt)
+    max_tokens = max(MAX_TOKENS, count * TOKENS_PER_QUESTION + WRAPPER_TOKENS)
+    cache = get_prompt_cache() if use_cache else None
+    trace = GenerationTrace(provider, topic, difficulty, count, max_tokens, mode="stream")
+    result = {"cached": False, "accepted": 0, "truncated": False, "error": ""}
+    received = []
+    guard = get_guard(provider.name)
+    admitted = finished = False
+
+    def accept(text):
+        with trace.phase("parse"):
+            found = [clean_question(q, trace) for q in parser.feed(text)]
+        for q in found:
+            if q:
+                result["accepted"] += 1
+                yield q
+
+    try:
+        key = cache and cache.make_key(provider.name, provider.model, TEMPERATURE, messages)
+        raw = cache.get(key) if cache else None
+        if raw is not None:
+            result["cached"] = True
+            yield from accept(raw)
+            return
+
+        # the guard is not held across the yields below: the breaker only
+        # hears about the provider, never about how fast the client reads
+        estimated = estimate_tokens(messages, max_tokens)
+        queued = time.perf_counter()
+        guard.admit(estimated)
+        trace.timings["queue"] += time.perf_counter() - queued
+        admitted = True
+
+        deltas = provider.stream(
+            messages,
+            max_tokens=max_tokens,
+            temperature=TEMPERATURE,
+        )
+        for delta in trace.timed_stream(deltas):
+            received.append(delta)
+            yield from accept(delta)
+        result["truncated"] = not parser.done
+        finished = True
+        guard.breaker.record_success()
+
+        if cache and parser.parsed:
+            cache.put(key, "".join(received))
+
+    except (CircuitOpen, Throttled) as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        logger.warning("%s call rejected: %s", provider.name, e)
+
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        if admitted and not finished:
+            guard.breaker.record_failure()
+        logger.exception("%s call failed", provider.name)
+
+    finally:
+        # also runs when the consumer stops reading early
+        if admitted and not finished and not result["error"]:
+            # client went away: no verdict on the provider either way
+            guard.breaker.abandon()
+        for _ in range(parser.rejected):
+            trace.reject("malformed_json")
+        prompt_tokens = sum(len(m["content"]) for m in messages) // 4
+        completion_tokens = len("".join(received)) // 4
+        if admitted:
+            # streams report no usage: give back what the estimate overcharged
+            guard.limiter.settle(estimated, prompt_tokens + completion_tokens)
+        trace.record(
+            returned=parser.parsed,
+            prompt_tokens=prompt_tokens if received else 0,
+            completion_tokens=completion_tokens,
+            usage_estimated=bool(received),
+            **result,
+        )
+        flush_metrics()
@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import GenerationJob
+from .question_bank import create_quiz
+
+
+# ============================================================
+# JOB QUEUE (DB-BACKED)
+# ============================================================
+
+def claim_next_job():
+    """
+    Atomically move the oldest pending job to "running" and return it.
+
+    SKIP LOCKED lets several workers poll the same table without
+    handing the same job to two of them.
+    """
+    with transaction.atomic():
+        job = (
+            GenerationJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(status="pending")
+            .order_by("created_at")
+            .first()
+        )
+        if job is None:
+            return None
+
+        job.status = "running"
+        job.started_at = timezone.now()
+        job.save(update_fields=["status", "started_at"])
+
+    return job
+
+
+def requeue_stale_jobs(stale_after):
+    """
+    Put jobs back in the queue if their worker died mid-run.
+    """
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    return GenerationJob.objects.filter(
+        status="running",
+        started_at__lt=cutoff,
+    ).update(status="pending", started_at=None)
+
+
+def run_job(job):
+    try:
+        quiz, bank_stats = create_quiz(
+            job.category,
+            job.subcategory,
+            job.difficulty,
+            job.count,
+            bank_first=job.bank_first,
+            use_cache=not job.fresh,
+        )
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "error", "finished_at"])
+        return job
+
+    job.status = "done"
+    job.quiz = quiz
+    job.bank_stats = bank_stats
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "quiz", "bank_stats", "finished_at"])
+    return job
@@ -0,0 +1,253 @@
+import datetime
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from . import pagination
+from .models import LeaderboardEntry, QuizAttempt
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+ALL_TIME = datetime.date(1970, 1, 1)
+
+# window -> the one bucket period it reads
+CALENDAR_WINDOWS = {"all": "all", "week": "week", "day": "day"}
+# window -> number of trailing day buckets merged per read
+ROLLING_WINDOWS = {"7d": 7, "30d": 30}
+WINDOWS = tuple(CALENDAR_WINDOWS) + tuple(ROLLING_WINDOWS)
+
+
+# ============================================================
+# BUCKETS
+# ============================================================
+
+def bucket_starts(day):
+    """period -> period_start of the buckets a result on `day` falls in."""
+    return {
+        "all": ALL_TIME,
+        "week": day - datetime.timedelta(days=day.weekday()),
+        "day": day,
+    }
+
+
+def bucket_keys(category_id, day):
+    """(category_id, period, period_start) of every bucket a result updates."""
+    return [
+        (category, period, start)
+        for category in (None, category_id)
+        for period, start in bucket_starts(day).items()
+    ]
+
+
+def finished_day(attempt):
+    return timezone.localdate(attempt.finished_at or attempt.started_at)
+
+
+# ============================================================
+# INCREMENTAL UPDATES
+# ============================================================
+
+def record_finish(attempt, category_id, previous=None):
+    """
+    Fold a finished attempt into its six buckets (all time, ISO week and
+    day; globally and for the quiz's category_id). Call inside the finish
+    transaction. `previous` is the attempt's old score when it had already
+    been finished; the new score replaces it instead of counting twice.
+
+    At most four queries however many buckets: the user row is locked
+    first so concurrent finishes by one user can't both create the same
+    bucket (the unique constraint can't catch that for the null category),
+    then one SELECT, one bulk UPDATE and, on the first result of a new
+    day or week, one bulk INSERT.
+    """
+    keys = bucket_keys(category_id, finished_day(attempt))
+
+    User.objects.select_for_update().filter(id=attempt.user_id).values_list("id").first()
+
+    existing = {
+        (e.category_id, e.period, e.period_start): e
+        for e in LeaderboardEntry.objects.filter(
+            Q(category__isnull=True) | Q(category_id=category_id),
+            user_id=attempt.user_id,
+            period_start__in={start for _, _, start in keys},
+        )
+    }
+
+    updated, created = [], []
+    for bucket_category_id, period, start in keys:
+        entry = existing.get((bucket_category_id, period, start))
+        if entry is None:
+            created.append(LeaderboardEntry(
+                user_id=attempt.user_id,
+                category_id=bucket_category_id,
+                period=period,
+                period_start=start,
+                attempt_count=1,
+                score_sum=attempt.score,
+                avg_score=attempt.score,
+            ))
+            continue
+
+        if previous is None:
+            entry.attempt_count += 1
+            entry.score_sum += attempt.score
+        else:
+            entry.score_sum += attempt.score - previous
+        entry.avg_score = entry.score_sum / entry.attempt_count if entry.attempt_count else 0
+        updated.append(entry)
+
+    if updated:
+        LeaderboardEntry.objects.bulk_update(updated, ["attempt_count", "score_sum", "avg_score"])
+    if created:
+        LeaderboardEntry.objects.bulk_create(created)
+
+
+def rebuild(batch_size=1000):
+    """Recompute every bucket from completed attempts; returns the number of rows."""
+    totals = defaultdict(lambda: [0, 0.0])
+    attempts = (
+        QuizAttempt.objects
+        .filter(completed=True)
+        .values_list("user_id", "quiz__category_id", "finished_at", "started_at", "score")
+        .iterator()
+    )
+    for user_id, category_id, finished_at, started_at, score in attempts:
+        for key in bucket_keys(category_id, timezone.localdate(finished_at or started_at)):
+            bucket = totals[(user_id,) + key]
+            bucket[0] += 1
+            bucket[1] += score
+
+    entries = [
+        LeaderboardEntry(
+            user_id=user_id,
+            category_id=category_id,
+            period=period,
+            period_start=start,
+            attempt_count=count,
+            score_sum=score_sum,
+            avg_score=score_sum / count,
+        )
+        for (user_id, category_id, period, start), (count, score_sum) in totals.items()
+    ]
+
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        LeaderboardEntry.objects.bulk_create(entries, batch_size=batch_size)
+    return len(entries)
+
+
+# ============================================================
+# TOP-N READS (KEYSET PAGINATION)
+# ============================================================
+
+def encode_cursor(row):
+    return pagination.encode_cursor([row["average"], row["user_id"]])
+
+
+def decode_cursor(cursor):
+    """(average, user_id); raises ValueError for anything we didn't issue."""
+    return pagination.decode_cursor(cursor, float, int)
+
+
+def window_rows(window, category_id=None, today=None):
+    """
+    Per-user rows for a window, as values() dicts with user_id, username,
+    attempts and average. Calendar windows read the single current bucket
+    straight off leaderboard_bucket_avg_idx; rolling windows merge the
+    last N day buckets per user.
+    """
+    today = today or timezone.localdate()
+    entries = LeaderboardEntry.objects.filter(
+        Q(category__isnull=True) if category_id is None else Q(category_id=category_id)
+    )
+
+    if window in CALENDAR_WINDOWS:
+        period = CALENDAR_WINDOWS[window]
+        return entries.filter(
+            period=period, period_start=bucket_starts(today)[period]
+        ).values(
+            "user_id",
+            username=F("user__username"),
+            attempts=F("attempt_count"),
+            average=F("avg_score"),
+        ), "avg_score"
+
+    days = ROLLING_WINDOWS[window]
+    return entries.filter(
+        period="day", period_start__gt=today - datetime.timedelta(days=days)
+    ).values(
+        "user_id", username=F("user__username")
+    ).annotate(
+        attempts=Sum("attempt_count"),
+        average=Sum("score_sum") / Sum("attempt_count"),
+    ), "average"
+
+
+def top(window="all", category_id=None, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    """
+    One page of a leaderboard, best average first (ties by user id).
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    A page never touches QuizAttempt, so its cost doesn't grow with the
+    number of attempts.
+    """
+    rows, average = window_rows(window, category_id)
+    if cursor:
+        rows = rows.filter(ranked_after(average, *decode_cursor(cursor)))
+
+    page = list(rows.order_by(f"-{average}", "user_id")[:limit + 1])
+    if len(page) > limit:
+        return page[:limit], encode_cursor(page[limit - 1])
+    return page, None
+
+
+def ranked_after(average, score, user_id):
+    """Rows that come after (score, user_id) in leaderboard order."""
+    return Q(**{f"{average}__lt": score}) | Q(**{average: score, "user_id__gt": user_id})
+
+
+def ranked_before(average, score, user_id):
+    return Q(**{f"{average}__gt": score}) | Q(**{average: score, "user_id__lt": user_id})
+
+
+# ============================================================
+# RANK LOOKUP
+# ============================================================
+
+def rank(user_id, window="all", category_id=None, neighbours=2):
+    """
+    The user's position in a leaderboard without reading it: rank is one
+    plus a count of the rows ordered before theirs. Five queries whatever
+    the number of users. For calendar windows the counts are range counts
+    on leaderboard_bucket_avg_idx. Rolling windows (7d, 30d) have no
+    bucket of their own: each count re-aggregates the window's day
+    buckets for every user, so it grows with the number of users active
+    in the window. Returns None if the user has no result in the window.
+    """
+    rows, average = window_rows(window, category_id)
+    # no .first(): it adds an ORDER BY the grouped rolling rows can't take
+    mine = list(rows.filter(user_id=user_id)[:1])
+    if not mine:
+        return None
+    mine = mine[0]
+
+    before = rows.filter(ranked_before(average, mine["average"], user_id))
+    after = rows.filter(ranked_after(average, mine["average"], user_id))
+    position = before.count() + 1
+    total = rows.count()
+
+    above = list(before.order_by(average, "-user_id")[:neighbours])[::-1]
+    below = list(after.order_by(f"-{average}", "user_id")[:neighbours])
+
+    return {
+        "rank": position,
+        "total": total,
+        # share of the other users ranked below this one
+        "percentile": round((total - position) / (total - 1) * 100, 1) if total > 1 else 100.0,
+        "me": mine,
+        "above": [dict(row, rank=position - len(above) + i) for i, row in enumerate(above)],
+        "below": [dict(row, rank=position + 1 + i) for i, row in enumerate(below)],
+    }
@@ -0,0 +1,202 @@
+import json
+import re
+
+# Fixes applied only when an object fails to decode as-is:
+# LaTeX-style escapes the model emits (\( \[ \{ ...) and trailing commas.
+_INVALID_ESCAPE = re.compile(r'\\(?!["\\/bfnrtu])')
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+# Next character that can change the scanner state, in and out of strings.
+_STRUCTURAL = re.compile(r'["{}\]]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+# ============================================================
+# INCREMENTAL QUESTION PARSER
+# ============================================================
+
+class QuestionStreamParser:
+    """
+    Pull complete question objects out of a `{"questions": [...]}`
+    response while it is still arriving.
+
+    feed() takes the next piece of text and returns every question object
+    that became complete with it. The text is scanned once, jumping
+    between quotes, braces and brackets with a compiled regex; brace
+    depth is tracked outside of JSON strings, so a `{` or `}` inside a
+    question's text does not confuse it.
+
+    With array_key=None the first `[` in the text is taken as the list,
+    for responses that drop the wrapper object.
+    """
+
+    def __init__(self, array_key="questions"):
+        self.array_key = array_key
+        self.parsed = 0
+        self.rejected = 0
+        self.buffer = ""
+        self.pos = 0
+        self.in_array = False
+        self.done = False
+        self.depth = 0
+        self.obj_start = None
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text):
+        self.buffer += text
+        found = []
+
+        while self.pos < len(self.buffer) and not self.done:
+            if not self.in_array:
+                if not self._find_array_start():
+                    break
+                continue
+
+            if self.escaped:
+                self.escaped = False
+                self.pos += 1
+                continue
+
+            # jump straight to the next character that matters
+            pattern = _STRING_SPECIAL if self.in_string else _STRUCTURAL
+            match = pattern.search(self.buffer, self.pos)
+            if match is None:
+                self.pos = len(self.buffer)
+                break
+            self.pos = match.start()
+            ch = self.buffer[self.pos]
+
+            if self.in_string:
+                if ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch == "{":
+                if self.depth == 0:
+                    self.obj_start = self.pos
+                self.depth += 1
+            elif ch == "}":
+                self.depth -= 1
+                if self.depth == 0 and self.obj_start is not None:
+                    obj = self._decode(self.buffer[self.obj_start:self.pos + 1])
+                    if obj is not None:
+                        self.parsed += 1
+                        found.append(obj)
+                    else:
+                        self.rejected += 1
+                    self.obj_start = None
+            elif ch == "]" and self.depth == 0:
+                self.done = True
+
+            self.pos += 1
+
+        self._compact()
+        return found
+
+    def finish(self):
+        """
+        Call once the response is complete. An object still open at
+        this point was cut off and counts as rejected. Returns True if
+        the response was truncated.
+        """
+        truncated = self.obj_start is not None or (self.in_array and not self.done)
+        if self.obj_start is not None:
+            self.rejected += 1
+            self.obj_start = None
+        return truncated
+
+    def _find_array_start(self):
+        """
+        Skip ahead to the `[` that opens the questions list. Returns
+        False if it has not arrived yet.
+        """
+        if self.array_key is None:
+            bracket = self.buffer.find("[", self.pos)
+            if bracket == -1:
+                self.pos = len(self.buffer)
+                return False
+            self.pos = bracket + 1
+            self.in_array = True
+            return True
+
+        quoted = f'"{self.array_key}"'
+        key = self.buffer.find(quoted, self.pos)
+        if key == -1:
+            # keep the tail in case the key is split across chunks
+            self.pos = max(self.pos, len(self.buffer) - len(quoted))
+            return False
+
+        bracket = self.buffer.find("[", key)
+        if bracket == -1:
+            self.pos = key
+            return False
+
+        self.pos = bracket + 1
+        self.in_array = True
+        return True
+
+    def _compact(self):
+        """Drop text that can no longer be part of an unfinished object."""
+        keep_from = self.obj_start if self.obj_start is not None else self.pos
+        if keep_from:
+            self.buffer = self.buffer[keep_from:]
+            self.pos -= keep_from
+            if self.obj_start is not None:
+                self.obj_start = 0
+
+    @staticmethod
+    def _decode(text):
+        for candidate in (text, None):
+            if candidate is None:
+                candidate = _TRAILING_COMMA.sub(r"\1", _INVALID_ESCAPE.sub("", text))
+            try:
+                # strict=False tolerates raw newlines/tabs inside strings
+                obj = json.loads(candidate, strict=False)
+            except ValueError:
+                continue
+            return obj if isinstance(obj, dict) else None
+        return None
+
+
+# ============================================================
+# ONE-SHOT SALVAGE
+# ============================================================
+
+def salvage_questions(text):
+    """
+    Extract every complete question object from a full LLM response,
+    even if it is fenced, wrapped in prose, or cut off mid-question.
+
+    Returns (questions, stats); stats has "salvaged", "rejected" (objects
+    that were malformed or cut off) and "truncated".
+    """
+    text = text or ""
+    keyed = '"questions"' in text
+
+    # fast path: most responses are whole documents, maybe fenced or
+    # wrapped in prose, and json.loads does those in one C-level pass
+    if keyed:
+        try:
+            data = json.loads(text[text.find("{"):text.rfind("}") + 1], strict=False)
+        except ValueError:
+            data = None
+        if isinstance(data, dict) and isinstance(data.get("questions"), list):
+            questions = [q for q in data["questions"] if isinstance(q, dict)]
+            return questions, {
+                "salvaged": len(questions),
+                "rejected": len(data["questions"]) - len(questions),
+                "truncated": False,
+            }
+
+    parser = QuestionStreamParser(array_key="questions" if keyed else None)
+    questions = parser.feed(text)
+    truncated = parser.finish()
+
+    return questions, {
+        "salvaged": parser.parsed,
+        "rejected": parser.rejected,
+        "truncated": truncated,
+    }
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0008_question_signature_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=20)),
+                ('model', models.CharField(max_length=100)),
+                ('topic', models.CharField(max_length=255)),
+                ('difficulty', models.CharField(max_length=20)),
+                ('mode', models.CharField(choices=[('complete', 'Complete'), ('stream', 'Stream')], default='complete', max_length=10)),
+                ('cached', models.BooleanField(default=False)),
+                ('requested', models.PositiveIntegerField(default=0)),
+                ('returned', models.PositiveIntegerField(default=0)),
+                ('accepted', models.PositiveIntegerField(default=0)),
+                ('rejected', models.PositiveIntegerField(default=0)),
+                ('rejection_reasons', models.JSONField(blank=True, default=dict)),
+                ('truncated', models.BooleanField(default=False)),
+                ('max_tokens', models.PositiveIntegerField(default=0)),
+                ('prompt_tokens', models.PositiveIntegerField(default=0)),
+                ('completion_tokens', models.PositiveIntegerField(default=0)),
+                ('usage_estimated', models.BooleanField(default=False)),
+                ('queue_ms', models.PositiveIntegerField(default=0)),
+                ('network_ms', models.PositiveIntegerField(default=0)),
+                ('parse_ms', models.PositiveIntegerField(default=0)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
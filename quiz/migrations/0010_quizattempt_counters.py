@@ -0,0 +1,98 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:27
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+UNANSWERED = -1
+DIFFICULTIES = ("easy", "medium", "hard")
+
+
+def count_existing_answers(apps, schema_editor):
+    """
+    Fill the new counters from QuestionAttempt rows, so attempts still in
+    progress at deploy time don't finish with question_count=0 and score 0.
+    Same recount as `manage.py rebuild_attempt_counters`: one grouped
+    query, written back in batches.
+    """
+    QuizAttempt = apps.get_model("quiz", "QuizAttempt")
+    QuestionAttempt = apps.get_model("quiz", "QuestionAttempt")
+
+    aggregates = {
+        "question_count": Count("id"),
+        "answered_count": Count("id", filter=~Q(selected_choice=UNANSWERED)),
+        "correct_count": Count("id", filter=Q(is_correct=True)),
+    }
+    for d in DIFFICULTIES:
+        aggregates[f"{d}_count"] = Count("id", filter=Q(difficulty=d))
+        aggregates[f"{d}_correct"] = Count("id", filter=Q(difficulty=d, is_correct=True))
+
+    rows = (
+        QuestionAttempt.objects
+        .values("quiz_attempt_id")
+        .annotate(**aggregates)
+        .order_by()
+    )
+    batch = []
+    for row in rows.iterator(chunk_size=2000):
+        batch.append(QuizAttempt(id=row.pop("quiz_attempt_id"), **row))
+        if len(batch) >= 500:
+            QuizAttempt.objects.bulk_update(batch, list(aggregates))
+            batch = []
+    if batch:
+        QuizAttempt.objects.bulk_update(batch, list(aggregates))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0009_generationmetric'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='answered_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='correct_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='easy_correct',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='easy_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='hard_correct',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='hard_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='medium_correct',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='medium_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='question_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_existing_answers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:35
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0001_initial'),
+        ('quiz', '0011_leaderboardentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='leaderboardentry',
+            name='leaderboard_avg_idx',
+        ),
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='categories.category'),
+        ),
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='period',
+            field=models.CharField(choices=[('all', 'All time'), ('week', 'ISO week'), ('day', 'Day')], default='all', max_length=4),
+        ),
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='period_start',
+            field=models.DateField(default=datetime.date(1970, 1, 1)),
+        ),
+        migrations.AlterField(
+            model_name='leaderboardentry',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['period', 'period_start', 'category', '-avg_score', 'user'], name='leaderboard_bucket_avg_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardentry',
+            constraint=models.UniqueConstraint(fields=('user', 'category', 'period', 'period_start'), name='unique_leaderboard_bucket'),
+        ),
+    ]
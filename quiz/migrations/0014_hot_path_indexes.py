@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:41
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_question_attempts(apps, schema_editor):
+    """
+    Keep the oldest row per (attempt, question) so the unique constraint
+    can be created. Run `manage.py rebuild_attempt_counters` afterwards if
+    any were removed, since the extras were counted too.
+    """
+    QuestionAttempt = apps.get_model("quiz", "QuestionAttempt")
+    duplicates = (
+        QuestionAttempt.objects
+        .values("quiz_attempt_id", "question_id")
+        .annotate(rows=Count("id"), keep=Min("id"))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for group in duplicates.iterator():
+        (
+            QuestionAttempt.objects
+            .filter(quiz_attempt_id=group["quiz_attempt_id"], question_id=group["question_id"])
+            .exclude(id=group["keep"])
+            .delete()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0001_initial'),
+        ('quiz', '0013_userdailystats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_question_attempts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='questiontemplate',
+            index=models.Index(fields=['category', 'subcategory', 'difficulty'], name='template_topic_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['user', 'completed', 'started_at'], name='attempt_user_history_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='questionattempt',
+            constraint=models.UniqueConstraint(fields=('quiz_attempt', 'question'), name='unique_question_per_attempt'),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:44
+
+from itertools import islice
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_question_lists(apps, schema_editor):
+    """
+    One QuizQuestion row per id in Quiz.question_templates, keeping the
+    list order. Ids of deleted templates and repeats are dropped, as
+    start_attempt already did when reading the list.
+    """
+    Quiz = apps.get_model("quiz", "Quiz")
+    QuizQuestion = apps.get_model("quiz", "QuizQuestion")
+    QuestionTemplate = apps.get_model("quiz", "QuestionTemplate")
+
+    quizzes = Quiz.objects.only("id", "question_templates").iterator(chunk_size=500)
+    while chunk := list(islice(quizzes, 500)):
+        ids = {str(qid) for quiz in chunk for qid in quiz.question_templates or []}
+        existing = {
+            str(pk) for pk in
+            QuestionTemplate.objects.filter(id__in=ids).values_list("id", flat=True)
+        }
+
+        rows = []
+        for quiz in chunk:
+            ordered = [
+                qid for qid in dict.fromkeys(str(qid) for qid in quiz.question_templates or [])
+                if qid in existing
+            ]
+            rows += [
+                QuizQuestion(quiz_id=quiz.id, template_id=qid, position=position)
+                for position, qid in enumerate(ordered)
+            ]
+        QuizQuestion.objects.bulk_create(rows, batch_size=1000)
+
+
+def restore_question_lists(apps, schema_editor):
+    Quiz = apps.get_model("quiz", "Quiz")
+    QuizQuestion = apps.get_model("quiz", "QuizQuestion")
+
+    lists = {}
+    rows = QuizQuestion.objects.order_by("quiz_id", "position").values_list("quiz_id", "template_id")
+    for quiz_id, template_id in rows.iterator(chunk_size=2000):
+        lists.setdefault(quiz_id, []).append(str(template_id))
+    for quiz_id, ids in lists.items():
+        Quiz.objects.filter(id=quiz_id).update(question_templates=ids)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0014_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_questions', to='quiz.quiz')),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_questions', to='quiz.questiontemplate')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='templates',
+            field=models.ManyToManyField(related_name='quizzes', through='quiz.QuizQuestion', to='quiz.questiontemplate'),
+        ),
+        migrations.AddConstraint(
+            model_name='quizquestion',
+            constraint=models.UniqueConstraint(fields=('quiz', 'position'), name='unique_quiz_position'),
+        ),
+        migrations.AddConstraint(
+            model_name='quizquestion',
+            constraint=models.UniqueConstraint(fields=('quiz', 'template'), name='unique_quiz_template'),
+        ),
+        migrations.RunPython(copy_question_lists, restore_question_lists),
+    ]
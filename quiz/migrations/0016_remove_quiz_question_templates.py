@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:44
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0015_quizquestion'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='quiz',
+            name='question_templates',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0016_remove_quiz_question_templates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='fresh',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:23
+
+from django.db import migrations
+from django.utils import timezone
+
+COUNTER_FIELDS = ["question_count", "correct_count"] + [
+    f"{d}_{kind}" for d in ("easy", "medium", "hard") for kind in ("count", "correct")
+]
+
+
+def backfill_daily_stats(apps, schema_editor):
+    """
+    Fill UserDailyStats from attempts finished before the rollup existed,
+    so dashboards don't depend on running `manage.py backfill_daily_stats`
+    by hand. Same sums as that command; days are local dates worked out
+    in Python, not with CONVERT_TZ.
+    """
+    QuizAttempt = apps.get_model("quiz", "QuizAttempt")
+    UserDailyStats = apps.get_model("quiz", "UserDailyStats")
+
+    rows = {}
+    attempts = (
+        QuizAttempt.objects
+        .filter(completed=True)
+        .values_list("user_id", "finished_at", "started_at", "score", *COUNTER_FIELDS)
+    )
+    for user_id, finished_at, started_at, score, *counts in attempts.iterator(chunk_size=2000):
+        day = timezone.localdate(finished_at or started_at)
+        stats = rows.get((user_id, day))
+        if stats is None:
+            stats = rows[(user_id, day)] = UserDailyStats(user_id=user_id, date=day)
+        stats.attempt_count += 1
+        stats.score_sum += score
+        for field, count in zip(COUNTER_FIELDS, counts):
+            setattr(stats, field, getattr(stats, field) + count)
+
+    UserDailyStats.objects.all().delete()
+    UserDailyStats.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0017_generationjob_fresh'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
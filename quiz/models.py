@@ -1,3 +1,5 @@
+import datetime
+
 from django.db import models
 from django.utils.text import slugify
 import uuid
@@ -70,10 +72,42 @@ class QuestionTemplate(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # bank sampling reads ids by topic; index-only on InnoDB
+            models.Index(fields=["category", "subcategory", "difficulty"], name="template_topic_idx"),
+        ]
+
     def __str__(self):
         return self.question_text[:50]
 
 
+# ============================================================
+# NEAR-DUPLICATE INDEX (MINHASH + LSH, see quiz/dedup.py)
+# ============================================================
+
+class QuestionSignature(models.Model):
+    template = models.OneToOneField(
+        QuestionTemplate,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name="signature"
+    )
+    minhash = JSONField(default=list)
+
+    def __str__(self):
+        return f"Signature for {self.template_id}"
+
+
+class QuestionSignatureBucket(models.Model):
+    signature = models.ForeignKey(
+        QuestionSignature,
+        on_delete=models.CASCADE,
+        related_name="buckets"
+    )
+    bucket = models.BigIntegerField(db_index=True)
+
+
 # ============================================================
 # QUIZ MODEL
 # ============================================================
@@ -85,7 +119,11 @@ class Quiz(models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     subcategory = models.ForeignKey(Subcategory, null=True, blank=True, on_delete=models.SET_NULL)
 
-    question_templates = JSONField(default=list)
+    templates = models.ManyToManyField(
+        QuestionTemplate,
+        through="QuizQuestion",
+        related_name="quizzes",
+    )
     difficulty = models.CharField(max_length=20, default="medium")
 
     time_limit = models.IntegerField(default=300)
@@ -95,6 +133,33 @@ class Quiz(models.Model):
     def __str__(self):
         return self.title
 
+    def template_ids(self):
+        """The quiz's question template ids in quiz order, as strings."""
+        return [
+            str(pk) for pk in
+            self.quiz_questions.order_by("position").values_list("template_id", flat=True)
+        ]
+
+
+class QuizQuestion(models.Model):
+    """
+    One question of a quiz, in order. Deleting a template drops it from
+    every quiz; template.quizzes answers "which quizzes use this question".
+    """
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="quiz_questions")
+    template = models.ForeignKey(QuestionTemplate, on_delete=models.CASCADE, related_name="quiz_questions")
+    position = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            # (quiz, position) also serves the ordered read of a quiz's questions
+            models.UniqueConstraint(fields=["quiz", "position"], name="unique_quiz_position"),
+            models.UniqueConstraint(fields=["quiz", "template"], name="unique_quiz_template"),
+        ]
+
+    def __str__(self):
+        return f"{self.quiz} #{self.position}"
+
 
 # ============================================================
 # QUIZ ATTEMPT — ADAPTIVE ENGINE STORAGE
@@ -124,6 +189,25 @@ class QuizAttempt(models.Model):
         help_text="Adaptive difficulty for the active quiz attempt"
     )
 
+    # Running counters over question_attempts, kept up to date by the
+    # answer endpoint (see quiz/persistence.py) so finish/analytics don't
+    # have to count rows. `manage.py rebuild_attempt_counters` recomputes them.
+    question_count = models.PositiveIntegerField(default=0)
+    answered_count = models.PositiveIntegerField(default=0)
+    correct_count = models.PositiveIntegerField(default=0)
+    easy_count = models.PositiveIntegerField(default=0)
+    easy_correct = models.PositiveIntegerField(default=0)
+    medium_count = models.PositiveIntegerField(default=0)
+    medium_correct = models.PositiveIntegerField(default=0)
+    hard_count = models.PositiveIntegerField(default=0)
+    hard_correct = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # a user's completed attempts in date order (progress, history)
+            models.Index(fields=["user", "completed", "started_at"], name="attempt_user_history_idx"),
+        ]
+
     def __str__(self):
         return f"{self.user} - {self.quiz.title}"
 
@@ -152,5 +236,186 @@ class QuestionAttempt(models.Model):
         help_text="Difficulty level of question when user attempted it"
     )
 
+    class Meta:
+        constraints = [
+            # answers look rows up by (attempt, question); one row each
+            models.UniqueConstraint(
+                fields=["quiz_attempt", "question"],
+                name="unique_question_per_attempt",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.quiz_attempt} - {self.question.id}"
+
+
+# ============================================================
+# LEADERBOARD ROLLUP
+# ============================================================
+
+LEADERBOARD_PERIOD_CHOICES = (
+    ("all", "All time"),
+    ("week", "ISO week"),
+    ("day", "Day"),
+)
+
+class LeaderboardEntry(models.Model):
+    """
+    Per-user totals over completed attempts in one bucket: a period (all
+    time, ISO week starting `period_start`, or a day) and a category (null
+    = every category). Updated in the finish transaction (see
+    quiz/leaderboard.py) so each leaderboard is an index read.
+    `manage.py rebuild_leaderboard` recomputes them from QuizAttempt.
+    """
+    user = models.ForeignKey(
+        "auth.User",
+        on_delete=models.CASCADE,
+        related_name="leaderboard_entries"
+    )
+    category = models.ForeignKey(Category, null=True, blank=True, on_delete=models.CASCADE)
+    period = models.CharField(max_length=4, choices=LEADERBOARD_PERIOD_CHOICES, default="all")
+    # Monday for weeks, the day itself for days, 1970-01-01 for all time
+    period_start = models.DateField(default=datetime.date(1970, 1, 1))
+
+    attempt_count = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    avg_score = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "category", "period", "period_start"],
+                name="unique_leaderboard_bucket",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["period", "period_start", "category", "-avg_score", "user"],
+                name="leaderboard_bucket_avg_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.period} {self.period_start} - {self.avg_score:.2f} over {self.attempt_count}"
+
+
+# ============================================================
+# DAILY USER STATS ROLLUP
+# ============================================================
+
+class UserDailyStats(models.Model):
+    """
+    One row per user per day of completed attempts (the same counters as
+    QuizAttempt, summed), updated in the finish transaction (see
+    quiz/user_stats.py). Dashboard, progress and analytics read these so
+    their cost follows days of history, not attempts.
+    `manage.py backfill_daily_stats` recomputes them from QuizAttempt.
+    """
+    user = models.ForeignKey(
+        "auth.User",
+        on_delete=models.CASCADE,
+        related_name="daily_stats"
+    )
+    date = models.DateField()
+
+    attempt_count = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    question_count = models.PositiveIntegerField(default=0)
+    correct_count = models.PositiveIntegerField(default=0)
+    easy_count = models.PositiveIntegerField(default=0)
+    easy_correct = models.PositiveIntegerField(default=0)
+    medium_count = models.PositiveIntegerField(default=0)
+    medium_correct = models.PositiveIntegerField(default=0)
+    hard_count = models.PositiveIntegerField(default=0)
+    hard_correct = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "date"], name="unique_user_daily_stats"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.date}: {self.attempt_count} attempts"
+
+
+# ============================================================
+# GENERATION JOB — BACKGROUND QUIZ GENERATION
+# ============================================================
+
+JOB_STATUS_CHOICES = (
+    ("pending", "Pending"),
+    ("running", "Running"),
+    ("done", "Done"),
+    ("failed", "Failed"),
+)
+
+class GenerationJob(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey("auth.User", on_delete=models.CASCADE)
+
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    subcategory = models.ForeignKey(Subcategory, null=True, blank=True, on_delete=models.SET_NULL)
+    difficulty = models.CharField(max_length=20, default="medium")
+    count = models.IntegerField(default=5)
+    bank_first = models.BooleanField(default=True)
+    # client asked for fresh questions: no bank and no cached completions
+    fresh = models.BooleanField(default=False)
+
+    status = models.CharField(
+        max_length=10,
+        choices=JOB_STATUS_CHOICES,
+        default="pending",
+        db_index=True,
+    )
+    quiz = models.ForeignKey(Quiz, null=True, blank=True, on_delete=models.SET_NULL)
+    bank_stats = JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user} - {self.difficulty} x{self.count} ({self.status})"
+
+
+# ============================================================
+# GENERATION TELEMETRY
+# ============================================================
+GENERATION_MODE_CHOICES = (
+    ("complete", "Complete"),
+    ("stream", "Stream"),
+)
+
+class GenerationMetric(models.Model):
+    """One provider call (or cache replay) made while generating questions."""
+    provider = models.CharField(max_length=20)
+    model = models.CharField(max_length=100)
+    topic = models.CharField(max_length=255)
+    difficulty = models.CharField(max_length=20)
+    mode = models.CharField(max_length=10, choices=GENERATION_MODE_CHOICES, default="complete")
+    cached = models.BooleanField(default=False)
+
+    requested = models.PositiveIntegerField(default=0)
+    returned = models.PositiveIntegerField(default=0)
+    accepted = models.PositiveIntegerField(default=0)
+    rejected = models.PositiveIntegerField(default=0)
+    rejection_reasons = JSONField(default=dict, blank=True)
+    truncated = models.BooleanField(default=False)
+
+    max_tokens = models.PositiveIntegerField(default=0)
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    # streamed completions carry no usage block; tokens are estimated from length
+    usage_estimated = models.BooleanField(default=False)
+
+    queue_ms = models.PositiveIntegerField(default=0)
+    network_ms = models.PositiveIntegerField(default=0)
+    parse_ms = models.PositiveIntegerField(default=0)
+
+    error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.model} - {self.topic} ({self.difficulty}) {self.accepted}/{self.requested}"
@@ -0,0 +1,40 @@
+import base64
+import json
+
+
+# ============================================================
+# KEYSET CURSORS
+# ============================================================
+# A cursor is the sort key of the last row on a page, JSON-encoded and
+# base64'd so clients treat it as opaque.
+
+def encode_cursor(values):
+    raw = json.dumps(list(values)).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, *types):
+    """
+    The values of a cursor we issued, converted with `types` (one per
+    value). Raises ValueError for anything else.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("wrong cursor shape")
+        return tuple(t(v) for t, v in zip(types, values))
+    except (AttributeError, TypeError, ValueError) as e:
+        # AttributeError: uuid.UUID() given a number instead of a string
+        raise ValueError("Invalid cursor") from e
+
+
+def next_page_headers(response, request, next_cursor):
+    """Advertise the next page in X-Next-Cursor and a rel="next" Link."""
+    if not next_cursor:
+        return response
+    params = request.query_params.copy()
+    params["cursor"] = next_cursor
+    response["X-Next-Cursor"] = next_cursor
+    response["Link"] = f'<{request.build_absolute_uri(request.path)}?{params.urlencode()}>; rel="next"'
+    return response
@@ -0,0 +1,298 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import QuestionTemplate, Quiz, QuizQuestion, QuizAttempt, QuestionAttempt
+from .answer_keys import store_answer_key
+from .leaderboard import record_finish
+from . import user_stats
+from .response_cache import bump_on_commit
+from .dedup import (
+    signature,
+    similarity,
+    find_near_duplicates,
+    index_questions,
+    DUPLICATE_THRESHOLD,
+)
+
+
+# ============================================================
+# PERSISTENCE LAYER
+# ============================================================
+# Every write path here costs a fixed number of queries regardless of
+# how many questions are involved, and runs inside one transaction so a
+# failure never leaves a half-built quiz or attempt behind.
+
+
+def store_questions(questions, category, subcategory, difficulty):
+    """
+    Save LLM questions with one near-duplicate lookup and three bulk
+    INSERTs (templates, signatures, LSH buckets). Near-duplicates of a
+    bank question in the same pool (category, subcategory, difficulty),
+    or of each other, resolve to the existing template id.
+    """
+    if not questions:
+        return []
+
+    sigs = [signature(q["question"], q["choices"]) for q in questions]
+    matches = find_near_duplicates(
+        sigs, category.id, subcategory.id if subcategory else None, difficulty
+    )
+
+    template_ids = []
+    new_templates = []
+    new_sigs = []
+
+    for q, sig, match in zip(questions, sigs, matches):
+        if match is None:
+            # also collapse repeats within the same batch
+            match = next(
+                (qt.id for qt, s in zip(new_templates, new_sigs)
+                 if similarity(sig, s) >= DUPLICATE_THRESHOLD),
+                None,
+            )
+        if match is not None:
+            template_ids.append(str(match))
+            continue
+
+        qt = QuestionTemplate(
+            category=category,
+            subcategory=subcategory,
+            difficulty=difficulty,
+            question_text=q["question"],
+            choices=q["choices"],
+            correct_choice=q["correct_choice_index"],
+            explanation=q.get("explanation", ""),
+        )
+        new_templates.append(qt)
+        new_sigs.append(sig)
+        template_ids.append(str(qt.id))
+
+    if new_templates:
+        with transaction.atomic():
+            QuestionTemplate.objects.bulk_create(new_templates)
+            index_questions(new_templates, new_sigs)
+
+    return list(dict.fromkeys(template_ids))
+
+
+def save_quiz(category, subcategory, difficulty, template_ids, count):
+    """The quiz plus one QuizQuestion per template id, in order: two INSERTs."""
+    topic = subcategory.name if subcategory else category.name
+
+    with transaction.atomic():
+        quiz = Quiz.objects.create(
+            title=f"{topic} Quiz",
+            category=category,
+            subcategory=subcategory,
+            difficulty=difficulty,
+            time_limit=count * 60,
+        )
+        QuizQuestion.objects.bulk_create([
+            QuizQuestion(quiz=quiz, template_id=template_id, position=position)
+            for position, template_id in enumerate(dict.fromkeys(template_ids))
+        ])
+    return quiz
+
+
+def start_attempt(quiz, user):
+    """
+    Create an attempt and one QuestionAttempt per quiz question: one
+    join of the quiz's QuizQuestion rows to their templates (in position
+    order, off unique_quiz_position) plus two INSERTs. The same read seeds
+    the attempt's cached answer key.
+    """
+    questions = list(
+        QuizQuestion.objects
+        .filter(quiz=quiz)
+        .order_by("position")
+        .values_list("template_id", "template__correct_choice", "template__difficulty")
+    )
+    question_ids = [qid for qid, _, _ in questions]
+
+    with transaction.atomic():
+        attempt = QuizAttempt.objects.create(
+            quiz=quiz,
+            user=user,
+            current_difficulty="easy",
+            # every question starts at the attempt's opening difficulty
+            question_count=len(question_ids),
+            easy_count=len(question_ids),
+        )
+        QuestionAttempt.objects.bulk_create([
+            QuestionAttempt(
+                quiz_attempt=attempt,
+                question_id=qid,
+                selected_choice=-1,
+                is_correct=False,
+                difficulty="easy",
+            )
+            for qid in question_ids
+        ])
+
+    store_answer_key(attempt.id, user.id, questions)
+    # the dashboard lists recent attempts, finished or not
+    bump_on_commit(f"user:{user.id}")
+    return attempt
+
+
+# ============================================================
+# ANSWERS AND ATTEMPT COUNTERS
+# ============================================================
+
+UNANSWERED = -1
+COUNTED_DIFFICULTIES = ("easy", "medium", "hard")
+
+
+def counter_deltas(qa, was_answered, was_correct, deltas=None):
+    """
+    Counter increments that move the attempt from the question's previous
+    state to its current one; re-answers only adjust the correct counters
+    when the answer flips between right and wrong. Pass `deltas` to
+    accumulate over several questions.
+    """
+    deltas = Counter() if deltas is None else deltas
+    if not was_answered and qa.selected_choice != UNANSWERED:
+        deltas["answered_count"] += 1
+
+    delta = int(qa.is_correct) - int(was_correct)
+    if delta:
+        deltas["correct_count"] += delta
+        if qa.difficulty in COUNTED_DIFFICULTIES:
+            deltas[f"{qa.difficulty}_correct"] += delta
+    return deltas
+
+
+def apply_counter_deltas(attempt_id, deltas):
+    """One UPDATE with F() expressions; nothing is written if nothing changed."""
+    changes = {field: F(field) + n for field, n in deltas.items() if n}
+    if changes:
+        QuizAttempt.objects.filter(id=attempt_id).update(**changes)
+
+
+def remove_from_counters(template_ids):
+    """
+    Take the questions of these templates out of the counters of the
+    unfinished attempts that hold them; call before the templates are
+    deleted (the cascade removes their QuestionAttempt rows). Finished
+    attempts keep the counters their score and rollups came from.
+    """
+    deltas = {}
+    rows = (
+        QuestionAttempt.objects
+        .filter(question_id__in=template_ids, quiz_attempt__completed=False)
+        .values_list("quiz_attempt_id", "selected_choice", "is_correct", "difficulty")
+    )
+    for attempt_id, selected, is_correct, difficulty in rows:
+        attempt_deltas = deltas.setdefault(attempt_id, Counter())
+        attempt_deltas["question_count"] -= 1
+        if selected != UNANSWERED:
+            attempt_deltas["answered_count"] -= 1
+        if is_correct:
+            attempt_deltas["correct_count"] -= 1
+        if difficulty in COUNTED_DIFFICULTIES:
+            attempt_deltas[f"{difficulty}_count"] -= 1
+            if is_correct:
+                attempt_deltas[f"{difficulty}_correct"] -= 1
+
+    for attempt_id, attempt_deltas in deltas.items():
+        apply_counter_deltas(attempt_id, attempt_deltas)
+
+
+def record_answer(attempt_id, answer_key, question_id, selected):
+    """
+    Save one answer and update the attempt's running counters in the
+    same transaction, grading against the cached answer key. The
+    QuestionAttempt row is locked so concurrent re-answers of the same
+    question can't double count.
+    """
+    correct_choice = answer_key.correct_choice(question_id)
+
+    with transaction.atomic():
+        qa = QuestionAttempt.objects.select_for_update().get(
+            quiz_attempt_id=attempt_id,
+            question_id=question_id,
+        )
+        was_answered = qa.selected_choice != UNANSWERED
+        was_correct = qa.is_correct
+
+        qa.selected_choice = selected
+        qa.is_correct = selected == correct_choice
+        qa.save(update_fields=["selected_choice", "is_correct"])
+
+        apply_counter_deltas(attempt_id, counter_deltas(qa, was_answered, was_correct))
+
+    return qa
+
+
+def record_answers(attempt_id, answer_key, answers):
+    """
+    Save many answers at once, graded against the cached answer key: one
+    locked SELECT of the attempt's rows, one bulk_update and one counter
+    UPDATE, in one transaction, however many answers are sent.
+
+    `answers` maps question id -> selected choice. Returns the ids that
+    aren't part of the attempt; those are ignored.
+    """
+    correct_by_id = {
+        qid: answer_key.correct_choice(qid) for qid in answers if qid in answer_key
+    }
+
+    with transaction.atomic():
+        qas = list(
+            QuestionAttempt.objects
+            .select_for_update()
+            .filter(
+                quiz_attempt_id=attempt_id,
+                question_id__in=list(correct_by_id),
+            )
+        )
+
+        deltas = Counter()
+        for qa in qas:
+            was_answered = qa.selected_choice != UNANSWERED
+            was_correct = qa.is_correct
+
+            qa.selected_choice = answers[str(qa.question_id)]
+            qa.is_correct = qa.selected_choice == correct_by_id[str(qa.question_id)]
+            counter_deltas(qa, was_answered, was_correct, deltas)
+
+        QuestionAttempt.objects.bulk_update(qas, fields=["selected_choice", "is_correct"])
+        apply_counter_deltas(attempt_id, deltas)
+
+    saved = {str(qa.question_id) for qa in qas}
+    return [qid for qid in answers if qid not in saved]
+
+
+# ============================================================
+# FINISH
+# ============================================================
+
+def finish_attempt(attempt_id, user):
+    """
+    Score the attempt from its counters, mark it completed and fold it
+    into the leaderboard buckets and the user's daily stats, all in one
+    transaction. The attempt row is locked so a double-submitted finish
+    can't count twice; a repeated finish rescores but keeps the original
+    finish time (and so buckets).
+    """
+    with transaction.atomic():
+        attempt = QuizAttempt.objects.select_for_update().get(id=attempt_id, user=user)
+        previous = attempt.score if attempt.completed else None
+        category_id = Quiz.objects.values_list("category_id", flat=True).get(id=attempt.quiz_id)
+
+        total = attempt.question_count
+        correct = attempt.correct_count
+
+        attempt.score = round((correct / total) * 100, 2) if total else 0
+        attempt.completed = True
+        attempt.finished_at = attempt.finished_at or timezone.now()
+        attempt.save(update_fields=["score", "completed", "finished_at"])
+
+        record_finish(attempt, category_id, previous)
+        user_stats.record_finish(attempt, previous)
+        bump_on_commit(f"user:{user.id}", "leaderboard")
+
+    return attempt
@@ -0,0 +1,115 @@
+import uuid
+
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils.dateparse import parse_datetime
+
+from .models import QuizAttempt, UserDailyStats
+from .pagination import decode_cursor, encode_cursor
+
+RESOLUTIONS = ("day", "week", "month")
+DEFAULT_POINTS = 365
+MAX_POINTS = 2000
+
+DEFAULT_RAW_PAGE_SIZE = 100
+MAX_RAW_PAGE_SIZE = 500
+
+
+# ============================================================
+# BUCKETED SERIES (FROM THE DAILY ROLLUP)
+# ============================================================
+
+def series(user, resolution="day"):
+    """
+    (date, attempts, average score) per day, ISO week (Monday) or month,
+    oldest first. Weeks and months are grouped in SQL over UserDailyStats,
+    so the rows read never exceed the user's days of history.
+    """
+    rows = UserDailyStats.objects.filter(user=user)
+    if resolution == "day":
+        rows = rows.values_list("date", "attempt_count", "score_sum").order_by("date")
+    else:
+        trunc = TruncWeek if resolution == "week" else TruncMonth
+        rows = (
+            rows.annotate(period=trunc("date"))
+            .values("period")
+            .annotate(attempts=Sum("attempt_count"), total=Sum("score_sum"))
+            .order_by("period")
+            .values_list("period", "attempts", "total")
+        )
+    return [(day, attempts, score_sum / attempts) for day, attempts, score_sum in rows]
+
+
+def lttb(points, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling of (x, y, ...) tuples
+    sorted by x: keeps the first and last point and, from each of
+    threshold - 2 equal buckets in between, the point forming the largest
+    triangle with the previously kept point and the next bucket's mean.
+    Peaks and dips survive far better than with plain averaging.
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+
+        next_end = min(int((i + 2) * every) + 1, n)
+        next_bucket = points[end:next_end] or points[-1:]
+        avg_x = sum(p[0] for p in next_bucket) / len(next_bucket)
+        avg_y = sum(p[1] for p in next_bucket) / len(next_bucket)
+
+        ax, ay = points[a][0], points[a][1]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (points[j][1] - ay) - (ax - points[j][0]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def downsample(rows, points):
+    """LTTB over (date, attempts, score) rows, with dates as day ordinals for x."""
+    if len(rows) <= points:
+        return rows
+    keyed = [(day.toordinal(), score, day, attempts) for day, attempts, score in rows]
+    return [(day, attempts, score) for _, score, day, attempts in lttb(keyed, points)]
+
+
+# ============================================================
+# RAW PER-ATTEMPT SERIES (KEYSET PAGINATION)
+# ============================================================
+
+def raw_page(user, limit=DEFAULT_RAW_PAGE_SIZE, cursor=None):
+    """
+    One page of completed attempts as (started_at, score, id), oldest
+    first. Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    rows = (
+        QuizAttempt.objects
+        .filter(user=user, completed=True)
+        .order_by("started_at", "id")
+        .values_list("started_at", "score", "id")
+    )
+    if cursor:
+        started_at, attempt_id = decode_cursor(cursor, parse_datetime, uuid.UUID)
+        if started_at is None:
+            raise ValueError("Invalid cursor")
+        rows = rows.filter(
+            Q(started_at__gt=started_at) | Q(started_at=started_at, id__gt=attempt_id)
+        )
+
+    page = list(rows[:limit + 1])
+    if len(page) > limit:
+        last = page[limit - 1]
+        return page[:limit], encode_cursor([last[0].isoformat(), str(last[2])])
+    return page, None
@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+
+
+# ============================================================
+# PROMPT -> COMPLETION CACHE (SQLITE)
+# ============================================================
+
+class PromptCache:
+    """
+    Disk-backed cache of raw LLM completions, keyed by a hash of the
+    provider, model, temperature and the fully rendered messages.
+
+    Each key holds up to `variants` completions. Until that many have
+    been collected a lookup is a miss (so the LLM is asked again and the
+    new completion is added); after that a random one is returned, which
+    keeps quizzes varied while replays cost nothing.
+
+    Entries older than `ttl` seconds are ignored and purged; once the
+    stored text exceeds `max_bytes` the least recently used rows go first.
+    SQLite handles locking between threads and worker processes.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS completions (
+            id INTEGER PRIMARY KEY,
+            key TEXT NOT NULL,
+            text TEXT NOT NULL,
+            bytes INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS completions_key ON completions (key);
+        CREATE INDEX IF NOT EXISTS completions_last_used ON completions (last_used);
+    """
+
+    def __init__(self, path, ttl, max_bytes, variants=1):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.variants = max(1, variants)
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evicted": 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn().executescript(self.SCHEMA)
+
+    def _conn(self):
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(provider, model, temperature, messages):
+        payload = json.dumps(
+            [provider, model, temperature, messages], sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def get(self, key):
+        now = time.time()
+        conn = self._conn()
+        rows = conn.execute(
+            "SELECT id, text FROM completions WHERE key = ? AND created_at >= ?",
+            (key, now - self.ttl),
+        ).fetchall()
+
+        if len(rows) < self.variants:
+            self._count("misses")
+            return None
+
+        row_id, text = random.choice(rows)
+        conn.execute("UPDATE completions SET last_used = ? WHERE id = ?", (now, row_id))
+        self._count("hits")
+        return text
+
+    def put(self, key, text):
+        now = time.time()
+        size = len(text.encode("utf-8"))
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO completions (key, text, bytes, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, text, size, now, now),
+            )
+            # keep only the newest `variants` completions for a key
+            conn.execute(
+                "DELETE FROM completions WHERE key = ? AND id NOT IN ("
+                "SELECT id FROM completions WHERE key = ? ORDER BY id DESC LIMIT ?)",
+                (key, key, self.variants),
+            )
+            evicted = self._evict(conn, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        with self._stats_lock:
+            self._stats["stores"] += 1
+            self._stats["evicted"] += evicted
+
+    def _evict(self, conn, now):
+        """Drop expired rows, then least recently used ones until under max_bytes."""
+        evicted = conn.execute(
+            "DELETE FROM completions WHERE created_at < ?", (now - self.ttl,)
+        ).rowcount
+
+        total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM completions").fetchone()[0]
+        if total <= self.max_bytes:
+            return evicted
+
+        doomed = []
+        for row_id, size in conn.execute(
+            "SELECT id, bytes FROM completions ORDER BY last_used"
+        ):
+            if total <= self.max_bytes:
+                break
+            doomed.append((row_id,))
+            total -= size
+        conn.executemany("DELETE FROM completions WHERE id = ?", doomed)
+        return evicted + len(doomed)
+
+    def clear(self):
+        self._conn().execute("DELETE FROM completions")
+
+    def stats(self):
+        entries, keys, stored = self._conn().execute(
+            "SELECT COUNT(*), COUNT(DISTINCT key), COALESCE(SUM(bytes), 0) FROM completions"
+        ).fetchone()
+
+        with self._stats_lock:
+            data = dict(self._stats)
+        lookups = data["hits"] + data["misses"]
+        data["hit_ratio"] = round(data["hits"] / lookups, 2) if lookups else 0
+        data.update({
+            "entries": entries,
+            "keys": keys,
+            "bytes_stored": stored,
+            "max_bytes": self.max_bytes,
+            "variants": self.variants,
+        })
+        return data
+
+
+# ============================================================
+# SHARED INSTANCE
+# ============================================================
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prompt_cache():
+    """The shared cache, or None when QUIZ_PROMPT_CACHE is off."""
+    global _cache
+    if not settings.QUIZ_PROMPT_CACHE:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = PromptCache(
+                settings.QUIZ_PROMPT_CACHE_PATH,
+                ttl=settings.QUIZ_PROMPT_CACHE_TTL,
+                max_bytes=settings.QUIZ_PROMPT_CACHE_MAX_BYTES,
+                variants=settings.QUIZ_PROMPT_CACHE_VARIANTS,
+            )
+    return _cache
+
+
+def reset_prompt_cache():
+    """Drop the shared instance (after changing cache settings at runtime)."""
+    global _cache
+    with _cache_lock:
+        _cache = None
@@ -0,0 +1,247 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+
+from django.conf import settings
+
+
+# ============================================================
+# PROVIDER INTERFACE
+# ============================================================
+
+class ProviderError(Exception):
+    pass
+
+
+class LLMResponse:
+    def __init__(self, text, model, prompt_tokens=0, completion_tokens=0):
+        self.text = text
+        self.model = model
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+
+class BaseProvider:
+    """
+    One chat-completion backend. Adapters turn the vendor SDK into
+    complete() (whole text) and stream() (text deltas).
+    """
+    name = "base"
+    default_model = ""
+
+    def __init__(self, model=None):
+        self.model = model or self.default_model
+
+    def available(self):
+        return True
+
+    def complete(self, messages, max_tokens, temperature):
+        raise NotImplementedError
+
+    def stream(self, messages, max_tokens, temperature):
+        raise NotImplementedError
+
+
+# ============================================================
+# OPENAI-COMPATIBLE ADAPTERS (GROQ, OPENAI)
+# ============================================================
+
+class _ChatCompletionsProvider(BaseProvider):
+    api_key_env = ""
+
+    def __init__(self, model=None):
+        super().__init__(model)
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    def available(self):
+        return bool(os.getenv(self.api_key_env))
+
+    def make_client(self):
+        raise NotImplementedError
+
+    @property
+    def client(self):
+        # created on first use, not at import time
+        with self._client_lock:
+            if self._client is None:
+                self._client = self.make_client()
+        return self._client
+
+    def complete(self, messages, max_tokens, temperature):
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+        )
+        usage = getattr(response, "usage", None)
+        return LLMResponse(
+            response.choices[0].message.content or "",
+            model=self.model,
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+        )
+
+    def stream(self, messages, max_tokens, temperature):
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+        )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
+
+class GroqProvider(_ChatCompletionsProvider):
+    name = "groq"
+    default_model = "llama-3.1-8b-instant"
+    api_key_env = "GROQ_API_KEY"
+
+    def make_client(self):
+        from groq import Groq
+        return Groq(api_key=os.getenv(self.api_key_env))
+
+
+class OpenAIProvider(_ChatCompletionsProvider):
+    name = "openai"
+    default_model = "gpt-4o-mini"
+    api_key_env = "OPENAI_API_KEY"
+
+    def make_client(self):
+        from openai import OpenAI
+        return OpenAI(api_key=os.getenv(self.api_key_env))
+
+
+# ============================================================
+# FAKE PROVIDER (OFFLINE LOAD TESTING)
+# ============================================================
+
+class FakeProvider(BaseProvider):
+    """
+    Deterministic offline provider. The same prompt always yields the
+    same questions, so benchmarks are repeatable without network access.
+
+    latency:      seconds slept per call (stream spreads it over chunks)
+    failure_rate: fraction of calls that raise ProviderError, decided by
+                  a seeded RNG so failures are reproducible too
+    """
+    name = "fake"
+    default_model = "fake-mcq-1"
+
+    STREAM_CHUNK = 24
+
+    def __init__(self, model=None, latency=0.0, failure_rate=0.0, seed=0):
+        super().__init__(model)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def _should_fail(self):
+        with self._rng_lock:
+            return self._rng.random() < self.failure_rate
+
+    def render(self, messages):
+        prompt = messages[-1]["content"]
+        count_match = re.search(r"Generate (\d+)", prompt)
+        topic_match = re.search(r'for "([^"]+)"', prompt)
+        difficulty_match = re.search(r"Difficulty: (\w+)", prompt)
+
+        count = int(count_match.group(1)) if count_match else 5
+        topic = topic_match.group(1) if topic_match else "General"
+        difficulty = difficulty_match.group(1) if difficulty_match else "medium"
+
+        seed = int.from_bytes(hashlib.sha256(prompt.encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+
+        questions = []
+        for i in range(count):
+            token = rng.randrange(10 ** 6)
+            correct = rng.randrange(4)
+            questions.append({
+                "question": f"[{difficulty}] {topic} question #{token}: which statement {i + 1} holds?",
+                "choices": [f"{topic} option {token}-{c}" for c in range(4)],
+                "correct_choice_index": correct,
+                "explanation": f"Option {correct} is correct for case {token}.",
+                "references": [],
+            })
+        return json.dumps({"questions": questions})
+
+    def complete(self, messages, max_tokens, temperature):
+        if self.latency:
+            time.sleep(self.latency)
+        if self._should_fail():
+            raise ProviderError("fake provider: injected failure")
+
+        text = self.render(messages)
+        return LLMResponse(
+            text,
+            model=self.model,
+            prompt_tokens=len(messages[-1]["content"]) // 4,
+            completion_tokens=len(text) // 4,
+        )
+
+    def stream(self, messages, max_tokens, temperature):
+        if self._should_fail():
+            raise ProviderError("fake provider: injected failure")
+
+        text = self.render(messages)
+        pieces = [text[i:i + self.STREAM_CHUNK] for i in range(0, len(text), self.STREAM_CHUNK)]
+        pause = self.latency / len(pieces) if self.latency and pieces else 0
+        for piece in pieces:
+            if pause:
+                time.sleep(pause)
+            yield piece
+
+
+# ============================================================
+# SELECTION
+# ============================================================
+
+PROVIDERS = {
+    "groq": GroqProvider,
+    "openai": OpenAIProvider,
+    "fake": FakeProvider,
+}
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def get_provider(name=None):
+    """
+    Return the shared provider instance, QUIZ_LLM_PROVIDER by default.
+    """
+    name = name or settings.QUIZ_LLM_PROVIDER
+    with _instances_lock:
+        if name not in _instances:
+            if name not in PROVIDERS:
+                raise ProviderError(f"Unknown LLM provider: {name}")
+
+            model = settings.QUIZ_LLM_MODEL if name == settings.QUIZ_LLM_PROVIDER else None
+            if name == "fake":
+                _instances[name] = FakeProvider(
+                    model=model,
+                    latency=settings.QUIZ_FAKE_LLM_LATENCY,
+                    failure_rate=settings.QUIZ_FAKE_LLM_FAILURE_RATE,
+                )
+            else:
+                _instances[name] = PROVIDERS[name](model=model)
+        return _instances[name]
+
+
+def reset_providers():
+    """Drop cached instances (after changing provider settings at runtime)."""
+    with _instances_lock:
+        _instances.clear()
@@ -0,0 +1,222 @@
+import random
+
+from django.db import transaction
+
+from .models import QuestionTemplate
+from .generate_quiz import generate_questions, stream_questions
+from .persistence import store_questions, save_quiz
+
+
+# ============================================================
+# BANK SAMPLING
+# ============================================================
+
+def sample_bank_questions(category, subcategory, difficulty, count):
+    """
+    Pick up to `count` random template ids for a topic from the bank.
+
+    Only the id column is read and the random pick happens in Python,
+    so MySQL never has to sort the whole pool the way ORDER BY RAND()
+    does.
+    """
+    pool = list(
+        QuestionTemplate.objects
+        .filter(category=category, subcategory=subcategory, difficulty=difficulty)
+        .values_list("id", flat=True)
+    )
+    picked = random.sample(pool, min(count, len(pool)))
+    return [str(qid) for qid in picked]
+
+
+def sample_fallback_questions(category, subcategory, difficulty, count, exclude=()):
+    """
+    Fill a shortfall from the bank when the LLM cannot be used (circuit
+    open, throttled or failing), relaxing the match step by step: same
+    subcategory and difficulty, then same subcategory, then anything in
+    the category. One query; the ranking happens in Python.
+    """
+    exclude = set(exclude)
+    rows = (
+        QuestionTemplate.objects
+        .filter(category=category)
+        .values_list("id", "subcategory_id", "difficulty")
+    )
+
+    tiers = ([], [], [])
+    subcat_id = subcategory.id if subcategory else None
+    for qid, row_subcat, row_difficulty in rows:
+        qid = str(qid)
+        if qid in exclude:
+            continue
+        same_subcat = row_subcat == subcat_id
+        if same_subcat and row_difficulty == difficulty:
+            tiers[0].append(qid)
+        elif same_subcat:
+            tiers[1].append(qid)
+        else:
+            tiers[2].append(qid)
+
+    picked = []
+    for tier in tiers:
+        if len(picked) >= count:
+            break
+        picked += random.sample(tier, min(count - len(picked), len(tier)))
+    return picked
+
+
+# ============================================================
+# QUIZ ASSEMBLY
+# ============================================================
+
+class QuizUnavailable(Exception):
+    """Neither the LLM nor the question bank could supply any questions."""
+
+
+def assemble_questions(category, subcategory, difficulty, count, bank_first=True, use_cache=True):
+    """
+    Collect the questions for a new quiz without writing anything.
+
+    In bank-first mode existing templates are used first and the LLM is
+    only asked for the shortfall. Whatever the LLM could not deliver is
+    topped up from the bank with relaxed filters. Returns (bank_ids,
+    new_questions, bank_stats) where bank_stats reports hits (served from
+    the bank), misses (requested from the LLM) and fallback (bank
+    questions used because the LLM fell short) for this request.
+    use_cache=False also bypasses the prompt cache for the LLM call.
+    """
+    bank_ids = []
+    if bank_first:
+        bank_ids = sample_bank_questions(category, subcategory, difficulty, count)
+
+    hits = len(bank_ids)
+    misses = count - hits
+
+    questions = []
+    if misses > 0:
+        topic = subcategory.name if subcategory else category.name
+        questions = generate_questions(topic, difficulty, misses, use_cache=use_cache)
+
+    fallback = []
+    if misses - len(questions) > 0:
+        fallback = sample_fallback_questions(
+            category, subcategory, difficulty, misses - len(questions), exclude=bank_ids
+        )
+        bank_ids += fallback
+
+    return bank_ids, questions, {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / count, 2) if count else 0,
+        "fallback": len(fallback),
+    }
+
+
+def create_quiz(category, subcategory, difficulty, count, bank_first=True, use_cache=True):
+    """
+    Assemble questions and create the Quiz row. Shared by the
+    synchronous generate endpoint and the background job worker.
+
+    The LLM call happens before the transaction opens; the writes that
+    follow are all-or-nothing. Raises QuizUnavailable rather than saving
+    a quiz with no questions.
+    """
+    bank_ids, questions, bank_stats = assemble_questions(
+        category, subcategory, difficulty, count, bank_first=bank_first, use_cache=use_cache
+    )
+    if not bank_ids and not questions:
+        raise QuizUnavailable("No questions could be generated.")
+
+    with transaction.atomic():
+        generated = store_questions(questions, category, subcategory, difficulty)
+        # a generated question can collapse onto one already sampled;
+        # top the quiz back up from the bank like stream_quiz does
+        template_ids = list(dict.fromkeys(bank_ids + generated))
+        if len(template_ids) < count:
+            refill = sample_fallback_questions(
+                category, subcategory, difficulty, count - len(template_ids), exclude=template_ids
+            )
+            template_ids += refill
+            bank_stats["fallback"] += len(refill)
+        random.shuffle(template_ids)
+
+        quiz = save_quiz(category, subcategory, difficulty, template_ids, len(template_ids))
+
+    return quiz, bank_stats
+
+
+# ============================================================
+# STREAMING ASSEMBLY (SSE)
+# ============================================================
+
+def question_payload(template_id, question_text, choices, difficulty, source):
+    return {
+        "id": str(template_id),
+        "question_text": question_text,
+        "choices": choices,
+        "difficulty": difficulty,
+        "source": source,
+    }
+
+
+def templates_in_order(template_ids):
+    """The templates for `template_ids`, in that order."""
+    templates = {str(qt.id): qt for qt in QuestionTemplate.objects.filter(id__in=template_ids)}
+    return [templates[tid] for tid in template_ids if tid in templates]
+
+
+def stream_quiz(category, subcategory, difficulty, count, bank_first=True, use_cache=True):
+    """
+    Like create_quiz, but yields ("question", payload) as soon as each
+    question is available: bank hits first, then LLM questions as they
+    are parsed out of the streamed completion and saved. Ends with
+    ("done", ...) carrying the quiz id, or ("error", ...).
+    """
+    template_ids = []
+    if bank_first:
+        template_ids = sample_bank_questions(category, subcategory, difficulty, count)
+        for qt in templates_in_order(template_ids):
+            yield "question", question_payload(
+                qt.id, qt.question_text, qt.choices, difficulty, "bank"
+            )
+
+    hits = len(template_ids)
+    misses = count - hits
+
+    if misses > 0:
+        topic = subcategory.name if subcategory else category.name
+        for q in stream_questions(topic, difficulty, misses, use_cache=use_cache):
+            qid = store_questions([q], category, subcategory, difficulty)[0]
+            if qid in template_ids:
+                continue
+            template_ids.append(qid)
+            yield "question", question_payload(
+                qid, q["question"], q["choices"], difficulty, "llm"
+            )
+            if len(template_ids) >= count:
+                break
+
+    fallback = []
+    if len(template_ids) < count:
+        fallback = sample_fallback_questions(
+            category, subcategory, difficulty, count - len(template_ids), exclude=template_ids
+        )
+        for qt in templates_in_order(fallback):
+            yield "question", question_payload(
+                qt.id, qt.question_text, qt.choices, qt.difficulty, "bank"
+            )
+        template_ids += fallback
+
+    if not template_ids:
+        yield "error", {"detail": "No questions could be generated."}
+        return
+
+    quiz = save_quiz(category, subcategory, difficulty, template_ids, len(template_ids))
+    yield "done", {
+        "quiz_id": str(quiz.id),
+        "bank": {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / count, 2) if count else 0,
+            "fallback": len(fallback),
+        },
+    }
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.response import Response
+
+# headers that are part of a cached response (pagination)
+KEPT_HEADERS = ("X-Next-Cursor", "Link")
+
+LOCK_TIMEOUT = 10
+WAIT_FOR_BUILD = 2.0
+POLL_INTERVAL = 0.05
+
+
+# ============================================================
+# VERSION COUNTERS
+# ============================================================
+# Cached responses are keyed by a version that writes bump, so nothing
+# is ever deleted: a bump just makes the old keys unreachable (they age
+# out with QUIZ_RESPONSE_CACHE_TTL). "user:<id>" covers one user's
+# dashboard, progress and analytics; "leaderboard" every leaderboard.
+
+def version_key(scope):
+    return f"quiz:response-version:{scope}"
+
+
+def get_version(scope):
+    version = cache.get(version_key(scope))
+    if version is None:
+        # start from the clock, not 1: if the counter is evicted (or the
+        # database reset) a restart must not line up with old responses
+        cache.add(version_key(scope), time.time_ns(), None)
+        version = cache.get(version_key(scope), time.time_ns())
+    return version
+
+
+def bump(scope):
+    try:
+        cache.incr(version_key(scope))
+    except ValueError:
+        cache.set(version_key(scope), time.time_ns(), None)
+
+
+def bump_on_commit(*scopes):
+    """Bump once the transaction commits, so a rebuild never sees old rows."""
+    transaction.on_commit(lambda: [bump(scope) for scope in scopes])
+
+
+# ============================================================
+# CACHED VIEWS
+# ============================================================
+
+def response_key(scope, request, per_user=False):
+    """
+    `scope` is "user:<id>" for one user's pages, or a shared scope
+    ("leaderboard") whose responses are the same for every caller and so
+    cached once. `per_user` keys a shared scope by caller as well, for
+    views that answer about the caller (their rank).
+    """
+    version = get_version(scope)
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    key = f"quiz:response:{scope}:{version}:{path}"
+    if per_user:
+        key += f":{request.user.id}"
+    if scope == "leaderboard":
+        # day and week windows roll over without any write
+        key += f":{timezone.localdate().isoformat()}"
+    return key
+
+
+def build_entry(view, args, kwargs):
+    response = view(*args, **kwargs)
+    if response.status_code != 200:
+        return None, response
+
+    body = json.dumps(response.data, cls=DjangoJSONEncoder, sort_keys=True)
+    entry = {
+        "data": response.data,
+        "etag": '"%s"' % hashlib.md5(body.encode()).hexdigest(),
+        "headers": {h: response[h] for h in KEPT_HEADERS if response.has_header(h)},
+    }
+    return entry, response
+
+
+def get_or_build(key, view, args, kwargs):
+    """
+    The cached entry for `key`, building it on a miss. Only one request
+    per key builds at a time (a cache.add lock holding the builder's
+    token); others wait for its result up to WAIT_FOR_BUILD seconds
+    before building it themselves, leaving the lock alone.
+    Returns (entry, response); response is set when the view returned
+    something that isn't cached (errors).
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        return entry, None
+
+    lock = f"{key}:lock"
+    token = uuid.uuid4().hex
+    owner = cache.add(lock, token, LOCK_TIMEOUT)
+    if not owner:
+        deadline = time.monotonic() + WAIT_FOR_BUILD
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry, None
+
+    try:
+        entry, response = build_entry(view, args, kwargs)
+        if entry is None:
+            return None, response
+        cache.set(key, entry, settings.QUIZ_RESPONSE_CACHE_TTL)
+        return entry, None
+    finally:
+        # a waiter that gave up leaves the lock to the builder still
+        # holding it; a builder that overran LOCK_TIMEOUT may find
+        # someone else's lock, which it must not release either
+        if owner and cache.get(lock) == token:
+            cache.delete(lock)
+
+
+def cached_response(scope, per_user=False):
+    """
+    Cache a GET view's 200 responses under a version counter (see
+    bump_on_commit) and answer If-None-Match with 304. `scope` is "user"
+    (the caller's own data) or "leaderboard" (shared rankings, one entry
+    for all callers unless `per_user`). Works on APIView methods and
+    @api_view functions alike.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not settings.QUIZ_RESPONSE_CACHE:
+                return view(*args, **kwargs)
+
+            request = args[-1]
+            name = f"user:{request.user.id}" if scope == "user" else scope
+            key = response_key(name, request, per_user)
+            entry, response = get_or_build(key, view, args, kwargs)
+            if entry is None:
+                return response
+
+            headers = {**entry["headers"], "ETag": entry["etag"], "Cache-Control": "private, no-cache"}
+            if entry["etag"] in request.headers.get("If-None-Match", ""):
+                return Response(status=304, headers=headers)
+            return Response(entry["data"], headers=headers)
+        return wrapper
+    return decorator
@@ -6,6 +6,7 @@ from .models import (
     QuestionTemplate,
     QuizAttempt,
     QuestionAttempt,
+    GenerationJob,
 )
 
 # ============================================================
@@ -101,6 +102,27 @@ class QuizAttemptSerializer(serializers.ModelSerializer):
 
 
 
+# ============================================================
+# GENERATION JOB SERIALIZER
+# ============================================================
+
+class GenerationJobSerializer(serializers.ModelSerializer):
+    job_id = serializers.UUIDField(source="id", read_only=True)
+    quiz_id = serializers.UUIDField(source="quiz.id", read_only=True, default=None)
+
+    class Meta:
+        model = GenerationJob
+        fields = [
+            "job_id",
+            "status",
+            "quiz_id",
+            "bank_stats",
+            "error",
+            "created_at",
+            "finished_at",
+        ]
+
+
 # ============================================================
 # CATEGORY GROUP SERIALIZERS (UNCHANGED)
 # ============================================================
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import QuestionTemplate
+from .answer_keys import invalidate_for_templates
+from .persistence import remove_from_counters
+
+
+@receiver(post_save, sender=QuestionTemplate)
+def invalidate_answer_keys(sender, instance, created, **kwargs):
+    # a new template isn't part of any attempt yet
+    if not created:
+        invalidate_for_templates([instance.id])
+
+
+@receiver(pre_delete, sender=QuestionTemplate)
+def invalidate_answer_keys_on_delete(sender, instance, **kwargs):
+    # before the cascade removes the answers that lead to the attempts
+    invalidate_for_templates([instance.id])
+    remove_from_counters([instance.id])
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+
+# ============================================================
+# IN-PROCESS SINGLE-FLIGHT
+# ============================================================
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls that share a key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers
+    arriving while it is in flight wait and receive the same result (or
+    the same exception). Nothing is cached once the call completes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {"calls": 0, "executed": 0, "collapsed": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats["executed"] += 1
+            else:
+                self._stats["collapsed"] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            data["in_flight"] = len(self._calls)
+        data["mode"] = "process"
+        return data
+
+
+# ============================================================
+# CROSS-PROCESS SINGLE-FLIGHT (FILE LOCK)
+# ============================================================
+
+class FileSingleFlight(SingleFlight):
+    """
+    Single-flight shared by every worker process on the host.
+
+    Threads inside one process are collapsed in memory first. The
+    in-process leader then takes a lock file (O_CREAT | O_EXCL, so it
+    works on any OS); leaders in other processes that find the lock
+    taken wait for it to be released and read the result the owner
+    wrote next to it. Results must be JSON-serialisable.
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, directory, wait_timeout=60, stale_after=120):
+        super().__init__()
+        self.directory = directory
+        self.wait_timeout = wait_timeout
+        self.stale_after = stale_after
+        self._stats["collapsed_remote"] = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def do(self, key, fn, *args, **kwargs):
+        return super().do(key, self._do_shared, key, fn, *args, **kwargs)
+
+    def _paths(self, key):
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, digest)
+        return base + ".lock", base + ".json"
+
+    def _do_shared(self, key, fn, *args, **kwargs):
+        lock_path, result_path = self._paths(key)
+        arrived = time.time()
+
+        while True:
+            try:
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                pass
+
+            result = self._wait_for_owner(lock_path, result_path, arrived)
+            if result is not None:
+                with self._lock:
+                    self._stats["collapsed_remote"] += 1
+                return result["result"]
+
+            if time.time() > arrived + self.wait_timeout:
+                # owner is too slow; don't keep this request hostage
+                return fn(*args, **kwargs)
+            # owner failed or went stale: try to become the owner
+
+        try:
+            value = fn(*args, **kwargs)
+            tmp_path = f"{result_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"finished_at": time.time(), "result": value}, f)
+            os.replace(tmp_path, result_path)
+            return value
+        finally:
+            try:
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+
+    def _wait_for_owner(self, lock_path, result_path, arrived):
+        deadline = arrived + self.wait_timeout
+        while os.path.exists(lock_path):
+            try:
+                if time.time() - os.path.getmtime(lock_path) > self.stale_after:
+                    os.remove(lock_path)
+                    return None
+            except FileNotFoundError:
+                break
+            if time.time() > deadline:
+                return None
+            time.sleep(self.POLL_INTERVAL)
+
+        try:
+            with open(result_path) as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # only accept a result produced by the flight we waited on
+        return result if result.get("finished_at", 0) >= arrived else None
+
+    def stats(self):
+        data = super().stats()
+        data["mode"] = "file"
+        return data
+
+
+# ============================================================
+# SHARED INSTANCE
+# ============================================================
+
+_flight = None
+_flight_lock = threading.Lock()
+
+
+def get_flight():
+    global _flight
+    with _flight_lock:
+        if _flight is None:
+            if settings.QUIZ_SINGLEFLIGHT_MODE == "file":
+                _flight = FileSingleFlight(settings.QUIZ_SINGLEFLIGHT_DIR)
+            else:
+                _flight = SingleFlight()
+    return _flight
@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.utils import timezone
+
+from .models import GenerationMetric
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================
+# PER-CALL TRACE
+# ============================================================
+
+class GenerationTrace:
+    """
+    Measurements for one provider call: wall time split into queue
+    (breaker + rate limiter), network and parse, token usage, and how
+    many questions came back, were accepted or rejected (and why).
+    """
+
+    def __init__(self, provider, topic, difficulty, requested, max_tokens, mode="complete"):
+        self.fields = {
+            "provider": provider.name,
+            "model": provider.model,
+            "topic": topic[:255],
+            "difficulty": difficulty,
+            "mode": mode,
+            "requested": requested,
+            "max_tokens": max_tokens,
+        }
+        self.timings = {"queue": 0.0, "network": 0.0, "parse": 0.0}
+        self.reasons = Counter()
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += time.perf_counter() - started
+
+    def timed_stream(self, deltas):
+        """Iterate a provider stream, counting time spent waiting on it as network."""
+        iterator = iter(deltas)
+        while True:
+            with self.phase("network"):
+                try:
+                    delta = next(iterator)
+                except StopIteration:
+                    return
+            yield delta
+
+    def reject(self, reason):
+        self.reasons[reason] += 1
+
+    def record(self, **fields):
+        """Queue the finished trace; rows are written by flush()."""
+        if not settings.QUIZ_GENERATION_METRICS:
+            return
+
+        data = dict(self.fields, **fields)
+        if data.get("error"):
+            data["error"] = str(data["error"])[:255]
+        data["rejected"] = sum(self.reasons.values())
+        data["rejection_reasons"] = dict(self.reasons)
+        for name, seconds in self.timings.items():
+            data[f"{name}_ms"] = round(seconds * 1000)
+
+        with _pending_lock:
+            _pending.append(GenerationMetric(**data))
+
+
+# ============================================================
+# BUFFERED WRITES
+# ============================================================
+
+# Fan-out chunks run on pool threads; they only append here, and the
+# request thread writes everything in one INSERT so the pool threads
+# never open database connections of their own.
+_pending = []
+_pending_lock = threading.Lock()
+
+
+def flush():
+    with _pending_lock:
+        rows = _pending[:]
+        _pending.clear()
+    if not rows:
+        return
+    try:
+        GenerationMetric.objects.bulk_create(rows)
+    except Exception:
+        # telemetry must never fail a generation request
+        logger.exception("Could not write %d generation metrics", len(rows))
+
+
+# ============================================================
+# AGGREGATION
+# ============================================================
+
+GROUP_FIELDS = ("provider", "model", "topic", "difficulty", "mode")
+
+
+def summarize(days=7, group_by=("model", "topic", "difficulty")):
+    """
+    Aggregate metrics for the last `days` days per `group_by` fields.
+    acceptance_rate is accepted over requested questions, rejection_rate
+    rejected over returned ones. tokens_per_question (completion tokens
+    per returned question, cache replays excluded) is the figure to size
+    max_tokens and chunking with.
+    """
+    group_by = [f for f in group_by if f in GROUP_FIELDS] or ["model"]
+    rows = GenerationMetric.objects.filter(
+        created_at__gte=timezone.now() - timedelta(days=days)
+    )
+
+    groups = (
+        rows.values(*group_by)
+        .annotate(
+            calls=Count("id"),
+            cache_hits=Count("id", filter=Q(cached=True)),
+            errors=Count("id", filter=~Q(error="")),
+            truncated_calls=Count("id", filter=Q(truncated=True)),
+            questions_requested=Sum("requested"),
+            questions_returned=Sum("returned"),
+            live_returned=Sum("returned", filter=Q(cached=False)),
+            questions_accepted=Sum("accepted"),
+            questions_rejected=Sum("rejected"),
+            total_prompt_tokens=Sum("prompt_tokens"),
+            total_completion_tokens=Sum("completion_tokens"),
+            max_completion_tokens=Max("completion_tokens"),
+            avg_queue_ms=Avg("queue_ms"),
+            avg_network_ms=Avg("network_ms"),
+            avg_parse_ms=Avg("parse_ms"),
+            max_network_ms=Max("network_ms"),
+        )
+        .order_by(*group_by)
+    )
+
+    # JSON counters can't be summed portably in SQL; fold them here
+    reasons = {}
+    for row in rows.filter(rejected__gt=0).values(*group_by, "rejection_reasons"):
+        key = tuple(row[f] for f in group_by)
+        reasons.setdefault(key, Counter()).update(row["rejection_reasons"])
+
+    report = []
+    for g in groups:
+        key = tuple(g[f] for f in group_by)
+        requested = g["questions_requested"] or 0
+        returned = g["questions_returned"] or 0
+        live_returned = g.pop("live_returned") or 0
+        g["acceptance_rate"] = round(g["questions_accepted"] / requested, 3) if requested else 0
+        g["rejection_rate"] = round(g["questions_rejected"] / returned, 3) if returned else 0
+        g["tokens_per_question"] = (
+            round(g["total_completion_tokens"] / live_returned, 1) if live_returned else None
+        )
+        for name in ("avg_queue_ms", "avg_network_ms", "avg_parse_ms"):
+            g[name] = round(g[name] or 0, 1)
+        g["rejection_reasons"] = dict(reasons.get(key, {}))
+        report.append(g)
+    return report
+
@@ -1,3 +1,2212 @@
-from django.test import TestCase
+import datetime
+import importlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from categories.models import CategoryGroup, Category
+from . import telemetry
+from .models import (
+    Subcategory,
+    QuestionTemplate,
+    Quiz,
+    QuizAttempt,
+    QuestionAttempt,
+    GenerationJob,
+    GenerationMetric,
+    LeaderboardEntry,
+    UserDailyStats,
+)
+from .answer_keys import cache_key, get_answer_key
+from .persistence import (
+    store_questions,
+    save_quiz,
+    start_attempt,
+    record_answer,
+    record_answers,
+    finish_attempt,
+)
+from .jobs import claim_next_job, requeue_stale_jobs, run_job
+from .generate_quiz import (
+    MAX_TOKENS,
+    QUESTIONS_PER_CHUNK,
+    fetch_questions,
+    generate_fanout,
+    generate_questions,
+    split_chunks,
+    stream_questions,
+)
+from .leaderboard import ALL_TIME, decode_cursor, rank, top
+from .llm_json import QuestionStreamParser, salvage_questions
+from .pagination import encode_cursor
+from .progress import downsample, lttb, raw_page
+from .prompt_cache import PromptCache, reset_prompt_cache
+from .providers import (
+    FakeProvider,
+    GroqProvider,
+    OpenAIProvider,
+    ProviderError,
+    get_provider,
+    reset_providers,
+)
+from .question_bank import create_quiz
+from .response_cache import get_or_build
+from .singleflight import FileSingleFlight, SingleFlight
+from .views import MAX_QUIZ_QUESTIONS
+from .throttle import (
+    CircuitBreaker,
+    CircuitOpen,
+    FileStore,
+    ProcessStore,
+    RateLimiter,
+    Throttled,
+    get_guard,
+    reset_guards,
+)
+
+
+def make_questions(n, prefix="Sample"):
+    return [
+        {
+            "question": f"{prefix} question {i}: which option is number {i % 4}?",
+            "choices": [f"opt {i}-{c}" for c in range(4)],
+            "correct_choice_index": i % 4,
+            "explanation": "",
+        }
+        for i in range(n)
+    ]
+
+
+class QuizTestCase(TestCase):
+    def setUp(self):
+        # answer keys and cached responses outlive the test database
+        cache.clear()
+        group = CategoryGroup.objects.create(name="Technology")
+        self.category = Category.objects.create(group=group, name="Python", slug="python")
+        self.subcategory = Subcategory.objects.create(category=self.category, name="Basics")
+        self.user = User.objects.create_user("student@example.com", password="pass")
+
+    def make_quiz(self, n):
+        ids = store_questions(make_questions(n), self.category, self.subcategory, "easy")
+        return save_quiz(self.category, self.subcategory, "easy", ids, n)
+
+    def play(self, quiz, user, correct=0, when=None):
+        """
+        Start and finish `quiz`, answering the first `correct` questions
+        right and the rest wrong; `when` fixes the finish time. Commit
+        hooks (cache bumps) run as in production.
+        """
+        attempt = start_attempt(quiz, user)
+        key = get_answer_key(attempt.id)
+        answers = {
+            qid: key.correct_choice(qid) if i < correct else (key.correct_choice(qid) + 1) % 4
+            for i, qid in enumerate(quiz.template_ids())
+        }
+        with self.captureOnCommitCallbacks(execute=True), \
+                mock.patch("quiz.persistence.timezone.now", return_value=when or timezone.now()):
+            record_answers(attempt.id, key, answers)
+            return finish_attempt(attempt.id, user)
+
+
+# ============================================================
+# PERSISTENCE — CONSTANT ROUND TRIPS
+# ============================================================
+
+class PersistenceQueryCountTests(QuizTestCase):
+    def count_queries(self, fn, *args):
+        with CaptureQueriesContext(connection) as ctx:
+            fn(*args)
+        return len(ctx.captured_queries)
+
+    def test_store_questions_query_count_is_constant(self):
+        small = self.count_queries(
+            store_questions, make_questions(5), self.category, None, "easy"
+        )
+        QuestionTemplate.objects.all().delete()
+        large = self.count_queries(
+            store_questions, make_questions(50), self.category, None, "easy"
+        )
+        self.assertEqual(small, large)
+
+    def test_store_questions_queries(self):
+        # duplicate lookup + templates, signatures, buckets INSERTs
+        # (+ savepoint/release from the atomic block under TestCase)
+        with self.assertNumQueries(6):
+            store_questions(make_questions(50), self.category, None, "easy")
+        self.assertEqual(QuestionTemplate.objects.count(), 50)
+
+    def test_start_attempt_queries(self):
+        quiz = self.make_quiz(50)
+        quiz = Quiz.objects.get(pk=quiz.pk)
+
+        # question join + attempt INSERT + bulk INSERT (+ savepoint/release)
+        with self.assertNumQueries(5):
+            attempt = start_attempt(quiz, self.user)
+
+        self.assertEqual(attempt.question_attempts.count(), 50)
+
+    def test_save_quiz_keeps_question_order(self):
+        ids = store_questions(make_questions(5), self.category, self.subcategory, "easy")
+        ids = ids[::-1] + ids[:1]
+
+        quiz = save_quiz(self.category, self.subcategory, "easy", ids, 5)
+
+        self.assertEqual(quiz.template_ids(), ids[:5])
+        self.assertEqual(QuestionTemplate.objects.get(id=ids[0]).quizzes.get(), quiz)
+
+    def test_start_attempt_skips_deleted_templates(self):
+        quiz = self.make_quiz(5)
+        QuestionTemplate.objects.filter(id=quiz.template_ids()[0]).delete()
+
+        attempt = start_attempt(quiz, self.user)
+        self.assertEqual(attempt.question_attempts.count(), 4)
+
+    def test_start_attempt_failure_leaves_nothing(self):
+        quiz = self.make_quiz(5)
+
+        with mock.patch.object(
+            QuestionAttempt.objects, "bulk_create", side_effect=RuntimeError("boom")
+        ):
+            with self.assertRaises(RuntimeError):
+                start_attempt(quiz, self.user)
+
+        self.assertFalse(QuizAttempt.objects.exists())
+
+    def test_create_quiz_reuses_bank(self):
+        self.make_quiz(5)
+
+        with mock.patch("quiz.question_bank.generate_questions") as generate:
+            quiz, stats = create_quiz(self.category, self.subcategory, "easy", 5)
+
+        generate.assert_not_called()
+        self.assertEqual(stats["hits"], 5)
+        self.assertEqual(len(quiz.template_ids()), 5)
+
+
+# ============================================================
+# QUIZ ASSEMBLY — BANK, LLM AND DEDUP
+# ============================================================
+
+class QuizAssemblyTests(QuizTestCase):
+    def test_generated_duplicates_of_sampled_questions_are_refilled(self):
+        self.make_quiz(5)
+        store_questions(make_questions(5, "Other"), self.category, self.subcategory, "hard")
+
+        with mock.patch("quiz.question_bank.generate_questions", return_value=make_questions(5)):
+            quiz, stats = create_quiz(self.category, self.subcategory, "easy", 10)
+
+        self.assertEqual(len(quiz.template_ids()), 10)
+        self.assertEqual(quiz.time_limit, 10 * 60)
+        self.assertEqual(stats["fallback"], 5)
+
+    def test_time_limit_follows_the_questions_saved(self):
+        self.make_quiz(5)
+
+        with mock.patch("quiz.question_bank.generate_questions", return_value=make_questions(5)):
+            quiz, _ = create_quiz(self.category, self.subcategory, "easy", 10)
+
+        self.assertEqual(len(quiz.template_ids()), 5)
+        self.assertEqual(quiz.time_limit, 5 * 60)
+
+    def test_generate_endpoints_reject_bad_counts(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for url in ("/api/quiz/generate/", "/api/quiz/generate-async/", "/api/quiz/generate-stream/"):
+            for count in ("abc", -1, 0, None):
+                response = client.post(url, {"category": self.category.id, "count": count}, format="json")
+                self.assertEqual(response.status_code, 400, (url, count))
+        self.assertFalse(GenerationJob.objects.exists())
+
+    def test_generate_caps_large_counts(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        quiz = self.make_quiz(1)
+
+        with mock.patch("quiz.views.create_quiz", return_value=(quiz, {})) as create:
+            client.post("/api/quiz/generate/", {"category": self.category.id, "count": 10 ** 6}, format="json")
+        self.assertEqual(create.call_args.args[3], MAX_QUIZ_QUESTIONS)
+
+        client.post("/api/quiz/generate-async/", {"category": self.category.id, "count": 10 ** 6}, format="json")
+        self.assertEqual(GenerationJob.objects.get().count, MAX_QUIZ_QUESTIONS)
+
+    def test_near_duplicates_only_match_the_same_pool(self):
+        easy = store_questions(make_questions(3), self.category, self.subcategory, "easy")
+        hard = store_questions(make_questions(3), self.category, self.subcategory, "hard")
+        other = store_questions(make_questions(3), self.category, None, "easy")
+
+        self.assertFalse(set(easy) & set(hard))
+        self.assertFalse(set(easy) & set(other))
+        self.assertEqual(store_questions(make_questions(3), self.category, self.subcategory, "easy"), easy)
+
+
+class DedupeCommandTests(QuizTestCase):
+    def copy(self, template_id, **changes):
+        """A copy of a template that bypasses store_questions' dedup."""
+        template = QuestionTemplate.objects.get(id=template_id)
+        template.pk = None
+        for field, value in changes.items():
+            setattr(template, field, value)
+        template.save()
+        return str(template.id)
+
+    def dedupe(self):
+        out = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("dedupe_question_bank", stdout=out)
+        return out.getvalue()
+
+    def test_merges_only_within_a_pool(self):
+        easy = store_questions(make_questions(3), self.category, self.subcategory, "easy")
+        hard = [self.copy(tid, difficulty="hard") for tid in easy]
+        loose = [self.copy(tid, subcategory=None) for tid in easy]
+        easy_copies = [self.copy(tid) for tid in easy]
+        hard_quiz = save_quiz(self.category, self.subcategory, "hard", hard, 3)
+
+        self.assertIn("Removed 3 duplicates", self.dedupe())
+
+        remaining = {str(pk) for pk in QuestionTemplate.objects.values_list("id", flat=True)}
+        self.assertEqual(remaining, set(easy + hard + loose))
+        self.assertFalse(remaining & set(easy_copies))
+        self.assertEqual(hard_quiz.template_ids(), hard)
+
+    def test_moved_answers_keep_their_choice_text(self):
+        original = QuestionTemplate.objects.get(id=self.make_quiz(1).template_ids()[0])
+        # same question, choices reversed
+        copy = self.copy(
+            original.id, choices=original.choices[::-1], correct_choice=3 - original.correct_choice
+        )
+        quiz = save_quiz(self.category, self.subcategory, "easy", [copy], 1)
+        right = start_attempt(quiz, self.user)
+        record_answer(right.id, get_answer_key(right.id), copy, 3 - original.correct_choice)
+        wrong_choice = (original.correct_choice + 1) % 4
+        wrong = start_attempt(quiz, self.user)
+        record_answer(wrong.id, get_answer_key(wrong.id), copy, 3 - wrong_choice)
+
+        self.assertIn("Removed 1 duplicates", self.dedupe())
+
+        answers = {
+            qa.quiz_attempt_id: (str(qa.question_id), qa.selected_choice, qa.is_correct)
+            for qa in QuestionAttempt.objects.filter(quiz_attempt__in=[right, wrong])
+        }
+        self.assertEqual(answers, {
+            right.id: (str(original.id), original.correct_choice, True),
+            wrong.id: (str(original.id), wrong_choice, False),
+        })
+        self.assertEqual(finish_attempt(right.id, self.user).score, 100.0)
+
+    def test_copies_with_a_different_answer_are_not_merged(self):
+        original = QuestionTemplate.objects.get(id=self.make_quiz(1).template_ids()[0])
+        copy = self.copy(original.id, correct_choice=(original.correct_choice + 1) % 4)
+
+        self.assertIn("Removed 0 duplicates", self.dedupe())
+        self.assertTrue(QuestionTemplate.objects.filter(id=copy).exists())
+
+
+# ============================================================
+# ANSWER COUNTERS — RE-ANSWERS AND FLIPS
+# ============================================================
+
+class AnswerCounterTests(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz = self.make_quiz(4)
+        self.attempt = start_attempt(self.quiz, self.user)
+        self.key = get_answer_key(self.attempt.id)
+        self.qid = self.quiz.template_ids()[0]
+        self.right = self.key.correct_choice(self.qid)
+        self.wrong = (self.right + 1) % 4
+
+    def answer(self, selected):
+        record_answer(self.attempt.id, self.key, self.qid, selected)
+        self.attempt.refresh_from_db()
+        return self.attempt.answered_count, self.attempt.correct_count, self.attempt.easy_correct
+
+    def test_incorrect_to_correct(self):
+        self.assertEqual(self.answer(self.wrong), (1, 0, 0))
+        self.assertEqual(self.answer(self.right), (1, 1, 1))
+
+    def test_correct_to_incorrect(self):
+        self.assertEqual(self.answer(self.right), (1, 1, 1))
+        self.assertEqual(self.answer(self.wrong), (1, 0, 0))
+
+    def test_same_choice_again_changes_nothing(self):
+        self.assertEqual(self.answer(self.right), (1, 1, 1))
+        self.assertEqual(self.answer(self.right), (1, 1, 1))
+        self.assertEqual(self.answer(self.wrong), (1, 0, 0))
+        self.assertEqual(self.answer(self.wrong), (1, 0, 0))
+
+    def test_batch_flips_match_a_recount(self):
+        ids = self.quiz.template_ids()
+        right = {qid: self.key.correct_choice(qid) for qid in ids}
+        wrong = {qid: (choice + 1) % 4 for qid, choice in right.items()}
+
+        record_answers(self.attempt.id, self.key, dict(right, **{ids[0]: wrong[ids[0]]}))
+        record_answers(self.attempt.id, self.key, {ids[0]: right[ids[0]], ids[1]: wrong[ids[1]]})
+        record_answers(self.attempt.id, self.key, {ids[2]: right[ids[2]]})
+
+        self.attempt.refresh_from_db()
+        running = (self.attempt.answered_count, self.attempt.correct_count, self.attempt.easy_correct)
+        self.assertEqual(running, (4, 3, 3))
+
+        call_command("rebuild_attempt_counters", stdout=io.StringIO())
+        self.attempt.refresh_from_db()
+        self.assertEqual(
+            (self.attempt.answered_count, self.attempt.correct_count, self.attempt.easy_correct),
+            running,
+        )
+        self.assertEqual(finish_attempt(self.attempt.id, self.user).score, 75.0)
+
+
+class BatchAnswerEndpointTests(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz = self.make_quiz(50)
+        self.attempt = start_attempt(self.quiz, self.user)
+        self.key = get_answer_key(self.attempt.id)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, answers):
+        return self.client.post(
+            f"/api/attempt/{self.attempt.id}/answers/",
+            {"answers": [{"question_id": qid, "selected": choice} for qid, choice in answers]},
+            format="json",
+        )
+
+    def test_unknown_questions_are_reported_and_ignored(self):
+        ids = self.quiz.template_ids()
+        stranger = store_questions(make_questions(1, "Other"), self.category, None, "easy")[0]
+        missing = str(uuid.uuid4())
+
+        response = self.post([
+            (ids[0], self.key.correct_choice(ids[0])),
+            (stranger, 0),
+            (ids[1], (self.key.correct_choice(ids[1]) + 1) % 4),
+            (missing, 1),
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"saved": 2, "unknown": [stranger, missing]})
+        self.attempt.refresh_from_db()
+        self.assertEqual((self.attempt.answered_count, self.attempt.correct_count), (2, 1))
+
+    def test_single_answer_validation(self):
+        url = f"/api/attempt/{self.attempt.id}/answer/"
+        qid = self.quiz.template_ids()[0]
+        for data in ({}, {"question_id": qid}, {"question_id": qid, "selected": "x"},
+                     {"question_id": "not-a-uuid", "selected": 1}):
+            response = self.client.post(url, data, format="json")
+            self.assertEqual(response.status_code, 400, data)
+
+        # any spelling of the id is accepted
+        response = self.client.post(url, {"question_id": qid.replace("-", "").upper(), "selected": 2}, format="json")
+        self.assertEqual(response.json(), {"saved": True})
+        self.assertEqual(QuestionAttempt.objects.get(quiz_attempt=self.attempt, question_id=qid).selected_choice, 2)
+
+    def test_rejects_malformed_answers(self):
+        for answers in ([], [("not-a-uuid", 1)], [(self.quiz.template_ids()[0], "x")]):
+            self.assertEqual(self.post(answers).status_code, 400, answers)
+
+    def test_query_budget_does_not_grow_with_the_batch(self):
+        ids = self.quiz.template_ids()
+
+        # cached answer key, then one locked SELECT, one bulk UPDATE and
+        # one counter UPDATE (+ savepoint/release from the atomic block)
+        with self.assertNumQueries(5):
+            self.post([(qid, 0) for qid in ids[:2]])
+        with self.assertNumQueries(5):
+            self.post([(qid, 1) for qid in ids])
+
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.answered_count, 50)
+
+
+class AnswerKeyInvalidationTests(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz = self.make_quiz(3)
+        self.attempt = start_attempt(self.quiz, self.user)
+        self.template = QuestionTemplate.objects.get(id=self.quiz.template_ids()[0])
+
+    def cached(self):
+        return cache.get(cache_key(self.attempt.id))
+
+    def test_editing_a_template_drops_the_key(self):
+        self.assertIsNotNone(self.cached())
+        self.template.correct_choice = (self.template.correct_choice + 1) % 4
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.template.save()
+            # still cached until the edit commits
+            self.assertIsNotNone(self.cached())
+
+        self.assertIsNone(self.cached())
+        key = get_answer_key(self.attempt.id)
+        self.assertEqual(key.correct_choice(str(self.template.id)), self.template.correct_choice)
+
+    def test_finished_attempts_are_left_alone(self):
+        other = start_attempt(self.quiz, self.user)
+        finish_attempt(self.attempt.id, self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.template.save()
+
+        self.assertIsNotNone(self.cached())
+        self.assertIsNone(cache.get(cache_key(other.id)))
+
+    def test_deleting_a_template_drops_the_key(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.template.delete()
+
+        self.assertIsNone(self.cached())
+        self.assertNotIn(str(self.template.id), get_answer_key(self.attempt.id))
+
+    def test_deleting_a_template_leaves_it_out_of_the_score(self):
+        key = get_answer_key(self.attempt.id)
+        ids = self.quiz.template_ids()
+        record_answers(self.attempt.id, key, {qid: key.correct_choice(qid) for qid in ids[:2]})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.template.delete()
+
+        self.attempt.refresh_from_db()
+        counts = (self.attempt.question_count, self.attempt.answered_count,
+                  self.attempt.correct_count, self.attempt.easy_count, self.attempt.easy_correct)
+        self.assertEqual(counts, (2, 1, 1, 2, 1))
+        self.assertEqual(finish_attempt(self.attempt.id, self.user).score, 50.0)
+
+    def test_dedupe_merge_drops_the_key(self):
+        # a copy the bank's own dedup would have caught, added behind its back
+        copy = QuestionTemplate.objects.create(
+            category=self.category,
+            subcategory=self.subcategory,
+            difficulty="easy",
+            question_text=self.template.question_text,
+            choices=self.template.choices,
+            correct_choice=self.template.correct_choice,
+        )
+        quiz = save_quiz(self.category, self.subcategory, "easy", [str(copy.id)], 1)
+        attempt = start_attempt(quiz, self.user)
+        self.assertIn(str(copy.id), get_answer_key(attempt.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("dedupe_question_bank", stdout=io.StringIO())
+
+        self.assertIsNone(cache.get(cache_key(attempt.id)))
+        key = get_answer_key(attempt.id)
+        self.assertNotIn(str(copy.id), key)
+        self.assertIn(str(self.template.id), key)
+
+
+# ============================================================
+# ANALYTICS — QUERY BUDGET
+# ============================================================
+
+class AnalyticsQueryCountTests(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def finished_attempt(self, n, correct):
+        """An attempt of n easy questions with the first `correct` answered right."""
+        quiz = self.make_quiz(n)
+        attempt = start_attempt(quiz, self.user)
+        question_ids = quiz.template_ids()
+        templates = QuestionTemplate.objects.in_bulk(question_ids)
+        answers = {
+            qid: templates[uuid.UUID(qid)].correct_choice if i < correct else 9
+            for i, qid in enumerate(question_ids)
+        }
+        record_answers(attempt.id, get_answer_key(attempt.id), answers)
+        self.client.post(f"/api/attempt/{attempt.id}/finish/")
+        return attempt
+
+    def test_user_analytics_is_one_query(self):
+        self.finished_attempt(4, 2)
+        self.finished_attempt(4, 4)
+        start_attempt(self.make_quiz(3), self.user)  # unfinished, not counted
+
+        with self.assertNumQueries(1):
+            data = self.client.get("/api/user/analytics/").json()
+
+        self.assertEqual(data["total_quizzes"], 2)
+        self.assertEqual(data["average_score"], 75.0)
+        self.assertEqual(data["lifetime_accuracy"], 75.0)
+        self.assertEqual(data["difficulty_accuracy"], {"easy": 75.0, "medium": 0, "hard": 0})
+        # both attempts finished today: one progress point, the day's average
+        self.assertEqual([p["score"] for p in data["progress_graph"]], [75.0])
+
+    def test_user_analytics_queries_do_not_grow_with_history(self):
+        for _ in range(10):
+            self.finished_attempt(2, 1)
+
+        with self.assertNumQueries(1):
+            data = self.client.get("/api/user/analytics/").json()
+        self.assertEqual(data["total_quizzes"], 10)
+        self.assertEqual(len(data["progress_graph"]), 1)
+
+    def test_attempt_analytics_is_one_query(self):
+        attempt = self.finished_attempt(4, 3)
+
+        with self.assertNumQueries(1):
+            data = self.client.get(f"/api/attempt/{attempt.id}/analytics/").json()
+
+        self.assertEqual(data["accuracy"], 75.0)
+        self.assertEqual(
+            data["difficulty_breakdown"]["easy"],
+            {"correct": 3, "incorrect": 1, "accuracy": 75.0},
+        )
+
+
+class DailyStatsTests(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz = self.make_quiz(4)
+
+    def rows(self):
+        return set(UserDailyStats.objects.values_list("user_id", "date", "attempt_count", "score_sum", "correct_count"))
+
+    @override_settings(TIME_ZONE="America/Chicago")
+    def test_days_are_local_dates(self):
+        # 03:00 UTC on Jan 2 is still Jan 1 in Chicago
+        late = datetime.datetime(2026, 1, 2, 3, 0, tzinfo=datetime.timezone.utc)
+        self.play(self.quiz, self.user, correct=2, when=late)
+        self.play(self.quiz, self.user, correct=4, when=late + datetime.timedelta(hours=6))
+
+        incremental = self.rows()
+        self.assertEqual(incremental, {
+            (self.user.id, datetime.date(2026, 1, 1), 1, 50.0, 2),
+            (self.user.id, datetime.date(2026, 1, 2), 1, 100.0, 4),
+        })
+
+        call_command("backfill_daily_stats", stdout=io.StringIO())
+        self.assertEqual(self.rows(), incremental)
+
+    @override_settings(TIME_ZONE="America/Chicago")
+    def test_refinish_recomputes_the_day(self):
+        late = datetime.datetime(2026, 1, 2, 3, 0, tzinfo=datetime.timezone.utc)
+        attempt = self.play(self.quiz, self.user, correct=1, when=late)
+        key = get_answer_key(attempt.id)
+        qid = self.quiz.template_ids()[1]
+        record_answers(attempt.id, key, {qid: key.correct_choice(qid)})
+        with mock.patch("quiz.persistence.timezone.now", return_value=late):
+            finish_attempt(attempt.id, self.user)
+
+        self.assertEqual(self.rows(), {(self.user.id, datetime.date(2026, 1, 1), 1, 50.0, 2)})
+
+    def test_migration_backfills_existing_history(self):
+        self.play(self.quiz, self.user, correct=2)
+        self.play(self.quiz, self.user, correct=3, when=timezone.now() - datetime.timedelta(days=3))
+        incremental = self.rows()
+        UserDailyStats.objects.all().delete()
+
+        migration = importlib.import_module("quiz.migrations.0018_backfill_userdailystats")
+        migration.backfill_daily_stats(django_apps, None)
+
+        self.assertEqual(self.rows(), incremental)
+
+    def test_dashboard_counts_attempts_in_progress(self):
+        self.play(self.quiz, self.user, correct=2)
+        self.play(self.quiz, self.user, correct=4)
+        start_attempt(self.quiz, self.user)
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        data = client.get("/api/user/dashboard/").json()
+
+        self.assertEqual((data["total_quizzes"], data["average_score"]), (3, 50.0))
+
+
+# ============================================================
+# PROVIDER GUARD — RATE LIMIT AND CIRCUIT BREAKER
+# ============================================================
+
+class Clock:
+    """Stands in for time.time in quiz.throttle."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch("quiz.throttle.time.time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(ProcessStore(), "test", threshold=3, reset_after=30)
+
+    def test_opens_after_threshold_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow())
+        self.assertTrue(self.breaker.is_open())
+        self.assertEqual(self.breaker.retry_after(), 30)
+
+    def test_success_resets_the_failure_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+
+    def open(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now += 30
+
+    def test_half_open_lets_a_single_probe_through(self):
+        self.open()
+        self.assertEqual(self.breaker.stats()["state"], "half_open")
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+
+        self.breaker.record_success()
+        self.assertTrue(self.breaker.allow())
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_probe_opens_the_breaker_again(self):
+        self.open()
+        self.assertTrue(self.breaker.allow())
+
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.retry_after(), 30)
+
+    def test_lost_probe_is_replaced_after_a_reset_period(self):
+        self.open()
+        self.assertTrue(self.breaker.allow())
+        self.clock.now += 29
+        self.assertFalse(self.breaker.allow())
+        self.clock.now += 1
+        self.assertTrue(self.breaker.allow())
+
+    def test_file_store_shares_the_breaker_between_processes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            breaker = CircuitBreaker(FileStore(directory), "test", threshold=1, reset_after=30)
+            other = CircuitBreaker(FileStore(directory), "test", threshold=1, reset_after=30)
+
+            breaker.record_failure()
+            self.assertFalse(other.allow())
+
+
+class RateLimiterTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch("quiz.throttle.time.time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def limiter(self, rpm=0, tpm=0):
+        return RateLimiter(ProcessStore(), "test", rpm=rpm, tpm=tpm, max_wait=0)
+
+    def test_throttles_when_the_bucket_is_empty(self):
+        limiter = self.limiter(rpm=2)
+        limiter.acquire(0)
+        limiter.acquire(0)
+        with self.assertRaises(Throttled):
+            limiter.acquire(0)
+
+        self.clock.now += 30
+        limiter.acquire(0)
+        self.assertEqual(limiter.stats()["throttled"], 1)
+
+    def test_settle_corrects_the_estimate(self):
+        limiter = self.limiter(tpm=1000)
+        limiter.acquire(600)
+        self.assertEqual(limiter.stats()["available"]["tokens"], 400)
+
+        limiter.settle(600, 200)
+        self.assertEqual(limiter.stats()["available"]["tokens"], 800)
+
+        limiter.settle(100, 400)
+        self.assertEqual(limiter.stats()["available"]["tokens"], 500)
+
+        # unknown usage keeps the estimate; a refund never overfills
+        limiter.settle(100, None)
+        limiter.settle(5000, 1)
+        self.assertEqual(limiter.stats()["available"]["tokens"], 1000)
+
+
+@override_settings(
+    QUIZ_LLM_PROVIDER="fake",
+    QUIZ_LLM_GUARD_MODE="process",
+    QUIZ_LLM_RPM=1,
+    QUIZ_LLM_TPM=0,
+    QUIZ_LLM_THROTTLE_WAIT=0,
+    QUIZ_LLM_BREAKER_THRESHOLD=1,
+    QUIZ_LLM_BREAKER_RESET=30,
+)
+class ProviderGuardTests(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        reset_guards()
+        reset_providers()
+        self.addCleanup(reset_guards)
+        self.addCleanup(reset_providers)
+        self.guard = get_guard("fake")
+
+    def test_throttled_is_not_a_breaker_failure(self):
+        with self.guard.call(10):
+            pass
+        with self.assertRaises(Throttled):
+            with self.guard.call(10):
+                pass
+
+        self.assertEqual(self.guard.breaker.stats(), {"state": "closed", "failures": 0, "retry_after": 0})
+
+    def test_provider_error_counts_as_a_failure(self):
+        with self.assertRaises(ProviderError):
+            with self.guard.call(10):
+                raise ProviderError("boom")
+
+        self.assertTrue(self.guard.breaker.is_open())
+        with self.assertRaises(CircuitOpen):
+            with self.guard.call(10):
+                pass
+
+    def test_generate_returns_503_with_retry_after_while_open(self):
+        self.guard.breaker.record_failure()
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with self.assertLogs("quiz.generate_quiz", "WARNING") as logs:
+            response = client.post("/api/quiz/generate/", {
+                "category": self.category.id,
+                "subcategory": self.subcategory.id,
+                "difficulty": "easy",
+                "count": 5,
+            }, format="json")
+
+        self.assertIn("circuit is open", logs.output[0])
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "30")
+        self.assertFalse(Quiz.objects.exists())
+
+
+
+@override_settings(
+    QUIZ_LLM_PROVIDER="fake",
+    QUIZ_LLM_GUARD_MODE="process",
+    QUIZ_LLM_RPM=0,
+    QUIZ_LLM_TPM=10000,
+    QUIZ_LLM_THROTTLE_WAIT=0,
+    QUIZ_LLM_BREAKER_THRESHOLD=2,
+    QUIZ_LLM_BREAKER_RESET=30,
+    QUIZ_PROMPT_CACHE=False,
+)
+class StreamGuardTests(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        for reset in (reset_guards, reset_providers, reset_prompt_cache):
+            reset()
+            self.addCleanup(reset)
+        self.guard = get_guard("fake")
+        self.clock = Clock()
+        patcher = mock.patch("quiz.throttle.time.time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def stream(self):
+        return stream_questions("Python", "easy", 3)
+
+    def test_finished_stream_is_a_success_and_settles_tokens(self):
+        self.guard.breaker.record_failure()
+
+        self.assertEqual(len(list(self.stream())), 3)
+
+        self.assertEqual(self.guard.breaker.stats()["failures"], 0)
+        # charged max_tokens up front, then refunded down to the estimate of real use
+        self.assertGreater(self.guard.limiter.stats()["available"]["tokens"], 10000 - MAX_TOKENS)
+
+    def test_client_leaving_early_is_not_a_success(self):
+        self.guard.breaker.record_failure()
+        self.guard.breaker.record_failure()
+        self.clock.now += 31
+        stream = self.stream()
+
+        next(stream)  # takes the half-open probe
+        self.assertFalse(self.guard.breaker.allow())
+        stream.close()
+
+        self.assertEqual(self.guard.breaker.stats()["state"], "half_open")
+        # the probe slot is free again
+        self.assertTrue(self.guard.breaker.allow())
+
+    def test_provider_error_mid_stream_is_a_failure(self):
+        provider = get_provider()
+
+        def broken(messages, max_tokens, temperature):
+            yield provider.render(messages)[:200]
+            raise ProviderError("connection reset")
+
+        with mock.patch.object(provider, "stream", side_effect=broken), \
+                self.assertLogs("quiz.generate_quiz", "ERROR"):
+            list(self.stream())
+
+        self.assertEqual(self.guard.breaker.stats()["failures"], 1)
+
+    def test_guard_rejections_are_warnings(self):
+        self.guard.breaker.record_failure()
+        self.guard.breaker.record_failure()
+
+        with self.assertLogs("quiz.generate_quiz", "WARNING") as logs:
+            self.assertEqual(list(self.stream()), [])
+
+        self.assertEqual([record.levelname for record in logs.records], ["WARNING"])
+        self.assertIn("rejected", logs.output[0])
+        self.assertTrue(GenerationMetric.objects.get().error.startswith("CircuitOpen"))
+
+
+# ============================================================
+# RESPONSE CACHE — ETAGS AND VERSION BUMPS
+# ============================================================
+
+class ResponseCacheTests(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz = self.make_quiz(2)
+        self.other = User.objects.create_user("other@example.com", password="pass")
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def finish(self, user, correct=1):
+        self.play(self.quiz, user, correct)
+
+    def test_matching_etag_gets_304_from_the_cache(self):
+        client = self.client_for(self.user)
+        first = client.get("/api/user/dashboard/")
+        self.assertEqual(first.status_code, 200)
+
+        with self.assertNumQueries(0):
+            second = client.get("/api/user/dashboard/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_finishing_an_attempt_invalidates_the_users_pages(self):
+        client = self.client_for(self.user)
+        before = client.get("/api/user/dashboard/")
+        self.assertEqual(before.json()["total_quizzes"], 0)
+
+        self.finish(self.user)
+
+        after = client.get("/api/user/dashboard/", HTTP_IF_NONE_MATCH=before["ETag"])
+        self.assertEqual(after.status_code, 200)
+        self.assertEqual(after.json()["total_quizzes"], 1)
+
+    def test_other_users_pages_stay_cached(self):
+        client = self.client_for(self.other)
+        before = client.get("/api/user/dashboard/")
+
+        self.finish(self.user)
+
+        with self.assertNumQueries(0):
+            after = client.get("/api/user/dashboard/", HTTP_IF_NONE_MATCH=before["ETag"])
+        self.assertEqual(after.status_code, 304)
+
+    def test_leaderboard_is_cached_once_for_all_users(self):
+        self.finish(self.user)
+        first = self.client_for(self.user).get("/api/leaderboard/")
+
+        with self.assertNumQueries(0):
+            second = self.client_for(self.other).get("/api/leaderboard/")
+        self.assertEqual(second["ETag"], first["ETag"])
+
+        self.finish(self.other, correct=2)
+        third = self.client_for(self.user).get("/api/leaderboard/")
+        self.assertNotEqual(third["ETag"], first["ETag"])
+        self.assertEqual(len(third.json()), 2)
+
+    def test_rank_is_cached_per_user(self):
+        self.finish(self.user, correct=1)
+        self.finish(self.other, correct=2)
+
+        mine = self.client_for(self.user).get("/api/leaderboard/me/").json()
+        theirs = self.client_for(self.other).get("/api/leaderboard/me/").json()
+        self.assertEqual((mine["rank"], theirs["rank"]), (2, 1))
+
+    def test_waiter_that_gives_up_leaves_the_builders_lock(self):
+        key = "quiz:response:test"
+        builder_started, release_builder = threading.Event(), threading.Event()
+
+        def slow_view(request):
+            builder_started.set()
+            release_builder.wait(5)
+            return Response({"built": "slowly"})
+
+        builder = threading.Thread(target=get_or_build, args=(key, slow_view, (None,), {}))
+        builder.start()
+        self.addCleanup(builder.join)
+        self.addCleanup(release_builder.set)
+        builder_started.wait(5)
+        lock = cache.get(f"{key}:lock")
+
+        with mock.patch("quiz.response_cache.WAIT_FOR_BUILD", 0.1):
+            entry, _ = get_or_build(key, lambda request: Response({"built": "by waiter"}), (None,), {})
+        self.assertEqual(entry["data"], {"built": "by waiter"})
+        # the next request still sees a build in progress
+        self.assertEqual(cache.get(f"{key}:lock"), lock)
+
+        release_builder.set()
+        builder.join()
+        self.assertIsNone(cache.get(f"{key}:lock"))
+
+    def test_builder_does_not_release_a_lock_it_no_longer_holds(self):
+        key = "quiz:response:test"
+
+        def overrunning_view(request):
+            # our lock expired and another builder took over
+            cache.set(f"{key}:lock", "someone else", 10)
+            return Response({})
+
+        get_or_build(key, overrunning_view, (None,), {})
+        self.assertEqual(cache.get(f"{key}:lock"), "someone else")
+
+
+# ============================================================
+# PROMPT CACHE — KEYS, TTL, LRU AND FRESH REQUESTS
+# ============================================================
+
+class PromptCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch("quiz.prompt_cache.time.time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "prompts.sqlite3")
+
+    def test_key_is_stable(self):
+        messages = [{"role": "user", "content": "hi"}]
+        key = PromptCache.make_key("fake", "fake-1", 0.6, messages)
+
+        # persisted across deploys: a change silently empties the cache
+        self.assertEqual(key, "ee9af320d3b2a2683de3da511fe4c9be4e2ed6982f7819d4738eccb20b8912fa")
+        self.assertEqual(key, PromptCache.make_key("fake", "fake-1", 0.6, [{"content": "hi", "role": "user"}]))
+        self.assertNotEqual(key, PromptCache.make_key("fake", "fake-1", 0.7, messages))
+        self.assertNotEqual(key, PromptCache.make_key("fake", "fake-2", 0.6, messages))
+        self.assertNotEqual(key, PromptCache.make_key("fake", "fake-1", 0.6, [{"role": "user", "content": "hi!"}]))
+
+    def test_entries_expire_after_ttl(self):
+        cache = PromptCache(self.path, ttl=60, max_bytes=1000)
+        cache.put("a", "first")
+
+        self.clock.now += 60
+        self.assertEqual(cache.get("a"), "first")
+        self.clock.now += 1
+        self.assertIsNone(cache.get("a"))
+
+        cache.put("b", "second")
+        self.assertEqual(cache.stats()["entries"], 1)
+
+    def test_least_recently_used_is_evicted_first(self):
+        cache = PromptCache(self.path, ttl=3600, max_bytes=10)
+        cache.put("a", "aaaa")
+        self.clock.now += 1
+        cache.put("b", "bbbb")
+        self.clock.now += 1
+        cache.get("a")
+        self.clock.now += 1
+        cache.put("c", "cccc")
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), ("aaaa", "cccc"))
+        self.assertEqual(cache.stats()["evicted"], 1)
+
+    def test_variants_miss_until_collected(self):
+        cache = PromptCache(self.path, ttl=3600, max_bytes=1000, variants=2)
+        cache.put("a", "one")
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", "two")
+        self.assertIn(cache.get("a"), ("one", "two"))
+
+
+class FakeProviderTestCase(QuizTestCase):
+    """Generation against the offline FakeProvider, with a throwaway prompt cache."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        overrides = override_settings(
+            QUIZ_LLM_PROVIDER="fake",
+            QUIZ_LLM_GUARD_MODE="process",
+            QUIZ_PROMPT_CACHE=True,
+            QUIZ_PROMPT_CACHE_PATH=os.path.join(directory.name, "prompts.sqlite3"),
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        for reset in (reset_providers, reset_guards, reset_prompt_cache):
+            reset()
+            self.addCleanup(reset)
+
+
+class FreshGenerationTests(FakeProviderTestCase):
+    def test_fresh_requests_skip_cached_completions(self):
+        provider = get_provider()
+        with mock.patch.object(provider, "complete", wraps=provider.complete) as complete:
+            generate_questions("Python", "easy", 3)
+            generate_questions("Python", "easy", 3)
+            self.assertEqual(complete.call_count, 1)
+
+            generate_questions("Python", "easy", 3, use_cache=False)
+            self.assertEqual(complete.call_count, 2)
+
+    def test_fresh_flag_reaches_the_generator(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with mock.patch("quiz.question_bank.generate_questions", return_value=make_questions(3)) as generate:
+            client.post("/api/quiz/generate/", {
+                "category": self.category.id,
+                "subcategory": self.subcategory.id,
+                "difficulty": "easy",
+                "count": 3,
+                "fresh": True,
+            }, format="json")
+
+        self.assertIs(generate.call_args.kwargs["use_cache"], False)
+
+
+class GenerateStreamTests(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.generated = 0
+
+    def llm(self, questions):
+        """Stand-in for stream_questions that counts what it has handed out."""
+        def stream(topic, difficulty, count, use_cache=True):
+            for q in questions[:count]:
+                self.generated += 1
+                yield q
+        return mock.patch("quiz.question_bank.stream_questions", side_effect=stream)
+
+    def request(self, count, **extra):
+        return self.client.post("/api/quiz/generate-stream/", {
+            "category": self.category.id,
+            "subcategory": self.subcategory.id,
+            "difficulty": "easy",
+            "count": count,
+            **extra,
+        }, format="json")
+
+    @staticmethod
+    def parse(chunk):
+        event, data = chunk.decode().strip().split("\n")
+        return event.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+    @override_settings(QUIZ_BANK_FIRST=True)
+    def test_bank_then_llm_questions_then_done(self):
+        bank = self.make_quiz(2).template_ids()
+
+        # worded unlike the bank questions, so dedup keeps them apart
+        generated = [
+            dict(q, question=text, choices=[f"{text} {c}" for c in "ABCD"])
+            for q, text in zip(make_questions(2), ("Who designed Python?", "What does PEP 8 cover?"))
+        ]
+        with self.llm(generated):
+            response = self.request(4)
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            events = [self.parse(chunk) for chunk in response.streaming_content]
+
+        self.assertEqual([event for event, _ in events], ["question"] * 4 + ["done"])
+        questions = [data for _, data in events[:4]]
+        self.assertEqual([q["source"] for q in questions], ["bank", "bank", "llm", "llm"])
+        self.assertFalse(any("correct_choice" in q for q in questions))
+
+        quiz = Quiz.objects.get(id=events[-1][1]["quiz_id"])
+        self.assertEqual(quiz.template_ids(), [q["id"] for q in questions])
+        self.assertEqual(set(quiz.template_ids()[:2]), set(bank))
+        self.assertEqual(events[-1][1]["bank"]["hits"], 2)
+
+    def test_each_question_is_sent_as_soon_as_it_is_parsed(self):
+        with self.llm(make_questions(3, "Streamed")):
+            content = iter(self.request(3, fresh=True).streaming_content)
+
+            event, data = self.parse(next(content))
+            self.assertEqual((event, data["source"]), ("question", "llm"))
+            self.assertEqual(self.generated, 1)
+            # already saved, before the rest of the completion arrives
+            self.assertTrue(QuestionTemplate.objects.filter(id=data["id"]).exists())
+
+            remaining = [self.parse(chunk)[0] for chunk in content]
+        self.assertEqual(remaining, ["question", "question", "done"])
+
+    def test_error_event_when_nothing_is_available(self):
+        with self.llm([]):
+            events = [self.parse(chunk) for chunk in self.request(3, fresh=True).streaming_content]
+
+        self.assertEqual(events, [("error", {"detail": "No questions could be generated."})])
+        self.assertFalse(Quiz.objects.exists())
+
+
+# ============================================================
+# GENERATION TELEMETRY
+# ============================================================
+
+class GenerationTelemetryTests(FakeProviderTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("staff", password="pass", is_staff=True))
+        self.provider = get_provider()
+
+    def respond_with(self, text):
+        """Make the fake provider return `text` verbatim."""
+        return mock.patch.object(self.provider, "render", return_value=text)
+
+    def flawed_response(self):
+        """Two good questions, one with three choices and one cut off."""
+        questions = make_questions(4)
+        questions[2]["choices"] = questions[2]["choices"][:3]
+        text = json.dumps({"questions": questions})
+        return text[:text.rfind('"explanation"')]
+
+    def test_trace_records_timings_and_usage(self):
+        self.provider.latency = 0.05
+
+        generate_questions("Python", "easy", 3)
+
+        metric = GenerationMetric.objects.get()
+        self.assertEqual(
+            (metric.provider, metric.model, metric.mode, metric.topic, metric.difficulty),
+            ("fake", "fake-mcq-1", "complete", "Python", "easy"),
+        )
+        self.assertEqual((metric.requested, metric.returned, metric.accepted, metric.rejected), (3, 3, 3, 0))
+        self.assertEqual((metric.cached, metric.truncated, metric.error), (False, False, ""))
+        self.assertEqual(metric.max_tokens, MAX_TOKENS)
+        self.assertGreater(metric.prompt_tokens, 0)
+        self.assertGreater(metric.completion_tokens, 0)
+        self.assertGreaterEqual(metric.network_ms, 50)
+
+    def test_trace_counts_rejections_and_truncation(self):
+        with self.respond_with(self.flawed_response()), self.assertLogs("quiz.generate_quiz", "INFO"):
+            self.assertEqual(len(generate_questions("Python", "easy", 4)), 2)
+
+        metric = GenerationMetric.objects.get()
+        self.assertEqual((metric.returned, metric.accepted, metric.rejected), (3, 2, 2))
+        self.assertEqual(metric.rejection_reasons, {"wrong_choice_count": 1, "malformed_json": 1})
+        self.assertTrue(metric.truncated)
+
+    def test_cache_replays_are_flagged(self):
+        generate_questions("Python", "easy", 3)
+        generate_questions("Python", "easy", 3)
+
+        live, replay = GenerationMetric.objects.order_by("id")
+        self.assertEqual((live.cached, replay.cached), (False, True))
+        self.assertEqual((replay.prompt_tokens, replay.completion_tokens, replay.accepted), (0, 0, 3))
+
+    def test_summarize_and_report(self):
+        generate_questions("Python", "easy", 3)
+        generate_questions("Python", "easy", 3)
+        with self.respond_with(self.flawed_response()), self.assertLogs("quiz.generate_quiz", "INFO"):
+            generate_questions("Python", "easy", 4)
+        live = GenerationMetric.objects.filter(cached=False)
+
+        [row] = telemetry.summarize(group_by=["model"])
+        self.assertEqual(
+            (row["model"], row["calls"], row["cache_hits"], row["errors"], row["truncated_calls"]),
+            ("fake-mcq-1", 3, 1, 0, 1),
+        )
+        self.assertEqual(row["acceptance_rate"], round(8 / 10, 3))
+        self.assertEqual(row["rejection_rate"], round(2 / 9, 3))
+        self.assertEqual(row["rejection_reasons"], {"wrong_choice_count": 1, "malformed_json": 1})
+        # cache replays returned questions but used no tokens: left out
+        completion = sum(m.completion_tokens for m in live)
+        self.assertEqual(row["tokens_per_question"], round(completion / 6, 1))
+
+        self.assertEqual(self.client.get("/api/internal/generation-metrics/", {"group_by": "model"}).json(), [row])
+
+        out = io.StringIO()
+        call_command("generation_report", "--group-by", "model", stdout=out)
+        self.assertIn("fake-mcq-1", out.getvalue())
+        self.assertIn("rejected: malformed_json=1, wrong_choice_count=1", out.getvalue())
+        self.assertIn(f"A chunk of {QUESTIONS_PER_CHUNK} needs", out.getvalue())
+
+    def test_old_metrics_fall_outside_the_window(self):
+        generate_questions("Python", "easy", 3)
+        GenerationMetric.objects.update(created_at=timezone.now() - datetime.timedelta(days=10))
+
+        self.assertEqual(telemetry.summarize(days=7), [])
+        out = io.StringIO()
+        call_command("generation_report", stdout=out)
+        self.assertIn("No generation metrics in the last 7 days.", out.getvalue())
+
+    def test_endpoint_is_staff_only(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get("/api/internal/generation-metrics/").status_code, 403)
+
+    def test_metrics_days_must_be_a_sane_integer(self):
+        for days in ("abc", "0", "-3", "100000"):
+            response = self.client.get("/api/internal/generation-metrics/", {"days": days})
+            self.assertEqual(response.status_code, 400, days)
+
+        response = self.client.get("/api/internal/generation-metrics/", {"days": "7"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_failed_metric_write_is_logged_not_raised(self):
+        with mock.patch.object(telemetry, "_pending", [GenerationMetric()]), \
+                mock.patch.object(GenerationMetric.objects, "bulk_create", side_effect=RuntimeError("down")):
+            with self.assertLogs("quiz.telemetry", "ERROR") as logs:
+                telemetry.flush()
+
+        self.assertIn("Could not write 1 generation metrics", logs.output[0])
+
+
+# ============================================================
+# LEADERBOARD — BUCKETS, REBUILD, PAGES AND RANKS
+# ============================================================
+
+class LeaderboardTestCase(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz = self.make_quiz(4)
+        self.today = timezone.localdate()
+
+    def buckets(self, user=None):
+        """{(category_id, period, period_start): (attempts, score_sum, avg)}"""
+        entries = LeaderboardEntry.objects.filter(user=user or self.user)
+        return {
+            (e.category_id, e.period, e.period_start): (e.attempt_count, e.score_sum, round(e.avg_score, 4))
+            for e in entries
+        }
+
+
+class LeaderboardBucketTests(LeaderboardTestCase):
+    def test_first_finish_creates_six_buckets(self):
+        self.play(self.quiz, self.user, correct=2)
+
+        monday = self.today - datetime.timedelta(days=self.today.weekday())
+        self.assertEqual(self.buckets(), {
+            (category, period, start): (1, 50.0, 50.0)
+            for category in (None, self.category.id)
+            for period, start in (("all", ALL_TIME), ("week", monday), ("day", self.today))
+        })
+
+    def test_later_finishes_update_the_same_buckets(self):
+        self.play(self.quiz, self.user, correct=2)
+        self.play(self.quiz, self.user, correct=4)
+
+        buckets = self.buckets()
+        self.assertEqual(len(buckets), 6)
+        self.assertEqual(set(buckets.values()), {(2, 150.0, 75.0)})
+
+    def test_refinish_replaces_the_score(self):
+        attempt = self.play(self.quiz, self.user, correct=1)
+        key = get_answer_key(attempt.id)
+        qid = self.quiz.template_ids()[1]
+        record_answers(attempt.id, key, {qid: key.correct_choice(qid)})
+        finish_attempt(attempt.id, self.user)
+
+        self.assertEqual(set(self.buckets().values()), {(1, 50.0, 50.0)})
+
+    def test_rebuild_matches_the_incremental_buckets(self):
+        group = CategoryGroup.objects.create(name="Science")
+        other_category = Category.objects.create(group=group, name="Physics", slug="physics")
+        ids = store_questions(make_questions(4, "Physics"), other_category, None, "easy")
+        other_quiz = save_quiz(other_category, None, "easy", ids, 4)
+        other = User.objects.create_user("other@example.com", password="pass")
+
+        now = timezone.now()
+        for days_ago, user, quiz, correct in [
+            (0, self.user, self.quiz, 1),
+            (0, self.user, other_quiz, 4),
+            (1, self.user, self.quiz, 3),
+            (9, other, self.quiz, 2),
+            (40, other, other_quiz, 0),
+        ]:
+            self.play(quiz, user, correct, when=now - datetime.timedelta(days=days_ago))
+
+        incremental = (self.buckets(self.user), self.buckets(other))
+        out = io.StringIO()
+        call_command("rebuild_leaderboard", stdout=out)
+
+        self.assertEqual((self.buckets(self.user), self.buckets(other)), incremental)
+        self.assertIn(f"Rebuilt {LeaderboardEntry.objects.count()} leaderboard entries", out.getvalue())
+
+
+class LeaderboardRankTests(LeaderboardTestCase):
+    def setUp(self):
+        super().setUp()
+        # averages 100, 75, 50, 50, 25; the two 50s tie and order by user id
+        self.users = [User.objects.create_user(f"rank{i}@example.com", password="pass") for i in range(5)]
+        for user, correct in zip(self.users, (4, 3, 2, 2, 1)):
+            self.play(self.quiz, user, correct)
+
+    def test_rank_and_percentile(self):
+        position = rank(self.users[1].id)
+        self.assertEqual((position["rank"], position["total"], position["percentile"]), (2, 5, 75.0))
+        self.assertEqual(rank(self.users[0].id)["percentile"], 100.0)
+        self.assertEqual(rank(self.users[4].id)["percentile"], 0.0)
+
+    def test_ties_rank_by_user_id(self):
+        self.assertEqual(rank(self.users[2].id)["rank"], 3)
+        self.assertEqual(rank(self.users[3].id)["rank"], 4)
+
+        rows, _ = top()
+        self.assertEqual([row["user_id"] for row in rows], [user.id for user in self.users])
+
+    def test_neighbours_either_side(self):
+        position = rank(self.users[3].id, neighbours=2)
+        self.assertEqual(
+            [(row["user_id"], row["rank"]) for row in position["above"]],
+            [(self.users[1].id, 2), (self.users[2].id, 3)],
+        )
+        self.assertEqual([(row["user_id"], row["rank"]) for row in position["below"]], [(self.users[4].id, 5)])
+        self.assertEqual(rank(self.users[0].id, neighbours=1)["above"], [])
+
+    def test_no_result_in_the_window(self):
+        self.assertIsNone(rank(self.user.id))
+        self.assertIsNone(rank(self.users[0].id, category_id=self.category.id + 1))
+
+    def test_rolling_windows(self):
+        self.play(self.quiz, self.user, 4, when=timezone.now() - datetime.timedelta(days=10))
+
+        self.assertIsNone(rank(self.user.id, "7d"))
+        position = rank(self.user.id, "30d")
+        self.assertEqual((position["rank"], position["total"]), (1, 6))
+
+    def test_endpoint_rejects_bad_parameters(self):
+        client = APIClient()
+        client.force_authenticate(self.users[1])
+        for params in ({"neighbours": "abc"}, {"window": "year"}, {"category": "x"}):
+            self.assertEqual(client.get("/api/leaderboard/me/", params).status_code, 400, params)
+
+        data = client.get("/api/leaderboard/me/", {"neighbours": 1}).json()
+        self.assertEqual((data["rank"], len(data["above"]), len(data["below"])), (2, 1, 1))
+
+    def test_top_pages_through_ties_without_gaps(self):
+        first, cursor = top(limit=3)
+        second, last = top(limit=3, cursor=cursor)
+
+        self.assertEqual([row["user_id"] for row in first + second], [user.id for user in self.users])
+        # the page boundary falls between the two tied 50s
+        self.assertEqual(decode_cursor(cursor), (50.0, self.users[2].id))
+        self.assertIsNone(last)
+
+    def test_rolling_window_pages(self):
+        self.play(self.quiz, self.user, 4, when=timezone.now() - datetime.timedelta(days=10))
+
+        first, cursor = top("7d", limit=4)
+        second, _ = top("7d", limit=4, cursor=cursor)
+        self.assertEqual([row["user_id"] for row in first + second], [user.id for user in self.users])
+
+    def test_cursor_decode_rejects_tampering(self):
+        for cursor in ("not-a-cursor", encode_cursor([50.0]), encode_cursor(["x", 1]), encode_cursor({"a": 1})):
+            with self.assertRaises(ValueError, msg=cursor):
+                decode_cursor(cursor)
+
+    def test_endpoint_pages_and_rejects_bad_parameters(self):
+        client = APIClient()
+        client.force_authenticate(self.users[1])
+
+        response = client.get("/api/leaderboard/", {"limit": 2})
+        self.assertEqual([row["username"] for row in response.json()], ["rank0@example.com", "rank1@example.com"])
+        self.assertIn('rel="next"', response["Link"])
+        response = client.get("/api/leaderboard/", {"limit": 2, "cursor": response["X-Next-Cursor"]})
+        self.assertEqual([row["username"] for row in response.json()], ["rank2@example.com", "rank3@example.com"])
+
+        for params, error in (({"limit": "abc"}, "limit must be an integer"), ({"cursor": "bad"}, "Invalid cursor")):
+            response = client.get("/api/leaderboard/", params)
+            self.assertEqual((response.status_code, response.json()), (400, {"error": error}))
+
+
+# ============================================================
+# PROGRESS — DOWNSAMPLING AND RAW PAGES
+# ============================================================
+
+class DownsampleTests(SimpleTestCase):
+    def points(self, n):
+        return [(x, (x * 37) % 11) for x in range(n)]
+
+    def test_keeps_endpoints_within_the_budget(self):
+        points = self.points(1000)
+        for threshold in (3, 10, 100, 999):
+            sampled = lttb(points, threshold)
+            self.assertEqual(len(sampled), threshold)
+            self.assertEqual((sampled[0], sampled[-1]), (points[0], points[-1]))
+            self.assertEqual(sampled, sorted(sampled))
+
+    def test_small_series_and_budgets_pass_through(self):
+        points = self.points(10)
+        self.assertEqual(lttb(points, 10), points)
+        self.assertEqual(lttb(points, 50), points)
+        self.assertEqual(lttb(points, 2), points)
+
+    def test_keeps_a_spike(self):
+        points = [(x, 50.0) for x in range(500)]
+        points[250] = (250, 100.0)
+        self.assertIn((250, 100.0), lttb(points, 20))
+
+    def test_downsample_rows(self):
+        start = datetime.date(2026, 1, 1)
+        rows = [(start + datetime.timedelta(days=i), i % 3 + 1, float(i % 7)) for i in range(400)]
+
+        sampled = downsample(rows, 50)
+        self.assertEqual(len(sampled), 50)
+        self.assertEqual((sampled[0], sampled[-1]), (rows[0], rows[-1]))
+        self.assertTrue(set(sampled) <= set(rows))
+        self.assertEqual(downsample(rows[:10], 50), rows[:10])
+
+
+class RawProgressPageTests(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        quiz = self.make_quiz(1)
+        base = timezone.now() - datetime.timedelta(days=1)
+        for i in range(7):
+            attempt = QuizAttempt.objects.create(quiz=quiz, user=self.user, completed=True, score=i)
+            # pairs share a start time, so pages must break ties by id
+            QuizAttempt.objects.filter(id=attempt.id).update(started_at=base + datetime.timedelta(minutes=i // 2))
+        QuizAttempt.objects.create(quiz=quiz, user=self.user)  # unfinished: never listed
+
+    def test_cursor_walks_every_attempt_once_in_order(self):
+        expected = list(
+            QuizAttempt.objects.filter(user=self.user, completed=True)
+            .order_by("started_at", "id").values_list("id", flat=True)
+        )
+
+        seen, cursor = [], None
+        while True:
+            rows, cursor = raw_page(self.user, limit=3, cursor=cursor)
+            seen += [attempt_id for _, _, attempt_id in rows]
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, expected)
+
+    def test_tampered_cursors_are_rejected(self):
+        for cursor in (
+            "not-a-cursor",
+            encode_cursor(["2026-01-01T00:00:00"]),
+            encode_cursor(["2026-01-01T00:00:00", 5]),
+            encode_cursor(["yesterday", str(uuid.uuid4())]),
+            encode_cursor({"a": 1}),
+        ):
+            with self.assertRaises(ValueError, msg=cursor):
+                raw_page(self.user, cursor=cursor)
+
+    def test_endpoint_rejects_bad_parameters(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for params in (
+            {"resolution": "raw", "limit": "abc"},
+            {"resolution": "raw", "cursor": encode_cursor(["2026-01-01T00:00:00", 5])},
+            {"points": "abc"},
+            {"resolution": "year"},
+        ):
+            self.assertEqual(client.get("/api/user/progress/", params).status_code, 400, params)
+
+        response = client.get("/api/user/progress/", {"resolution": "raw", "limit": 5})
+        self.assertEqual(len(response.json()), 5)
+        second = client.get("/api/user/progress/", {"resolution": "raw", "cursor": response["X-Next-Cursor"]})
+        self.assertEqual(len(second.json()), 2)
+
+
+# ============================================================
+# LLM JSON SALVAGE
+# ============================================================
+
+def llm_question(i, text=None):
+    return {
+        "question": text or f"What does snippet {i} print?",
+        "options": ["A", "B", "C", "D"],
+        "correct_answer": "A",
+        "explanation": f"Snippet {i} prints {i}.",
+    }
+
+
+def llm_response(questions):
+    return json.dumps({"questions": questions}, indent=2)
+
+
+class LLMJsonSalvageTests(SimpleTestCase):
+    def test_truncated_array_keeps_complete_questions(self):
+        text = llm_response([llm_question(i) for i in range(3)])
+        cut = text[:text.rfind('"explanation"')]
+
+        questions, stats = salvage_questions(cut)
+
+        self.assertEqual([q["question"] for q in questions],
+                         [llm_question(0)["question"], llm_question(1)["question"]])
+        self.assertEqual(stats, {"salvaged": 2, "rejected": 1, "truncated": True})
+
+    def test_code_fenced_output(self):
+        text = "Here you go:\n```json\n" + llm_response([llm_question(0)]) + "\n```\n"
+
+        questions, stats = salvage_questions(text)
+
+        self.assertEqual(questions, [llm_question(0)])
+        self.assertEqual(stats, {"salvaged": 1, "rejected": 0, "truncated": False})
+
+    def test_truncated_code_fenced_output(self):
+        text = "```json\n" + llm_response([llm_question(0), llm_question(1)])
+        cut = text[:text.rfind("Snippet 1")]
+
+        questions, stats = salvage_questions(cut)
+
+        self.assertEqual(questions, [llm_question(0)])
+        self.assertTrue(stats["truncated"])
+
+    def test_escaped_quotes_and_braces_in_text(self):
+        tricky = llm_question(0, text='What does print("}{\\"]") output?')
+        text = llm_response([tricky, llm_question(1)])
+        cut = text[:text.rfind("Snippet 1")]
+
+        questions, stats = salvage_questions(cut)
+
+        self.assertEqual(questions, [tricky])
+        self.assertEqual(stats["rejected"], 1)
+
+    def test_latex_escapes_and_trailing_commas_are_repaired(self):
+        text = (
+            '{"questions": [{"question": "Solve \\(x^2\\)", "options": '
+            '["1", "2",], "correct_answer": "1", "explanation": "x",},'
+        )
+
+        questions, stats = salvage_questions(text)
+
+        self.assertEqual(questions[0]["question"], "Solve (x^2)")
+        self.assertEqual(questions[0]["options"], ["1", "2"])
+        self.assertEqual(stats["salvaged"], 1)
+
+    def test_bare_array(self):
+        text = json.dumps([llm_question(0), llm_question(1)])
+
+        questions, stats = salvage_questions(text[:-1])
+
+        self.assertEqual(len(questions), 2)
+        self.assertEqual(stats["rejected"], 0)
+        self.assertTrue(stats["truncated"])
+
+    def test_stream_parser_matches_one_shot_across_chunk_boundaries(self):
+        tricky = llm_question(0, text='Is "\\\\" a {brace}?')
+        text = "```json\n" + llm_response([tricky, llm_question(1)]) + "\n```"
+
+        parser = QuestionStreamParser()
+        streamed = []
+        for i in range(0, len(text), 3):
+            streamed.extend(parser.feed(text[i:i + 3]))
+
+        self.assertEqual(streamed, [tricky, llm_question(1)])
+        self.assertFalse(parser.finish())
+        self.assertEqual(parser.rejected, 0)
+
+
+# ============================================================
+# GENERATION FAN-OUT
+# ============================================================
+
+class SplitChunksTests(SimpleTestCase):
+    def test_sizes_are_balanced_and_within_budget(self):
+        self.assertEqual(split_chunks(20, size=7), [7, 7, 6])
+        self.assertEqual(split_chunks(14, size=7), [7, 7])
+        self.assertEqual(split_chunks(3, size=7), [3])
+        for count in range(1, 60):
+            sizes = split_chunks(count)
+            self.assertEqual(sum(sizes), count)
+            self.assertLessEqual(max(sizes), QUESTIONS_PER_CHUNK)
+            self.assertLessEqual(max(sizes) - min(sizes), 1)
+
+
+class FanoutTests(SimpleTestCase):
+    def setUp(self):
+        # chunks that should miss the deadline wait on this until the test ends
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def fanout(self, chunk, count=3 * QUESTIONS_PER_CHUNK, deadline=5):
+        def fake_chunk(topic, difficulty, n, origin_hint, part, provider, use_cache):
+            return chunk(part[0], n)
+
+        with mock.patch("quiz.generate_quiz.generate_chunk", side_effect=fake_chunk):
+            return generate_fanout("Python", "easy", count, deadline=deadline)
+
+    def test_merges_chunks_in_order(self):
+        questions = self.fanout(lambda part, n: make_questions(n, f"Part {part}"))
+
+        self.assertEqual(len(questions), 3 * QUESTIONS_PER_CHUNK)
+        self.assertTrue(questions[0]["question"].startswith("Part 1 question 0:"))
+        self.assertTrue(questions[-1]["question"].startswith(f"Part 3 question {QUESTIONS_PER_CHUNK - 1}:"))
+
+    def test_duplicates_across_chunks_are_dropped(self):
+        # every chunk returns the same questions, modulo case and punctuation
+        def chunk(part, n):
+            return [dict(q, question=q["question"].upper() if part == 2 else q["question"])
+                    for q in make_questions(n)]
+
+        questions = self.fanout(chunk)
+
+        self.assertEqual(len(questions), QUESTIONS_PER_CHUNK)
+
+    def test_chunks_past_the_deadline_are_dropped(self):
+        def chunk(part, n):
+            if part == 2:
+                self.release.wait()
+            return make_questions(n, f"Part {part}")
+
+        with self.assertLogs("quiz.generate_quiz", "WARNING") as logs:
+            questions = self.fanout(chunk, deadline=0.2)
+
+        self.assertIn("1/3 chunks dropped", logs.output[0])
+
+        self.assertEqual(len(questions), 2 * QUESTIONS_PER_CHUNK)
+        self.assertFalse(any(q["question"].startswith("Part 2") for q in questions))
+
+    def test_failed_chunks_are_skipped(self):
+        def chunk(part, n):
+            if part == 1:
+                raise ProviderError("boom")
+            return make_questions(n, f"Part {part}")
+
+        questions = self.fanout(chunk)
+
+        self.assertEqual(len(questions), 2 * QUESTIONS_PER_CHUNK)
+        self.assertTrue(questions[0]["question"].startswith("Part 2"))
+
+
+# ============================================================
+# SINGLE-FLIGHT
+# ============================================================
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out waiting")
+        time.sleep(0.01)
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        self.executions = 0
+
+    def slow(self, value):
+        """The leader's work: blocks until the test releases it."""
+        self.executions += 1
+        self.release.wait()
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def run_callers(self, flights, value, callers=5):
+        """
+        Call flight.do("key", ...) from `callers` threads, spread over
+        `flights`, and release the leader once every caller is waiting.
+        Returns what each thread got back (a value or an exception).
+        """
+        results = [None] * callers
+
+        def call(i):
+            try:
+                results[i] = flights[i % len(flights)].do("key", self.slow, value)
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+        for thread in threads:
+            thread.start()
+        wait_until(lambda: sum(flight.stats()["calls"] for flight in flights) == callers)
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+        return results
+
+    def test_concurrent_identical_calls_execute_once(self):
+        flight = SingleFlight()
+
+        results = self.run_callers([flight], ["q1", "q2"])
+
+        self.assertEqual(results, [["q1", "q2"]] * 5)
+        self.assertEqual(self.executions, 1)
+        stats = flight.stats()
+        self.assertEqual((stats["executed"], stats["collapsed"], stats["in_flight"]), (1, 4, 0))
+
+    def test_failed_leader_releases_its_waiters(self):
+        flight = SingleFlight()
+        error = ProviderError("boom")
+
+        results = self.run_callers([flight], error)
+
+        self.assertEqual(results, [error] * 5)
+        self.assertEqual(self.executions, 1)
+        # the key is free again: the next call runs instead of waiting forever
+        self.assertEqual(flight.do("key", self.slow, "retry"), "retry")
+        self.assertEqual(self.executions, 2)
+
+    def file_flights(self):
+        """Two instances on one directory stand in for two worker processes."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        flights = [FileSingleFlight(directory.name) for _ in range(2)]
+        for flight in flights:
+            flight.POLL_INTERVAL = 0.01
+        return flights, directory.name
+
+    def remote_waiter(self, owner, waiter, value):
+        """
+        Start `owner` on the key, then `waiter` in another "process"
+        once the owner holds the lock file; release the owner when the
+        waiter is polling. Returns what the waiter got back.
+        """
+        def own():
+            try:
+                owner.do("key", self.slow, value)
+            except ProviderError:
+                pass
+
+        owner_thread = threading.Thread(target=own)
+        owner_thread.start()
+        wait_until(lambda: self.executions == 1)
+
+        result = []
+        with mock.patch.object(waiter, "_wait_for_owner", wraps=waiter._wait_for_owner) as polling:
+            waiter_thread = threading.Thread(
+                target=lambda: result.append(waiter.do("key", self.slow, ["mine"]))
+            )
+            waiter_thread.start()
+            wait_until(lambda: polling.called)
+            self.release.set()
+            waiter_thread.join(5)
+        owner_thread.join(5)
+        return result[0]
+
+    def test_file_flight_collapses_across_processes(self):
+        (owner, waiter), directory = self.file_flights()
+
+        self.assertEqual(self.remote_waiter(owner, waiter, ["q1"]), ["q1"])
+        self.assertEqual(self.executions, 1)
+        self.assertEqual(waiter.stats()["collapsed_remote"], 1)
+        self.assertFalse(any(name.endswith(".lock") for name in os.listdir(directory)))
+
+    def test_file_flight_owner_failure_lets_the_waiter_run(self):
+        (owner, waiter), directory = self.file_flights()
+
+        self.assertEqual(self.remote_waiter(owner, waiter, ProviderError("boom")), ["mine"])
+        self.assertEqual(self.executions, 2)
+        self.assertFalse(any(name.endswith(".lock") for name in os.listdir(directory)))
+
+
+# ============================================================
+# GENERATION JOBS
+# ============================================================
+
+class GenerationJobTests(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_quiz(5)
+
+    def job(self, **fields):
+        return GenerationJob.objects.create(
+            user=self.user, category=self.category, subcategory=self.subcategory,
+            difficulty="easy", count=3, **fields,
+        )
+
+    def test_claims_oldest_pending_job_once(self):
+        first, second = self.job(), self.job()
+        self.job(status="done")
+
+        claimed = [claim_next_job(), claim_next_job(), claim_next_job()]
+
+        self.assertEqual([job and job.id for job in claimed], [first.id, second.id, None])
+        first.refresh_from_db()
+        self.assertEqual(first.status, "running")
+        self.assertIsNotNone(first.started_at)
+
+    @skipUnlessDBFeature("has_select_for_update_skip_locked")
+    def test_claim_skips_rows_locked_by_other_workers(self):
+        self.job()
+        with CaptureQueriesContext(connection) as ctx:
+            claim_next_job()
+        self.assertTrue(any("SKIP LOCKED" in q["sql"] for q in ctx.captured_queries))
+
+    def test_run_job_saves_the_quiz(self):
+        self.job()
+        job = run_job(claim_next_job())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "done")
+        self.assertEqual(len(job.quiz.template_ids()), 3)
+        self.assertEqual(job.bank_stats["hits"], 3)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_run_job_records_failures(self):
+        job = self.job()
+        with mock.patch("quiz.jobs.create_quiz", side_effect=ProviderError("provider down")):
+            run_job(claim_next_job())
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ("failed", "provider down"))
+        self.assertIsNotNone(job.finished_at)
+        # failures are final; only jobs whose worker died are retried
+        self.assertIsNone(claim_next_job())
+
+    def test_stale_running_jobs_are_requeued_and_retried(self):
+        stale, live = self.job(), self.job()
+        for _ in range(2):
+            claim_next_job()
+        GenerationJob.objects.filter(id=stale.id).update(
+            started_at=timezone.now() - datetime.timedelta(minutes=20)
+        )
+
+        self.assertEqual(requeue_stale_jobs(600), 1)
+        self.assertEqual(GenerationJob.objects.get(id=live.id).status, "running")
+
+        retried = claim_next_job()
+        self.assertEqual(retried.id, stale.id)
+        self.assertEqual(run_job(retried).status, "done")
+
+    def test_worker_drains_the_queue(self):
+        for _ in range(2):
+            self.job()
+        out = io.StringIO()
+
+        call_command("run_generation_worker", "--once", stdout=out)
+
+        self.assertIn("Processed 2 jobs.", out.getvalue())
+
+    def test_worker_requeues_stale_jobs_while_polling(self):
+        first = self.job()
+        abandoned = self.job(
+            status="running", started_at=timezone.now() - datetime.timedelta(minutes=5)
+        )
+
+        def run_and_age(job):
+            # the other worker's job goes stale while this one is busy
+            GenerationJob.objects.filter(id=abandoned.id).update(
+                started_at=timezone.now() - datetime.timedelta(minutes=20)
+            )
+            return run_job(job)
+
+        out = io.StringIO()
+        with mock.patch(
+            "categories.management.commands.run_generation_worker.run_job", side_effect=run_and_age
+        ):
+            call_command("run_generation_worker", "--once", "--requeue-interval", "0", stdout=out)
+
+        self.assertIn("Requeued 1 stale jobs.", out.getvalue())
+        self.assertIn("Processed 2 jobs.", out.getvalue())
+        statuses = dict(GenerationJob.objects.values_list("id", "status"))
+        self.assertEqual((statuses[first.id], statuses[abandoned.id]), ("done", "done"))
+        self.assertEqual(set(GenerationJob.objects.values_list("status", flat=True)), {"done"})
+
+    def test_queue_and_poll_endpoints(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.post("/api/quiz/generate-async/", {
+            "category": self.category.id, "subcategory": self.subcategory.id,
+            "difficulty": "easy", "count": 3,
+        }, format="json")
+        self.assertEqual(response.status_code, 202)
+        url = f"/api/generation-jobs/{response.json()['job_id']}/"
+        self.assertEqual(client.get(url).json()["status"], "pending")
+
+        run_job(claim_next_job())
+        data = client.get(url).json()
+        self.assertEqual(data["status"], "done")
+        self.assertEqual(data["quiz_id"], str(GenerationJob.objects.get().quiz_id))
+
+        # other users can't see the job
+        client.force_authenticate(User.objects.create_user("other@example.com", password="pass"))
+        self.assertEqual(client.get(url).status_code, 404)
+
+
+# ============================================================
+# PROVIDERS
+# ============================================================
+
+class FakeProviderTests(SimpleTestCase):
+    messages = [{"role": "user", "content": 'Generate 3 questions for "Python". Difficulty: easy'}]
+
+    def test_same_prompt_same_questions(self):
+        first = FakeProvider(seed=1).complete(self.messages, MAX_TOKENS, 0.7)
+        second = FakeProvider(seed=2).complete(self.messages, MAX_TOKENS, 0.7)
+
+        self.assertEqual(first.text, second.text)
+        self.assertEqual("".join(FakeProvider().stream(self.messages, MAX_TOKENS, 0.7)), first.text)
+        questions = json.loads(first.text)["questions"]
+        self.assertEqual(len(questions), 3)
+        self.assertTrue(all(q["question"].startswith("[easy] Python") for q in questions))
+
+    def test_different_prompts_differ(self):
+        other = [{"role": "user", "content": 'Generate 3 questions for "Django". Difficulty: easy'}]
+        self.assertNotEqual(FakeProvider().render(self.messages), FakeProvider().render(other))
+
+    def test_failure_rate_raises_provider_error(self):
+        provider = FakeProvider(failure_rate=1.0)
+        with self.assertRaises(ProviderError):
+            provider.complete(self.messages, MAX_TOKENS, 0.7)
+        with self.assertRaises(ProviderError):
+            list(provider.stream(self.messages, MAX_TOKENS, 0.7))
+
+    def test_failures_are_reproducible(self):
+        def outcomes(provider):
+            results = []
+            for _ in range(20):
+                try:
+                    provider.complete(self.messages, MAX_TOKENS, 0.7)
+                    results.append(True)
+                except ProviderError:
+                    results.append(False)
+            return results
+
+        first = outcomes(FakeProvider(failure_rate=0.5, seed=7))
+        self.assertEqual(first, outcomes(FakeProvider(failure_rate=0.5, seed=7)))
+        self.assertIn(True, first)
+        self.assertIn(False, first)
+
+
+class ProviderSelectionTests(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        reset_providers()
+        self.addCleanup(reset_providers)
+
+    @override_settings(QUIZ_LLM_PROVIDER="openai", QUIZ_LLM_MODEL="gpt-test")
+    def test_configured_provider_gets_the_model_setting(self):
+        provider = get_provider()
+        self.assertIsInstance(provider, OpenAIProvider)
+        self.assertEqual(provider.model, "gpt-test")
+        # other providers asked for by name keep their own default
+        self.assertEqual(get_provider("groq").model, GroqProvider.default_model)
+
+    @override_settings(QUIZ_LLM_PROVIDER="groq", QUIZ_LLM_MODEL=None)
+    def test_default_model_without_override(self):
+        self.assertEqual(get_provider().model, GroqProvider.default_model)
+
+    @override_settings(
+        QUIZ_LLM_PROVIDER="fake", QUIZ_LLM_MODEL=None,
+        QUIZ_FAKE_LLM_LATENCY=0.25, QUIZ_FAKE_LLM_FAILURE_RATE=0.1,
+    )
+    def test_fake_provider_reads_its_settings(self):
+        provider = get_provider()
+        self.assertIsInstance(provider, FakeProvider)
+        self.assertEqual((provider.model, provider.latency, provider.failure_rate), ("fake-mcq-1", 0.25, 0.1))
+
+    @override_settings(QUIZ_LLM_PROVIDER="fake")
+    def test_instances_are_shared_until_reset(self):
+        provider = get_provider()
+        self.assertIs(get_provider("fake"), provider)
+        reset_providers()
+        self.assertIsNot(get_provider(), provider)
+
+    @override_settings(QUIZ_LLM_PROVIDER="nope")
+    def test_unknown_provider_is_an_error(self):
+        with self.assertRaisesMessage(ProviderError, "Unknown LLM provider: nope"):
+            get_provider()
+
+    @override_settings(QUIZ_LLM_PROVIDER="groq")
+    def test_unconfigured_provider_falls_back_to_the_bank(self):
+        store_questions(make_questions(3), self.category, self.subcategory, "easy")
+
+        with mock.patch.dict(os.environ, {"GROQ_API_KEY": ""}):
+            with self.assertLogs("quiz.generate_quiz", "WARNING"):
+                self.assertEqual(fetch_questions("Python", "easy", 3), [])
+            with self.assertLogs("quiz.generate_quiz", "WARNING"):
+                quiz, stats = create_quiz(self.category, self.subcategory, "easy", 3, bank_first=False)
+
+        self.assertEqual((stats["misses"], stats["fallback"]), (3, 3))
+        self.assertEqual(len(quiz.template_ids()), 3)
+
+
+class PrewarmCommandTests(FakeProviderTestCase):
+    def prewarm(self, *args):
+        out = io.StringIO()
+        call_command(
+            "prewarm_question_pools", "--category", "python", "--workers", "1", *args, stdout=out
+        )
+        return out.getvalue()
+
+    def test_plans_each_pools_shortfall(self):
+        store_questions(make_questions(1), self.category, None, "easy")
+        store_questions(make_questions(3), self.category, self.subcategory, "hard")
+
+        with mock.patch(
+            "categories.management.commands.prewarm_question_pools.fetch_questions", return_value=[]
+        ) as fetch:
+            self.prewarm("--depth", "3", "--batch", "2", "--rounds", "1")
+
+        calls = sorted(call.args for call in fetch.call_args_list)
+        self.assertEqual(calls, sorted([
+            ("Python", "easy", 2),
+            ("Python", "medium", 2), ("Python", "medium", 1),
+            ("Python", "hard", 2), ("Python", "hard", 1),
+            ("Basics", "easy", 2), ("Basics", "easy", 1),
+            ("Basics", "medium", 2), ("Basics", "medium", 1),
+        ]))
+
+    def test_rerun_recounts_stock_and_resumes(self):
+        out = self.prewarm("--depth", "3")
+        self.assertIn("Stored 18 questions", out)
+        self.assertEqual(QuestionTemplate.objects.count(), 18)
+
+        out = self.prewarm("--depth", "3")
+        self.assertNotIn("Round 1", out)
+        self.assertIn("Stored 0 questions", out)
+
+        QuestionTemplate.objects.filter(subcategory=None, difficulty="easy").delete()
+        out = self.prewarm("--depth", "3")
+        self.assertIn("Round 1: 1 generation calls.", out)
+        self.assertIn("Stored 3 questions", out)
+
+    def test_report_counts_only_what_the_run_stored(self):
+        other = Category.objects.create(group=self.category.group, name="Other", slug="other")
+        original = store_questions
+
+        def store_with_traffic(questions, category, subcategory, difficulty):
+            # a user request lands while the command is running
+            original(make_questions(2, f"Traffic {difficulty}"), other, None, difficulty)
+            return original(questions, category, subcategory, difficulty)
+
+        with mock.patch(
+            "categories.management.commands.prewarm_question_pools.store_questions",
+            side_effect=store_with_traffic,
+        ):
+            out = self.prewarm("--depth", "3", "--rounds", "1")
+
+        self.assertRegex(out, r"Stored 18 questions in [\d.]+s \([\d.]+ questions/s\)\.")
+
+
+# ============================================================
+# QUERY PLANS — NO FULL SCANS ON HOT TABLES
+# ============================================================
+
+HOT_TABLES = {
+    "quiz_questiontemplate",
+    "quiz_quizquestion",
+    "quiz_quizattempt",
+    "quiz_questionattempt",
+    "quiz_leaderboardentry",
+    "quiz_userdailystats",
+}
+# `"quiz_questionattempt" U0` / `quiz_questionattempt` U0 in subqueries
+TABLE_ALIAS = re.compile(r'["`](\w+)["`]\s+(?:AS\s+)?["`]?([TUV]\d+)\b')
+
+
+def full_scans(sql):
+    """(table, plan line) for every hot table the database would scan in full."""
+    aliases = {alias: table for table, alias in TABLE_ALIAS.findall(sql)}
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            plan = [(row[3].split()[1], row[3]) for row in cursor.fetchall()
+                    if row[3].startswith("SCAN ")]
+        else:  # mysql
+            cursor.execute("EXPLAIN " + sql)
+            columns = [c[0] for c in cursor.description]
+            plan = [(row["table"], str(row)) for row in (dict(zip(columns, r)) for r in cursor.fetchall())
+                    if row["type"] == "ALL"]
+    return [(aliases.get(t, t), line) for t, line in plan if aliases.get(t, t) in HOT_TABLES]
+
+
+class QueryPlanTests(QuizTestCase):
+    """
+    Runs every user-facing endpoint over a seeded dataset and EXPLAINs
+    each SELECT/UPDATE/DELETE it issued; any full scan of a hot table
+    fails with the plan. Supports SQLite and MySQL.
+    """
+
+    def setUp(self):
+        super().setUp()
+        if connection.vendor not in ("sqlite", "mysql"):
+            self.skipTest(f"no plan check for {connection.vendor}")
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        others = [User.objects.create_user(f"user{i}@example.com", password="pass") for i in range(5)]
+        self.quiz = self.make_quiz(20)
+        self.question_ids = self.quiz.template_ids()
+        for user in [self.user] + others:
+            for _ in range(3):
+                attempt = start_attempt(self.quiz, user)
+                answers = {qid: 0 for qid in self.question_ids[:10]}
+                record_answers(attempt.id, get_answer_key(attempt.id), answers)
+                finish_attempt(attempt.id, user)
+        self.attempt = start_attempt(self.quiz, self.user)
+
+        if connection.vendor == "mysql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE TABLE " + ", ".join(sorted(HOT_TABLES)))
+
+    def assertNoFullScans(self, method, url, data=None):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, data, format="json")
+        self.assertLess(response.status_code, 400, f"{method.upper()} {url}: {response.content[:200]}")
+
+        scans = []
+        for query in ctx.captured_queries:
+            sql = query["sql"]
+            if sql.split(None, 1)[0].upper() in ("SELECT", "UPDATE", "DELETE"):
+                scans += [f"{table}: {line}\n    {sql}" for table, line in full_scans(sql)]
+        self.assertFalse(scans, f"{method.upper()} {url} scans hot tables:\n" + "\n".join(scans))
+
+    def test_generate_from_bank(self):
+        with mock.patch("quiz.question_bank.generate_questions") as generate:
+            self.assertNoFullScans("post", "/api/quiz/generate/", {
+                "category": self.category.id,
+                "subcategory": self.subcategory.id,
+                "difficulty": "easy",
+                "count": 5,
+            })
+        generate.assert_not_called()
+
+    def test_attempt_lifecycle(self):
+        base = f"/api/attempt/{self.attempt.id}"
+        qid = self.question_ids[0]
+
+        self.assertNoFullScans("post", f"/api/quiz/{self.quiz.id}/start/")
+        self.assertNoFullScans("get", f"{base}/details/")
+        self.assertNoFullScans("post", f"{base}/answer/", {"question_id": qid, "selected": 1})
+        self.assertNoFullScans("post", f"{base}/answers/", {
+            "answers": [{"question_id": q, "selected": 2} for q in self.question_ids[:5]],
+        })
+        self.assertNoFullScans("post", f"{base}/finish/")
+        self.assertNoFullScans("get", f"{base}/analytics/")
+
+    def test_user_pages(self):
+        self.assertNoFullScans("get", "/api/user/dashboard/")
+        self.assertNoFullScans("get", "/api/user/analytics/")
+        for resolution in ("day", "week", "month", "raw"):
+            self.assertNoFullScans("get", f"/api/user/progress/?resolution={resolution}")
+
+    def test_leaderboards(self):
+        for window in ("all", "week", "day", "7d", "30d"):
+            self.assertNoFullScans("get", f"/api/leaderboard/?window={window}&limit=2")
+            self.assertNoFullScans("get", f"/api/leaderboard/?window={window}&category={self.category.id}")
+            self.assertNoFullScans("get", f"/api/leaderboard/me/?window={window}")
@@ -0,0 +1,391 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .providers import ProviderError
+
+
+class Throttled(ProviderError):
+    """The local rate limit had no room within the allowed wait."""
+
+
+class CircuitOpen(ProviderError):
+    """The provider failed repeatedly and is being given time to recover."""
+
+
+# ============================================================
+# SHARED STATE
+# ============================================================
+
+class ProcessStore:
+    """Guard state kept in memory; shared by the threads of one worker."""
+
+    mode = "process"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def transact(self, name, fn):
+        """Run fn(state) under a lock; changes fn makes to state are kept."""
+        with self._lock:
+            state = self._data.setdefault(name, {})
+            return fn(state)
+
+
+class FileStore(ProcessStore):
+    """
+    Guard state kept in small JSON files so every worker process on the
+    host shares one budget and one breaker. Updates are serialised with
+    an O_CREAT | O_EXCL lock file (same approach as FileSingleFlight);
+    the critical section is a read and a write of a few bytes.
+    """
+
+    mode = "file"
+
+    POLL_INTERVAL = 0.002
+    STALE_LOCK = 5
+
+    def __init__(self, directory):
+        super().__init__()
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name):
+        digest = hashlib.sha256(name.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.directory, f"guard-{digest}.json")
+
+    @contextmanager
+    def _file_lock(self, path):
+        lock_path = path + ".lock"
+        while True:
+            try:
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                try:
+                    # a process died inside the critical section
+                    if time.time() - os.path.getmtime(lock_path) > self.STALE_LOCK:
+                        os.remove(lock_path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                time.sleep(self.POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            try:
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+
+    def transact(self, name, fn):
+        path = self._path(name)
+        with self._lock, self._file_lock(path):
+            try:
+                with open(path) as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = {}
+
+            result = fn(state)
+
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, path)
+            return result
+
+
+# ============================================================
+# TOKEN-BUCKET RATE LIMITER
+# ============================================================
+
+class RateLimiter:
+    """
+    Two token buckets per provider: requests per minute and LLM tokens
+    per minute (a limit of 0 disables that bucket). Both are refilled
+    continuously and charged together, so a call never consumes one
+    budget without the other.
+
+    acquire() waits for room up to `max_wait` seconds, then raises
+    Throttled. Token use is charged up front from an estimate and
+    corrected with settle() once the real usage is known.
+    """
+
+    def __init__(self, store, name, rpm, tpm, max_wait):
+        self.store = store
+        self.name = f"{name}:limiter"
+        self.buckets = {"requests": rpm, "tokens": tpm}
+        self.max_wait = max_wait
+        self._waiting = 0
+        self._waiting_lock = threading.Lock()
+        self._throttled = 0
+
+    def _refill(self, state, now):
+        for bucket, per_minute in self.buckets.items():
+            if not per_minute:
+                continue
+            level = state.get(bucket, per_minute)
+            elapsed = max(0.0, now - state.get("updated_at", now))
+            state[bucket] = min(per_minute, level + elapsed * per_minute / 60)
+        state["updated_at"] = now
+
+    def _try_take(self, tokens):
+        """Take from both buckets; returns 0 on success or seconds to wait."""
+        cost = {"requests": 1, "tokens": tokens}
+
+        def take(state):
+            self._refill(state, time.time())
+            wait = 0.0
+            for bucket, per_minute in self.buckets.items():
+                if not per_minute:
+                    continue
+                # a single call larger than the bucket only needs a full bucket
+                need = min(cost[bucket], per_minute)
+                if state[bucket] < need:
+                    wait = max(wait, (need - state[bucket]) * 60 / per_minute)
+            if wait:
+                return wait
+            for bucket, per_minute in self.buckets.items():
+                if per_minute:
+                    state[bucket] -= cost[bucket]
+            return 0.0
+
+        return self.store.transact(self.name, take)
+
+    def acquire(self, tokens):
+        if not any(self.buckets.values()):
+            return
+
+        deadline = time.monotonic() + self.max_wait
+        with self._waiting_lock:
+            self._waiting += 1
+        try:
+            while True:
+                wait = self._try_take(tokens)
+                if not wait:
+                    return
+                if time.monotonic() + wait > deadline:
+                    with self._waiting_lock:
+                        self._throttled += 1
+                    raise Throttled(f"{self.name}: rate limit, retry in {wait:.1f}s")
+                time.sleep(wait)
+        finally:
+            with self._waiting_lock:
+                self._waiting -= 1
+
+    def settle(self, estimated, actual):
+        """Give back (or charge) the difference between estimated and real tokens."""
+        if not self.buckets["tokens"] or not actual:
+            return
+
+        def adjust(state):
+            self._refill(state, time.time())
+            state["tokens"] = min(
+                self.buckets["tokens"], state["tokens"] + estimated - actual
+            )
+
+        self.store.transact(self.name, adjust)
+
+    def stats(self):
+        def read(state):
+            self._refill(state, time.time())
+            return {
+                bucket: round(state[bucket], 1)
+                for bucket, per_minute in self.buckets.items() if per_minute
+            }
+
+        with self._waiting_lock:
+            queue_depth, throttled = self._waiting, self._throttled
+        return {
+            "limits_per_minute": dict(self.buckets),
+            "available": self.store.transact(self.name, read),
+            "queue_depth": queue_depth,
+            "throttled": throttled,
+        }
+
+
+# ============================================================
+# CIRCUIT BREAKER
+# ============================================================
+
+class CircuitBreaker:
+    """
+    closed    -> calls go through; `threshold` consecutive failures open it
+    open      -> calls fail fast with CircuitOpen for `reset_after` seconds
+    half_open -> one probe call is let through; success closes the
+                 breaker, failure opens it again
+    """
+
+    def __init__(self, store, name, threshold, reset_after):
+        self.store = store
+        self.name = f"{name}:breaker"
+        self.threshold = threshold
+        self.reset_after = reset_after
+
+    def _view(self, state, now):
+        status = state.get("state", "closed")
+        if status == "open" and now - state.get("opened_at", 0) >= self.reset_after:
+            status = "half_open"
+        return status
+
+    def retry_after(self):
+        """Seconds until the breaker lets a probe through (0 when closed)."""
+        def read(state):
+            now = time.time()
+            if self._view(state, now) != "open":
+                return 0
+            return max(0.0, state["opened_at"] + self.reset_after - now)
+
+        return self.store.transact(self.name, read)
+
+    def is_open(self):
+        return self.retry_after() > 0
+
+    def allow(self):
+        def check(state):
+            now = time.time()
+            status = self._view(state, now)
+            if status == "closed":
+                return True
+            if status == "open":
+                return False
+            # half-open: one probe at a time; a probe that never reported
+            # back is replaced after another reset period
+            if now - state.get("probe_at", 0) < self.reset_after:
+                return False
+            state["state"] = "half_open"
+            state["probe_at"] = now
+            return True
+
+        return self.store.transact(self.name, check)
+
+    def record_success(self):
+        def close(state):
+            state.clear()
+            state["state"] = "closed"
+
+        self.store.transact(self.name, close)
+
+    def abandon(self):
+        """
+        A call ended without telling us anything about the provider (a
+        stream whose client went away): free the half-open probe slot so
+        the next call can probe instead of waiting out another period.
+        """
+        def release(state):
+            state.pop("probe_at", None)
+
+        self.store.transact(self.name, release)
+
+    def record_failure(self):
+        def fail(state):
+            now = time.time()
+            state["failures"] = state.get("failures", 0) + 1
+            if state.get("state") == "half_open" or state["failures"] >= self.threshold:
+                state["state"] = "open"
+                state["opened_at"] = now
+                state.pop("probe_at", None)
+
+        self.store.transact(self.name, fail)
+
+    def stats(self):
+        def read(state):
+            now = time.time()
+            return {
+                "state": self._view(state, now),
+                "failures": state.get("failures", 0),
+                "retry_after": round(
+                    max(0.0, state.get("opened_at", 0) + self.reset_after - now), 1
+                ) if state.get("state") == "open" else 0,
+            }
+
+        return self.store.transact(self.name, read)
+
+
+# ============================================================
+# PROVIDER GUARD
+# ============================================================
+
+class ProviderGuard:
+    def __init__(self, store, name):
+        self.limiter = RateLimiter(
+            store, name,
+            rpm=settings.QUIZ_LLM_RPM,
+            tpm=settings.QUIZ_LLM_TPM,
+            max_wait=settings.QUIZ_LLM_THROTTLE_WAIT,
+        )
+        self.breaker = CircuitBreaker(
+            store, name,
+            threshold=settings.QUIZ_LLM_BREAKER_THRESHOLD,
+            reset_after=settings.QUIZ_LLM_BREAKER_RESET,
+        )
+
+    @contextmanager
+    def call(self, estimated_tokens):
+        """
+        Wrap one provider call. Fails fast while the breaker is open,
+        waits for rate-limit room, and reports the outcome to the breaker.
+        Local throttling is not a provider failure and is not counted.
+        """
+        self.admit(estimated_tokens)
+        try:
+            yield
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+
+    def admit(self, estimated_tokens):
+        """
+        The checks call() makes before a request: CircuitOpen while the
+        breaker is open, Throttled if there is no rate-limit room in time.
+        Callers that use this directly (streams) report the outcome to
+        the breaker themselves.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpen(
+                f"{self.breaker.name}: open, retry in {self.breaker.retry_after():.0f}s"
+            )
+        self.limiter.acquire(estimated_tokens)
+
+    def stats(self):
+        return {"breaker": self.breaker.stats(), "limiter": self.limiter.stats()}
+
+
+_store = None
+_guards = {}
+_guards_lock = threading.Lock()
+
+
+def get_guard(provider_name):
+    global _store
+    with _guards_lock:
+        if _store is None:
+            if settings.QUIZ_LLM_GUARD_MODE == "file":
+                _store = FileStore(settings.QUIZ_LLM_GUARD_DIR)
+            else:
+                _store = ProcessStore()
+        if provider_name not in _guards:
+            _guards[provider_name] = ProviderGuard(_store, provider_name)
+        return _guards[provider_name]
+
+
+def reset_guards():
+    """Drop guard instances (after changing limit settings at runtime)."""
+    global _store
+    with _guards_lock:
+        _store = None
+        _guards.clear()
+
+
+def guard_stats():
+    with _guards_lock:
+        guards = dict(_guards)
+    return {name: guard.stats() for name, guard in guards.items()}
@@ -31,15 +31,20 @@ from .views import (
     SubcategoryViewSet,
     AttemptViewSet,
     leaderboard_view,
+    leaderboard_rank_view,
     CategoryGroupListView,
     UserAnalyticsView,
     UserDashboardView,
     UserProgressView,
+    GenerationJobViewSet,
+    LLMStatsView,
+    GenerationMetricsView,
 )
 
 # Routers (ONE RESPONSIBILITY EACH)
 quiz_router = DefaultRouter()
 quiz_router.register(r"quiz", QuizViewSet, basename="quiz")
+quiz_router.register(r"generation-jobs", GenerationJobViewSet, basename="generation-jobs")
 
 attempt_router = DefaultRouter()
 attempt_router.register(r"attempt", AttemptViewSet, basename="attempt")
@@ -68,4 +73,9 @@ urlpatterns = [
 
     # Leaderboard
     path("leaderboard/", leaderboard_view),
+    path("leaderboard/me/", leaderboard_rank_view),
+
+    # Internal
+    path("internal/llm-stats/", LLMStatsView.as_view()),
+    path("internal/generation-metrics/", GenerationMetricsView.as_view()),
 ]
@@ -0,0 +1,96 @@
+import datetime
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .leaderboard import finished_day
+from .models import QuizAttempt, UserDailyStats
+
+# QuizAttempt counters summed into each day
+COUNTER_FIELDS = ["question_count", "correct_count"] + [
+    f"{d}_{kind}" for d in ("easy", "medium", "hard") for kind in ("count", "correct")
+]
+STAT_FIELDS = ["attempt_count", "score_sum"] + COUNTER_FIELDS
+
+
+# ============================================================
+# INCREMENTAL UPDATES
+# ============================================================
+
+def record_finish(attempt, previous=None):
+    """
+    Add a finished attempt to the user's row for its day. Call inside the
+    finish transaction. A repeated finish (`previous` is the old score)
+    recomputes that day instead, since its counters may have moved too.
+    """
+    day = finished_day(attempt)
+    if previous is not None:
+        rebuild_day(attempt.user_id, day)
+        return
+
+    stats, _ = UserDailyStats.objects.select_for_update().get_or_create(
+        user_id=attempt.user_id, date=day
+    )
+    stats.attempt_count += 1
+    stats.score_sum += attempt.score
+    for field in COUNTER_FIELDS:
+        setattr(stats, field, getattr(stats, field) + getattr(attempt, field))
+    stats.save()
+
+
+def daily_rows(attempts):
+    """
+    Unsaved UserDailyStats, one per user per local day, summed over the
+    completed `attempts`. The day is worked out in Python (as
+    leaderboard.rebuild does): in SQL it needs the database's time zone
+    tables, and without them MySQL's CONVERT_TZ returns NULL.
+    """
+    rows = {}
+    attempts = (
+        attempts
+        .filter(completed=True)
+        .values_list("user_id", "finished_at", "started_at", "score", *COUNTER_FIELDS)
+    )
+    for user_id, finished_at, started_at, score, *counts in attempts.iterator(chunk_size=2000):
+        day = timezone.localdate(finished_at or started_at)
+        stats = rows.get((user_id, day))
+        if stats is None:
+            stats = rows[(user_id, day)] = UserDailyStats(user_id=user_id, date=day)
+        stats.attempt_count += 1
+        stats.score_sum += score
+        for field, count in zip(COUNTER_FIELDS, counts):
+            setattr(stats, field, getattr(stats, field) + count)
+    return list(rows.values())
+
+
+def day_bounds(day):
+    """The aware datetimes [start, end) of a local day."""
+    return tuple(
+        timezone.make_aware(datetime.datetime.combine(d, datetime.time.min))
+        for d in (day, day + datetime.timedelta(days=1))
+    )
+
+
+def rebuild_day(user_id, day):
+    """Recompute one user's row for a local day from their attempts."""
+    start, end = day_bounds(day)
+    attempts = QuizAttempt.objects.filter(user_id=user_id).filter(
+        Q(finished_at__gte=start, finished_at__lt=end)
+        | Q(finished_at__isnull=True, started_at__gte=start, started_at__lt=end)
+    )
+    UserDailyStats.objects.filter(user_id=user_id, date=day).delete()
+    UserDailyStats.objects.bulk_create(daily_rows(attempts))
+
+
+# ============================================================
+# READS
+# ============================================================
+
+def daily_stats(user, *fields):
+    """The user's day rows in date order, as value tuples of `fields`."""
+    return (
+        UserDailyStats.objects
+        .filter(user=user)
+        .order_by("date")
+        .values_list(*fields)
+    )
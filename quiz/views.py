@@ -336,15 +336,19 @@
 #             "difficulty_accuracy": difficulty_accuracy,
 #             "recommendations": recommendations,
 #         })
+import json
+import uuid
+
 from rest_framework import viewsets, mixins, generics
 from rest_framework.decorators import action, api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from django.utils import timezone
-from django.db.models import Avg
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.db.models import Count, Sum
 
 from .models import (
     Category,
@@ -352,7 +356,8 @@ from .models import (
     QuestionTemplate,
     Quiz,
     QuizAttempt,
-    QuestionAttempt,
+    GenerationJob,
+    UserDailyStats,
 )
 
 from .serializers import (
@@ -360,11 +365,48 @@ from .serializers import (
     SubcategorySerializer,
     QuizAttemptSerializer,
     CategoryGroupSerializer,
+    GenerationJobSerializer,
 )
 
-from .generate_quiz import generate_questions
+from .question_bank import create_quiz, stream_quiz, QuizUnavailable
+from .persistence import start_attempt, record_answer, record_answers, finish_attempt
+from .answer_keys import get_answer_key
+from .user_stats import daily_stats
+from .pagination import next_page_headers
+from .response_cache import cached_response
+from .progress import (
+    DEFAULT_POINTS,
+    DEFAULT_RAW_PAGE_SIZE,
+    MAX_POINTS,
+    MAX_RAW_PAGE_SIZE,
+    RESOLUTIONS as PROGRESS_RESOLUTIONS,
+    downsample,
+    raw_page as progress_raw_page,
+    series as progress_series,
+)
+from .leaderboard import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    WINDOWS as LEADERBOARD_WINDOWS,
+    rank as leaderboard_rank,
+    top as top_entries,
+)
+from .prompt_cache import get_prompt_cache
+from .providers import get_provider
+from .singleflight import get_flight
+from .throttle import get_guard, guard_stats
+from .telemetry import summarize as summarize_generation
 from categories.models import CategoryGroup
 
+# Upper bound for POST /api/attempt/{id}/answers/
+MAX_BATCH_ANSWERS = 200
+
+# Longest window for /api/internal/generation-metrics/?days=
+MAX_METRICS_DAYS = 365
+
+# Largest quiz the generate endpoints build; larger counts are capped
+MAX_QUIZ_QUESTIONS = 50
+
 
 # ======================================================
 # CATEGORY + SUBCATEGORY
@@ -384,6 +426,17 @@ class SubcategoryViewSet(viewsets.ReadOnlyModelViewSet):
 # QUIZ VIEWSET
 # ======================================================
 
+def requested_count(request):
+    """Question count from the request body, capped at MAX_QUIZ_QUESTIONS; raises ValueError."""
+    try:
+        count = int(request.data.get("count", 5))
+    except (TypeError, ValueError):
+        count = 0
+    if count < 1:
+        raise ValueError(f"count must be an integer between 1 and {MAX_QUIZ_QUESTIONS}")
+    return min(count, MAX_QUIZ_QUESTIONS)
+
+
 class QuizViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
@@ -397,55 +450,97 @@ class QuizViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
         subcategory = Subcategory.objects.get(id=subcat_id) if subcat_id else None
 
         difficulty = request.data.get("difficulty", "medium")
-        count = int(request.data.get("count", 5))
-        topic = subcategory.name if subcategory else category.name
-
-        questions = generate_questions(topic, difficulty, count)
-
-        template_ids = []
-        for q in questions:
-            qt = QuestionTemplate.objects.create(
-                category=category,
-                subcategory=subcategory,
-                difficulty=difficulty,
-                question_text=q["question"],
-                choices=q["choices"],
-                correct_choice=q["correct_choice_index"],
-                explanation=q.get("explanation", ""),
+        try:
+            count = requested_count(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        # bank-first and cached completions unless the client explicitly
+        # asks for fresh questions
+        fresh = bool(request.data.get("fresh"))
+        bank_first = settings.QUIZ_BANK_FIRST and not fresh
+
+        try:
+            quiz, bank_stats = create_quiz(
+                category, subcategory, difficulty, count,
+                bank_first=bank_first, use_cache=not fresh,
+            )
+        except QuizUnavailable as e:
+            # LLM down or throttled and nothing in the bank to fall back on
+            retry_after = get_guard(get_provider().name).breaker.retry_after()
+            return Response(
+                {"error": str(e)},
+                status=503,
+                headers={"Retry-After": str(max(1, round(retry_after)))},
             )
-            template_ids.append(str(qt.id))
 
-        quiz = Quiz.objects.create(
-            title=f"{topic} Quiz",
+        return Response({"quiz_id": str(quiz.id), "bank": bank_stats}, status=201)
+
+    # -------- GENERATE QUIZ (BACKGROUND JOB) --------
+    @action(detail=False, methods=["post"], url_path="generate-async")
+    def generate_async(self, request):
+        """
+        Queue generation for the worker (`manage.py run_generation_worker`)
+        and return immediately. Poll /api/generation-jobs/{job_id}/.
+        """
+        category = Category.objects.get(id=request.data["category"])
+        subcat_id = request.data.get("subcategory")
+        subcategory = Subcategory.objects.get(id=subcat_id) if subcat_id else None
+
+        try:
+            count = requested_count(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        job = GenerationJob.objects.create(
+            user=request.user,
             category=category,
             subcategory=subcategory,
-            difficulty=difficulty,
-            question_templates=template_ids,
-            time_limit=count * 60,
+            difficulty=request.data.get("difficulty", "medium"),
+            count=count,
+            bank_first=settings.QUIZ_BANK_FIRST and not request.data.get("fresh"),
+            fresh=bool(request.data.get("fresh")),
         )
 
-        return Response({"quiz_id": str(quiz.id)}, status=201)
+        return Response({"job_id": str(job.id), "status": job.status}, status=202)
+
+    # -------- GENERATE QUIZ (SERVER-SENT EVENTS) --------
+    @action(detail=False, methods=["post"], url_path="generate-stream")
+    def generate_stream(self, request):
+        """
+        Stream questions to the client as they become available.
+        Emits `question` events, then `done` with the quiz id.
+        """
+        category = Category.objects.get(id=request.data["category"])
+        subcat_id = request.data.get("subcategory")
+        subcategory = Subcategory.objects.get(id=subcat_id) if subcat_id else None
+
+        difficulty = request.data.get("difficulty", "medium")
+        try:
+            count = requested_count(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        fresh = bool(request.data.get("fresh"))
+        bank_first = settings.QUIZ_BANK_FIRST and not fresh
+
+        def event_stream():
+            events = stream_quiz(
+                category, subcategory, difficulty, count,
+                bank_first=bank_first, use_cache=not fresh,
+            )
+            for event, data in events:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+        response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
 
     # -------- START QUIZ --------
     @action(detail=True, methods=["post"])
     def start(self, request, pk=None):
         quiz = Quiz.objects.get(id=pk)
-
-        attempt = QuizAttempt.objects.create(
-            quiz=quiz,
-            user=request.user,
-            current_difficulty="easy",
-        )
-
-        for qid in quiz.question_templates:
-            qt = QuestionTemplate.objects.get(id=qid)
-            QuestionAttempt.objects.create(
-                quiz_attempt=attempt,
-                question=qt,
-                selected_choice=-1,
-                is_correct=False,
-                difficulty="easy",
-            )
+        attempt = start_attempt(quiz, request.user)
 
         return Response({"attempt": QuizAttemptSerializer(attempt).data})
 
@@ -454,6 +549,17 @@ class QuizViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
 # ATTEMPT VIEWSET
 # ======================================================
 
+def parse_answer(item):
+    """
+    (question_id, selected) from one posted answer, with the id in
+    canonical UUID form. Raises ValueError if either is missing or bad.
+    """
+    try:
+        return str(uuid.UUID(str(item["question_id"]))), int(item["selected"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError("An answer needs a question_id and an integer selected") from e
+
+
 class AttemptViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
@@ -487,30 +593,59 @@ class AttemptViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
     # -------- SAVE ANSWER --------
     @action(detail=True, methods=["post"])
     def answer(self, request, pk=None):
-        qa = QuestionAttempt.objects.get(
-            quiz_attempt_id=pk,
-            question_id=request.data["question_id"],
-        )
+        # graded from the cached answer key; no template read
+        answer_key = get_answer_key(pk)
+        if answer_key is None or not answer_key.belongs_to(request.user):
+            return Response({"error": "Attempt not found"}, status=404)
+
+        try:
+            question_id, selected = parse_answer(request.data)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        if question_id not in answer_key:
+            return Response({"error": "Question is not part of this attempt"}, status=400)
 
-        selected = int(request.data["selected"])
-        qa.selected_choice = selected
-        qa.is_correct = selected == qa.question.correct_choice
-        qa.save()
+        record_answer(pk, answer_key, question_id, selected)
 
         return Response({"saved": True})
 
-    # -------- FINISH QUIZ --------
+    # -------- SAVE ANSWERS (BATCH) --------
     @action(detail=True, methods=["post"])
-    def finish(self, request, pk=None):
-        attempt = QuizAttempt.objects.get(id=pk, user=request.user)
+    def answers(self, request, pk=None):
+        """
+        Save many answers in one request:
+        {"answers": [{"question_id": "...", "selected": 2}, ...]}
+        The last answer wins if a question appears twice.
+        """
+        items = request.data.get("answers")
+        if not isinstance(items, list) or not items:
+            return Response({"error": "answers must be a non-empty list"}, status=400)
+        if len(items) > MAX_BATCH_ANSWERS:
+            return Response(
+                {"error": f"At most {MAX_BATCH_ANSWERS} answers per request"}, status=400
+            )
 
-        total = attempt.question_attempts.count()
-        correct = attempt.question_attempts.filter(is_correct=True).count()
+        try:
+            answers = dict(parse_answer(item) for item in items)
+        except ValueError:
+            return Response(
+                {"error": "Each answer needs a question_id and an integer selected"},
+                status=400,
+            )
+
+        answer_key = get_answer_key(pk)
+        if answer_key is None or not answer_key.belongs_to(request.user):
+            return Response({"error": "Attempt not found"}, status=404)
+
+        unknown = record_answers(pk, answer_key, answers)
 
-        attempt.score = round((correct / total) * 100, 2) if total else 0
-        attempt.completed = True
-        attempt.finished_at = timezone.now()
-        attempt.save()
+        return Response({"saved": len(answers) - len(unknown), "unknown": unknown})
+
+    # -------- FINISH QUIZ --------
+    @action(detail=True, methods=["post"])
+    def finish(self, request, pk=None):
+        # scored from the running counters; also updates the leaderboard
+        attempt = finish_attempt(pk, request.user)
 
         return Response({"score": attempt.score})
 
@@ -518,20 +653,18 @@ class AttemptViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
     @action(detail=True, methods=["get"])
     def analytics(self, request, pk=None):
         attempt = QuizAttempt.objects.get(id=pk, user=request.user)
-        qas = attempt.question_attempts.all()
 
-        total = qas.count()
-        correct = qas.filter(is_correct=True).count()
+        total = attempt.question_count
+        correct = attempt.correct_count
 
         breakdown = {}
         for d in ["easy", "medium", "hard"]:
-            qs = qas.filter(difficulty=d)
+            d_total = getattr(attempt, f"{d}_count")
+            d_correct = getattr(attempt, f"{d}_correct")
             breakdown[d] = {
-                "correct": qs.filter(is_correct=True).count(),
-                "incorrect": qs.filter(is_correct=False).count(),
-                "accuracy": round(
-                    (qs.filter(is_correct=True).count() / qs.count()) * 100, 2
-                ) if qs.exists() else 0,
+                "correct": d_correct,
+                "incorrect": d_total - d_correct,
+                "accuracy": round((d_correct / d_total) * 100, 2) if d_total else 0,
             }
 
         return Response({
@@ -542,6 +675,19 @@ class AttemptViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
         })
 
 
+# ======================================================
+# GENERATION JOBS (STATUS POLLING)
+# ======================================================
+
+class GenerationJobViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    serializer_class = GenerationJobSerializer
+
+    def get_queryset(self):
+        return GenerationJob.objects.filter(user=self.request.user)
+
+
 # ======================================================
 # CATEGORY GROUPS
 # ======================================================
@@ -559,13 +705,29 @@ class UserDashboardView(APIView):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @cached_response("user")
     def get(self, request):
-        attempts = QuizAttempt.objects.filter(user=request.user)
+        # every attempt, as before the rollup: completed ones from the
+        # daily rows, plus the few still in progress
+        summary = UserDailyStats.objects.filter(user=request.user).aggregate(
+            quizzes=Sum("attempt_count"), score_sum=Sum("score_sum")
+        )
+        unfinished = QuizAttempt.objects.filter(user=request.user, completed=False).aggregate(
+            quizzes=Count("id"), score_sum=Sum("score")
+        )
+        quizzes = (summary["quizzes"] or 0) + unfinished["quizzes"]
+        score_sum = (summary["score_sum"] or 0) + (unfinished["score_sum"] or 0)
+        recent = (
+            QuizAttempt.objects
+            .filter(user=request.user)
+            .select_related("quiz")
+            .order_by("-started_at")[:5]
+        )
 
         return Response({
-            "total_quizzes": attempts.count(),
-            "average_score": round(attempts.aggregate(avg=Avg("score"))["avg"] or 0, 2),
-            "recent_scores": QuizAttemptSerializer(attempts.order_by("-started_at")[:5], many=True).data,
+            "total_quizzes": quizzes,
+            "average_score": round(score_sum / quizzes, 2) if quizzes else 0,
+            "recent_scores": QuizAttemptSerializer(recent, many=True).data,
         })
 
 
@@ -577,15 +739,45 @@ class UserProgressView(APIView):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @cached_response("user")
     def get(self, request):
-        attempts = QuizAttempt.objects.filter(
-            user=request.user,
-            completed=True
-        ).order_by("started_at")
+        """
+        ?resolution= day (default) | week | month: average score per period
+        from the daily rollup, LTTB-downsampled to at most ?points= points
+        (default 365, max 2000).
+        ?resolution=raw: one point per attempt, ?limit= per page (default
+        100, max 500) with the next page's cursor in X-Next-Cursor / Link.
+        """
+        resolution = request.query_params.get("resolution", "day")
+
+        if resolution == "raw":
+            try:
+                limit = min(max(int(request.query_params.get("limit", DEFAULT_RAW_PAGE_SIZE)), 1), MAX_RAW_PAGE_SIZE)
+            except ValueError:
+                return Response({"error": "limit must be an integer"}, status=400)
+            try:
+                rows, next_cursor = progress_raw_page(request.user, limit, request.query_params.get("cursor"))
+            except ValueError:
+                return Response({"error": "Invalid cursor"}, status=400)
+
+            return next_page_headers(Response([
+                {"date": started_at.strftime("%Y-%m-%d"), "score": score, "attempt_id": str(attempt_id)}
+                for started_at, score, attempt_id in rows
+            ]), request, next_cursor)
+
+        if resolution not in PROGRESS_RESOLUTIONS:
+            return Response(
+                {"error": f"resolution must be one of: {', '.join(PROGRESS_RESOLUTIONS + ('raw',))}"},
+                status=400,
+            )
+        try:
+            points = min(max(int(request.query_params.get("points", DEFAULT_POINTS)), 3), MAX_POINTS)
+        except ValueError:
+            return Response({"error": "points must be an integer"}, status=400)
 
         return Response([
-            {"date": a.started_at.strftime("%Y-%m-%d"), "score": a.score}
-            for a in attempts
+            {"date": day.strftime("%Y-%m-%d"), "score": round(score, 2), "attempts": attempts}
+            for day, attempts, score in downsample(progress_series(request.user, resolution), points)
         ])
 
 
@@ -597,32 +789,41 @@ class UserAnalyticsView(APIView):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @cached_response("user")
     def get(self, request):
-        attempts = QuizAttempt.objects.filter(
-            user=request.user,
-            completed=True
+        # one pass over the user's daily rollup rows: they sum to the
+        # lifetime totals and each is also a progress point
+        difficulties = ["easy", "medium", "hard"]
+        rows = daily_stats(
+            request.user,
+            "date", "attempt_count", "score_sum", "question_count", "correct_count",
+            *[f"{d}_{kind}" for d in difficulties for kind in ("count", "correct")],
         )
 
-        qas = QuestionAttempt.objects.filter(quiz_attempt__in=attempts)
-
-        total_q = qas.count()
-        correct_q = qas.filter(is_correct=True).count()
-
+        totals = [0] * (2 + 2 * len(difficulties))
+        quizzes = 0
+        score_sum = 0
+        progress_graph = []
+        for day, day_attempts, day_score_sum, *counts in rows:
+            quizzes += day_attempts
+            score_sum += day_score_sum
+            totals = [t + c for t, c in zip(totals, counts)]
+            progress_graph.append({
+                "date": day.strftime("%Y-%m-%d"),
+                "score": round(day_score_sum / day_attempts, 2),
+            })
+
+        total_q, correct_q = totals[0], totals[1]
         difficulty_accuracy = {}
-        for d in ["easy", "medium", "hard"]:
-            qs = qas.filter(difficulty=d)
-            difficulty_accuracy[d] = round(
-                (qs.filter(is_correct=True).count() / qs.count()) * 100, 2
-            ) if qs.exists() else 0
+        for i, d in enumerate(difficulties):
+            d_total, d_correct = totals[2 + 2 * i], totals[3 + 2 * i]
+            difficulty_accuracy[d] = round((d_correct / d_total) * 100, 2) if d_total else 0
 
         return Response({
-            "total_quizzes": attempts.count(),
-            "average_score": round(attempts.aggregate(avg=Avg("score"))["avg"] or 0, 2),
+            "total_quizzes": quizzes,
+            "average_score": round(score_sum / quizzes, 2) if quizzes else 0,
             "lifetime_accuracy": round((correct_q / total_q) * 100, 2) if total_q else 0,
-            "progress_graph": [
-                {"date": a.started_at.strftime("%Y-%m-%d"), "score": a.score}
-                for a in attempts.order_by("started_at")
-            ],
+            "progress_graph": progress_graph,
             "difficulty_accuracy": difficulty_accuracy,
             "recommendations": ["Keep practicing regularly"],
         })
@@ -632,21 +833,121 @@ class UserAnalyticsView(APIView):
 # LEADERBOARD
 # ======================================================
 
+def leaderboard_scope(request):
+    """(window, category_id) from the query string; raises ValueError."""
+    window = request.query_params.get("window", "all")
+    if window not in LEADERBOARD_WINDOWS:
+        raise ValueError(f"window must be one of: {', '.join(LEADERBOARD_WINDOWS)}")
+    category_id = request.query_params.get("category") or None
+    try:
+        return window, int(category_id) if category_id is not None else None
+    except ValueError:
+        raise ValueError("category must be an integer id")
+
+
+def leaderboard_row(row):
+    return {
+        "username": row["username"],
+        "avg_score": round(row["average"], 2),
+        "attempts": row["attempts"],
+    }
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@cached_response("leaderboard")
 def leaderboard_view(request):
-    leaderboard = (
-        QuizAttempt.objects
-        .filter(completed=True)
-        .values("user__username")
-        .annotate(avg_score=Avg("score"))
-        .order_by("-avg_score")
-    )
-
-    return Response([
-        {
-            "username": row["user__username"],
-            "avg_score": round(row["avg_score"], 2),
-        }
-        for row in leaderboard
-    ])
+    """
+    Top users by average score, read from the LeaderboardEntry buckets.
+    ?window= all (default) | week | day | 7d | 30d, ?category= narrows to
+    one category, ?limit= sets the page size; the next page's cursor comes
+    back in the X-Next-Cursor header and as a rel="next" Link.
+    """
+    try:
+        window, category_id = leaderboard_scope(request)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+
+    try:
+        limit = min(max(int(request.query_params.get("limit", DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return Response({"error": "limit must be an integer"}, status=400)
+    try:
+        rows, next_cursor = top_entries(window, category_id, limit, request.query_params.get("cursor"))
+    except ValueError:
+        return Response({"error": "Invalid cursor"}, status=400)
+
+    return next_page_headers(Response([leaderboard_row(row) for row in rows]), request, next_cursor)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@cached_response("leaderboard", per_user=True)
+def leaderboard_rank_view(request):
+    """
+    The caller's rank, percentile and up to ?neighbours= (default 2, max
+    10) users either side, for the same ?window= and ?category= as the
+    leaderboard. rank is null when the caller has no result in the window.
+    """
+    try:
+        window, category_id = leaderboard_scope(request)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    try:
+        neighbours = min(max(int(request.query_params.get("neighbours", 2)), 0), 10)
+    except ValueError:
+        return Response({"error": "neighbours must be an integer"}, status=400)
+
+    position = leaderboard_rank(request.user.id, window, category_id, neighbours)
+    if position is None:
+        return Response({"rank": None, "percentile": None, "above": [], "below": []})
+
+    return Response({
+        **leaderboard_row(position["me"]),
+        "rank": position["rank"],
+        "total": position["total"],
+        "percentile": position["percentile"],
+        "above": [dict(leaderboard_row(row), rank=row["rank"]) for row in position["above"]],
+        "below": [dict(leaderboard_row(row), rank=row["rank"]) for row in position["below"]],
+    })
+
+
+# ======================================================
+# INTERNAL — LLM STATS
+# ======================================================
+
+class LLMStatsView(APIView):
+    """
+    Operational counters for the generation path (staff only).
+    Counters are per worker process.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        cache = get_prompt_cache()
+        return Response({
+            "singleflight": get_flight().stats(),
+            "providers": guard_stats(),
+            "prompt_cache": cache.stats() if cache else None,
+        })
+
+
+class GenerationMetricsView(APIView):
+    """
+    Generation telemetry aggregated from GenerationMetric rows (staff only).
+    ?days=7&group_by=model,topic,difficulty
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        try:
+            days = int(request.query_params.get("days", 7))
+        except ValueError:
+            days = 0
+        if not 1 <= days <= MAX_METRICS_DAYS:
+            return Response({"error": f"days must be between 1 and {MAX_METRICS_DAYS}"}, status=400)
+
+        group_by = request.query_params.get("group_by", "model,topic,difficulty").split(",")
+        return Response(summarize_generation(days=days, group_by=group_by))